@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Batched Categorizer
+Categorizes many documents per chat completion (JSON output), runs the requests
+concurrently under a rate limit and caches results by content hash
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from usage_meter import BudgetExceeded, DryRunRequest
+
+DEFAULT_CATEGORY_CACHE_PATH = os.path.join('.cache', 'categories.json')
+
+
+def content_hash(title: str, preview: str) -> str:
+    """Cache key for a document's categorization input"""
+    return hashlib.sha256(f"{title}\n{preview}".encode('utf-8')).hexdigest()
+
+
+def taxonomy_signature(categories: Dict[str, Dict[str, Any]]) -> str:
+    """Changes whenever the category definitions change (cached results are then discarded)"""
+    return hashlib.sha256(json.dumps(categories, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing requests evenly at requests_per_minute"""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class CategoryCache:
+    def __init__(self, signature: str, path: str = DEFAULT_CATEGORY_CACHE_PATH):
+        """
+        Initialize the category cache
+
+        Args:
+            signature: Taxonomy signature; a file written for another taxonomy is ignored
+            path: JSON file holding content hash → category
+        """
+        self.signature = signature
+        self.path = path
+        self.entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if data.get('signature') == signature:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        return self.entries.get(key)
+
+    def put(self, key: str, category: str):
+        with self._lock:
+            self.entries[key] = category
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._lock, open(self.path, 'w') as f:
+            json.dump({'signature': self.signature, 'entries': self.entries}, f)
+
+
+def _batch_prompt(items: List[Dict[str, str]], categories: Dict[str, Dict[str, Any]]) -> str:
+    category_lines = "\n".join(
+        f"- {key}: {info['name']} ({info['description']})" for key, info in categories.items()
+    )
+    documents = json.dumps(
+        [{'id': item['id'], 'title': item['title'], 'preview': item['preview'][:500]} for item in items],
+        ensure_ascii=False
+    )
+    return f"""
+    Categorize each document into exactly one of these categories:
+
+{category_lines}
+
+    Documents (JSON):
+    {documents}
+
+    Respond with a JSON object mapping every document id to its category key, e.g.
+    {{"categories": {{"<id>": "content_creation"}}}}
+    """
+
+
+def categorize_batch(openai_client,
+                     items: List[Dict[str, str]],
+                     categories: Dict[str, Dict[str, Any]],
+                     model: str = "gpt-4o-mini") -> Dict[str, str]:
+    """
+    Categorize several documents with one chat completion
+
+    Returns id → category for the items the model answered with a valid category key.
+    """
+    response = openai_client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": _batch_prompt(items, categories)}],
+        response_format={"type": "json_object"},
+        max_tokens=30 * len(items) + 50,
+        temperature=0.1
+    )
+
+    answer = json.loads(response.choices[0].message.content)
+    assigned = answer.get('categories', answer)
+    return {
+        doc_id: str(category).strip().lower()
+        for doc_id, category in assigned.items()
+        if str(category).strip().lower() in categories
+    }
+
+
+def categorize_all(openai_client,
+                   items: List[Dict[str, str]],
+                   categories: Dict[str, Dict[str, Any]],
+                   fallback: Callable[[str, str], str],
+                   batch_size: int = 25,
+                   max_workers: int = 4,
+                   requests_per_minute: float = 60,
+                   cache: Optional[CategoryCache] = None,
+                   model: str = "gpt-4o-mini") -> Dict[str, str]:
+    """
+    Categorize every item ({"id", "title", "preview"}), batch_size items per request
+
+    Cached items are answered locally; the remaining batches run concurrently
+    (max_workers in flight, at most requests_per_minute). Items the model
+    could not place get fallback(title, preview).
+
+    Returns:
+        id → category key for every item
+    """
+    results: Dict[str, str] = {}
+    pending: List[Dict[str, str]] = []
+
+    for item in items:
+        cached = cache.get(content_hash(item['title'], item['preview'])) if cache else None
+        if cached in categories:
+            results[item['id']] = cached
+        else:
+            pending.append(item)
+
+    limiter = RateLimiter(requests_per_minute)
+
+    def run(batch: List[Dict[str, str]]) -> Dict[str, str]:
+        limiter.wait()
+        try:
+            return categorize_batch(openai_client, batch, categories, model)
+        except BudgetExceeded:
+            raise
+        except DryRunRequest:
+            return {}  # Tokens already predicted; nothing was sent
+        except Exception as e:
+            print(f"Error in batched AI categorization ({len(batch)} documents): {e}")
+            return {}
+
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    if batches:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+            for batch, assigned in zip(batches, pool.map(run, batches)):
+                for item in batch:
+                    category = assigned.get(item['id'])
+                    if category and cache:
+                        cache.put(content_hash(item['title'], item['preview']), category)
+                    results[item['id']] = category or fallback(item['title'], item['preview'])
+
+    if cache:
+        cache.save()
+
+    return results
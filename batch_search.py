@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Batch Search Helpers
+Embed many queries in one OpenAI request and run the Pinecone queries concurrently
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from embedding_cache import EmbeddingCache
+from usage_meter import BudgetExceeded
+
+FilterSpec = Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None]
+
+
+def embed_texts(openai_client,
+                texts: List[str],
+                model: str = "text-embedding-3-small",
+                cache: Optional[EmbeddingCache] = None) -> List[List[float]]:
+    """
+    Embed a list of texts with a single OpenAI request
+
+    Cached texts are served from the cache and only the misses are sent.
+    Returns one embedding per input text, in input order ([] where embedding failed).
+    """
+    embeddings: List[List[float]] = [[] for _ in texts]
+    missing: Dict[str, List[int]] = {}
+
+    for i, text in enumerate(texts):
+        cached = cache.get(text) if cache else None
+        if cached:
+            embeddings[i] = cached
+        else:
+            missing.setdefault(text, []).append(i)
+
+    if not missing:
+        return embeddings
+
+    try:
+        unique_texts = list(missing.keys())
+        response = openai_client.embeddings.create(
+            model=model,
+            input=unique_texts
+        )
+
+        for item in sorted(response.data, key=lambda d: d.index):
+            text = unique_texts[item.index]
+            for i in missing[text]:
+                embeddings[i] = item.embedding
+            if cache:
+                cache.put(text, item.embedding)
+
+    except BudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ Error creating batch embeddings: {e}")
+
+    return embeddings
+
+
+def _filter_for(filters: FilterSpec, i: int) -> Optional[Dict[str, Any]]:
+    if isinstance(filters, list):
+        return filters[i]
+    return filters
+
+
+def query_vectors(index,
+                  vectors: List[List[float]],
+                  top_k: int = 5,
+                  filters: FilterSpec = None,
+                  include_values: bool = False,
+                  max_workers: int = 8,
+                  return_errors: bool = False) -> Union[List[List[Any]], Tuple[List[List[Any]], List[Optional[str]]]]:
+    """
+    Run one Pinecone query per vector concurrently
+
+    Args:
+        index: Connected Pinecone index
+        vectors: Query vectors (empty vectors are skipped)
+        top_k: Results per query
+        filters: One metadata filter for every query, or a list aligned with vectors
+        include_values: Also return the stored vectors
+        max_workers: Maximum number of queries in flight
+        return_errors: Also return one error message per query (None where it succeeded)
+
+    Returns:
+        A list of matches per query, aligned with the input order
+        (and the aligned error messages when return_errors is set)
+    """
+    errors: List[Optional[str]] = [None] * len(vectors)
+
+    def run(i: int) -> List[Any]:
+        if not vectors[i]:
+            errors[i] = "no query embedding"
+            return []
+        try:
+            kwargs = {}
+            query_filter = _filter_for(filters, i)
+            if query_filter:
+                kwargs['filter'] = query_filter
+
+            results = index.query(
+                vector=vectors[i],
+                top_k=top_k,
+                include_metadata=True,
+                include_values=include_values,
+                **kwargs
+            )
+            return results.matches
+
+        except Exception as e:
+            print(f"❌ Error querying vector {i}: {e}")
+            errors[i] = f"vector query failed: {e}"
+            return []
+
+    results: List[List[Any]] = []
+    if vectors:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(vectors))) as pool:
+            results = list(pool.map(run, range(len(vectors))))
+    return (results, errors) if return_errors else results
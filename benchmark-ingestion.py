@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ingestion path against local stand-ins
+Runs Docs export → chunk → embed → upsert (PineconeKnowledgeBase.build_document_vectors) against
+local Docs, OpenAI and Pinecone stand-ins and reports docs/sec, chunks/sec, peak RSS and API
+calls per document. Results are saved so runs with the same settings can be compared.
+"""
+
+import importlib.util
+import json
+import os
+import resource
+import time
+import requests
+from docs_export import fetch_document_text
+from hierarchy import DOCUMENT_NAMESPACE
+from lexical_index import BM25Index
+from local_standins import StandInCluster
+
+N_DOCS = 40
+TAB_NAME = "Benchmark"
+
+# Stand-in behaviour (part of the benchmark configuration: change these deliberately)
+STANDIN_SETTINGS = {
+    "docs": {"sizes": [4000, 15000, 45000], "seed": 0},
+    "embeddings": {"latency_ms": 40.0, "per_input_ms": 0.5, "rate_limit_rate": 0.02, "retry_after_ms": 100, "seed": 0},
+    "pinecone": {"latency_ms": 5.0}
+}
+
+REPORT_DIR = os.path.join('.cache', 'benchmarks')
+LATEST_REPORT_PATH = os.path.join(REPORT_DIR, 'ingestion_latest.json')
+
+
+def peak_rss_mb():
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_knowledge_base(urls):
+    """PineconeKnowledgeBase wired to the stand-ins (OpenAI base URL, Pinecone host)"""
+    os.environ['OPENAI_BASE_URL'] = f"{urls['embeddings']}/v1"
+
+    # pinecone-setup.py is not an importable module name
+    spec = importlib.util.spec_from_file_location(
+        "pinecone_setup", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pinecone-setup.py")
+    )
+    pinecone_setup = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(pinecone_setup)
+
+    kb = pinecone_setup.PineconeKnowledgeBase(
+        pinecone_api_key="benchmark",
+        openai_api_key="benchmark",
+        google_credentials_path=None,
+        google_sheet_id="",
+        query_cache_path=None
+    )
+    kb.index = kb.pc.Index(host=urls['pinecone'])
+    kb.lexical_index = BM25Index()  # Start empty; the on-disk index is never touched
+    return kb
+
+
+def benchmark_ingestion():
+    """Ingest N_DOCS synthetic transcripts and report throughput and API usage"""
+
+    print("🏁 Benchmarking ingestion against local stand-ins...")
+
+    with StandInCluster(STANDIN_SETTINGS) as cluster:
+        kb = load_knowledge_base(cluster.urls)
+        session = requests.Session()
+        rss_before = peak_rss_mb()
+
+        timings = {"fetch": 0.0, "chunk_embed": 0.0, "upsert": 0.0}
+        chunks = 0
+        failed = 0
+        vectors_to_upsert, doc_vectors_to_upsert = [], []
+
+        def upsert(vectors, **kwargs):
+            started = time.perf_counter()
+            kb.index.upsert(vectors=vectors, **kwargs)
+            timings["upsert"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for i in range(N_DOCS):
+            doc_url = f"https://docs.google.com/document/d/benchmark-{i:04d}/edit?usp=sharing"
+
+            stage_started = time.perf_counter()
+            content = fetch_document_text(doc_url, session=session, base=cluster.urls['docs'])
+            timings["fetch"] += time.perf_counter() - stage_started
+            if not content:
+                failed += 1
+                continue
+
+            stage_started = time.perf_counter()
+            chunk_records, doc_record = kb.build_document_vectors(content, f"Benchmark Doc {i}", doc_url, TAB_NAME)
+            timings["chunk_embed"] += time.perf_counter() - stage_started
+
+            chunks += len(chunk_records)
+            vectors_to_upsert.extend(chunk_records)
+            if doc_record:
+                doc_vectors_to_upsert.append(doc_record)
+            else:
+                failed += 1
+
+            # Same batching as process_sheet_tab
+            if len(vectors_to_upsert) >= 100:
+                upsert(vectors_to_upsert)
+                vectors_to_upsert = []
+            if len(doc_vectors_to_upsert) >= 100:
+                upsert(doc_vectors_to_upsert, namespace=DOCUMENT_NAMESPACE)
+                doc_vectors_to_upsert = []
+
+        if vectors_to_upsert:
+            upsert(vectors_to_upsert)
+        if doc_vectors_to_upsert:
+            upsert(doc_vectors_to_upsert, namespace=DOCUMENT_NAMESPACE)
+        elapsed = time.perf_counter() - started
+
+        stats = cluster.stats()
+
+    report = {
+        "settings": {"n_docs": N_DOCS, "chunk_size": kb.chunk_size, "chunk_overlap": kb.chunk_overlap,
+                     "classifier": bool(kb.classifier), "standins": STANDIN_SETTINGS},
+        "elapsed_s": round(elapsed, 3),
+        "docs_per_s": round(N_DOCS / elapsed, 2),
+        "chunks_per_s": round(chunks / elapsed, 2),
+        "chunks": chunks,
+        "failed_docs": failed,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+        "stage_seconds": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+        "calls_per_doc": {
+            "docs_exports": round(stats['docs'].get('exports', 0) / N_DOCS, 2),
+            "embedding_requests": round(stats['embeddings'].get('requests', 0) / N_DOCS, 2),
+            "embedding_429s": round(stats['embeddings'].get('rate_limited', 0) / N_DOCS, 2),
+            "pinecone_requests": round(stats['pinecone'].get('requests', 0) / N_DOCS, 2)
+        },
+        "embedding_tokens": stats['embeddings'].get('tokens', 0),
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+    print(f"\n📊 {N_DOCS} docs, {chunks} chunks in {elapsed:.2f}s")
+    print(f"  🚀 {report['docs_per_s']} docs/sec, {report['chunks_per_s']} chunks/sec")
+    print(f"  🧠 Peak RSS {report['peak_rss_mb']} MB (+{report['rss_growth_mb']} MB during ingestion)")
+    print(f"  ⏱️ Stages: " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in report['stage_seconds'].items()))
+    print(f"  📞 Calls per doc: " + ", ".join(f"{name} {value}" for name, value in report['calls_per_doc'].items()))
+    if failed:
+        print(f"  ⚠️ {failed} documents failed")
+
+    # Compare with the previous run when the settings match
+    try:
+        with open(LATEST_REPORT_PATH, 'r') as f:
+            previous = json.load(f)
+    except (OSError, ValueError):
+        previous = None
+
+    if previous and previous.get('settings') == report['settings']:
+        for metric in ("docs_per_s", "chunks_per_s", "peak_rss_mb"):
+            change = (report[metric] - previous[metric]) / previous[metric] * 100 if previous[metric] else 0.0
+            print(f"  ↔️ {metric}: {previous[metric]} → {report[metric]} ({change:+.1f}%)")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    for path in (LATEST_REPORT_PATH, os.path.join(REPORT_DIR, f"ingestion_{int(time.time())}.json")):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    print(f"\n💾 Report saved to {LATEST_REPORT_PATH}")
+
+if __name__ == "__main__":
+    benchmark_ingestion()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark the keyword categorizer
+Compares the compiled Aho-Corasick matcher with the old per-keyword substring scan on full
+transcripts (coaching call `content` from Pinecone, or text files given on the command line)
+"""
+
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+from taxonomy import TOPIC_CATEGORIES, DEFAULT_CATEGORY, categorize_by_keywords
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+TRANSCRIPT_INDEX = 'gpc-knowledge-base-v2'
+MAX_TRANSCRIPTS = 100
+ROUNDS = 5
+
+
+def categorize_by_substrings(title: str, content: str) -> str:
+    """The previous implementation: one `in` scan of the whole text per keyword"""
+    text = (title + " " + content).lower()
+
+    category_scores = {}
+    for category, info in TOPIC_CATEGORIES.items():
+        category_scores[category] = sum(1 for keyword in info["keywords"] if keyword in text)
+
+    if max(category_scores.values()) > 0:
+        return max(category_scores, key=category_scores.get)
+    return DEFAULT_CATEGORY
+
+
+def load_transcripts() -> List[str]:
+    """Full transcripts: files from argv, otherwise coaching call content stored in Pinecone"""
+    if len(sys.argv) > 1:
+        texts = []
+        for path in sys.argv[1:]:
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                texts.append(f.read())
+        return texts
+
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+    index = pc.Index(TRANSCRIPT_INDEX)
+    results = index.query(
+        vector=[0.0] * 1536,
+        top_k=MAX_TRANSCRIPTS,
+        include_metadata=True
+    )
+    return [match.metadata['content'] for match in results.matches if match.metadata.get('content')]
+
+
+def time_categorizer(categorize, texts: List[str]) -> List[float]:
+    """Per-document latencies (ms) over several rounds"""
+    latencies = []
+    for _ in range(ROUNDS):
+        for text in texts:
+            started = time.perf_counter()
+            categorize("", text)
+            latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(name: str, latencies: List[float]):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(f"  {name:<14} mean {statistics.mean(latencies):7.3f} ms   p50 {statistics.median(latencies):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def run_benchmark():
+    print("⏱️ Benchmarking keyword categorization on full transcripts...")
+
+    texts = load_transcripts()
+    if not texts:
+        print("❌ No transcripts found")
+        return
+
+    total_chars = sum(len(text) for text in texts)
+    print(f"📄 {len(texts)} transcripts, {total_chars:,} characters (avg {total_chars // len(texts):,})")
+
+    substring_latencies = time_categorizer(categorize_by_substrings, texts)
+    matcher_latencies = time_categorizer(categorize_by_keywords, texts)
+
+    print("\n📊 Latency per transcript:")
+    report("substring scan", substring_latencies)
+    report("aho-corasick", matcher_latencies)
+
+    # Word boundaries change results where short keywords matched inside other words
+    changed = [
+        (categorize_by_substrings("", text), categorize_by_keywords("", text))
+        for text in texts
+    ]
+    differing = [pair for pair in changed if pair[0] != pair[1]]
+    print(f"\n🔀 Categories changed by word-boundary matching: {len(differing)}/{len(texts)}")
+    for old, new in differing[:10]:
+        print(f"  - {old} → {new}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Category Classifier
+Zero-shot topic classification: embeddings are scored against locally stored
+category centroids with one matrix product (no LLM or network calls)
+"""
+
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_CENTROIDS_PATH = os.path.join('.cache', 'category_centroids.json')
+
+
+def save_centroids(categories: Dict[str, Dict[str, Any]],
+                   source: str,
+                   path: str = DEFAULT_CENTROIDS_PATH):
+    """
+    Write category centroids to the local side file
+
+    Args:
+        categories: category key → {"centroid": [...], plus optional stats such as "count"/"spread"}
+        source: How the centroids were produced (e.g. "topic_descriptions")
+        path: Side file location
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, 'w') as f:
+        json.dump({
+            'source': source,
+            'created_at': time.time(),
+            'categories': categories
+        }, f)
+
+
+def load_centroids(path: str = DEFAULT_CENTROIDS_PATH) -> Optional[Dict[str, Any]]:
+    """Read the centroid side file, or None if it does not exist"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class CategoryClassifier:
+    def __init__(self,
+                 centroids: Dict[str, List[float]],
+                 threshold: float = 0.3,
+                 margin: float = 0.05,
+                 max_labels: int = 2):
+        """
+        Initialize the classifier
+
+        Args:
+            centroids: category key → centroid vector
+            threshold: Minimum cosine similarity for a category to be assigned at all
+            margin: Further categories within this similarity of the best one are also assigned
+            max_labels: Maximum number of categories assigned to one embedding
+        """
+        self.categories = list(centroids.keys())
+        matrix = np.asarray([centroids[key] for key in self.categories], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1.0, norms)
+
+        self.threshold = threshold
+        self.margin = margin
+        self.max_labels = max_labels
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_CENTROIDS_PATH, **kwargs):
+        """Build from the centroid side file (None if it has not been created yet)"""
+        data = load_centroids(path)
+        if not data or not data.get('categories'):
+            return None
+
+        centroids = {key: info['centroid'] for key, info in data['categories'].items()}
+        return cls(centroids, **kwargs)
+
+    def scores(self, embeddings: List[List[float]]) -> np.ndarray:
+        """Cosine similarity of every embedding to every category, shape (embeddings, categories)"""
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[None, :]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return (matrix / np.where(norms == 0, 1.0, norms)) @ self.matrix.T
+
+    def rank(self, embedding: List[float]) -> List[Tuple[str, float]]:
+        """All categories with their similarity to one embedding, best first"""
+        similarities = self.scores([embedding])[0]
+        return [(self.categories[i], float(similarities[i])) for i in np.argsort(-similarities)]
+
+    def classify_many(self, embeddings: List[List[float]]) -> List[List[Tuple[str, float]]]:
+        """
+        Multi-label classification of many embeddings at once
+
+        Returns, per embedding, the (category, similarity) pairs that pass the
+        threshold and lie within margin of the best category, best first
+        ([] when no category is confident enough).
+        """
+        if not len(embeddings):
+            return []
+
+        similarities = self.scores(embeddings)
+        order = np.argsort(-similarities, axis=1)[:, :self.max_labels]
+        best = similarities.max(axis=1)
+
+        labels = []
+        for row, columns in enumerate(order):
+            if best[row] < self.threshold:
+                labels.append([])
+                continue
+            labels.append([
+                (self.categories[column], float(similarities[row, column]))
+                for column in columns
+                if best[row] - similarities[row, column] <= self.margin
+            ])
+        return labels
+
+    def classify(self, embedding: List[float]) -> List[Tuple[str, float]]:
+        """Multi-label classification of one embedding"""
+        return self.classify_many([embedding])[0]
+
+    def category_metadata(self, embedding: List[float]) -> Dict[str, Any]:
+        """Metadata fields for a chunk: best `category`, all `categories` and `category_confidence`"""
+        labels = self.classify(embedding)
+        if not labels:
+            return {}
+        return {
+            'category': labels[0][0],
+            'categories': [key for key, _ in labels],
+            'category_confidence': round(labels[0][1], 4)
+        }
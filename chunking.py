@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Chunking
+Document chunking strategies shared by ingestion and the chunking parameter sweep
+"""
+
+from typing import Callable, Dict, List
+
+from context_packer import split_sentences
+
+
+def _check_sizes(chunk_size: int, chunk_overlap: int):
+    """Reject settings where windows would not advance (overlap must be smaller than the chunk)"""
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    if not 0 <= chunk_overlap < chunk_size:
+        raise ValueError(f"chunk_overlap must be in [0, chunk_size), got {chunk_overlap} for chunk_size {chunk_size}")
+
+
+def chunk_by_chars(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """
+    Fixed-size character windows, ended early at the last sentence or line break
+
+    A window only moves its end back to a boundary that lies in its second
+    half; consecutive windows share chunk_overlap characters.
+
+    Raises:
+        ValueError: chunk_overlap is negative or not smaller than chunk_size
+    """
+    _check_sizes(chunk_size, chunk_overlap)
+    chunks = []
+    start = 0
+
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        chunk_text = text[start:end]
+
+        # Try to break at sentence boundary
+        if end < len(text):
+            break_point = max(chunk_text.rfind('.'), chunk_text.rfind('\n'))
+            if break_point > chunk_size // 2:
+                end = start + break_point + 1
+                chunk_text = text[start:end]
+
+        chunks.append(chunk_text)
+        if end >= len(text):
+            break
+        start = max(end - chunk_overlap, start + 1)
+
+    return chunks
+
+
+def _pack(units: List[str], separator: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Greedily pack units up to chunk_size, starting each chunk with trailing units worth chunk_overlap chars"""
+    chunks: List[str] = []
+    current: List[str] = []
+    length = 0
+
+    for unit in units:
+        if current and length + len(separator) + len(unit) > chunk_size:
+            chunks.append(separator.join(current))
+
+            # Carry whole trailing units covering the overlap into the next chunk
+            carried: List[str] = []
+            carried_length = 0
+            for previous in reversed(current):
+                if carried_length >= chunk_overlap or carried_length + len(previous) > chunk_size // 2:
+                    break
+                carried.insert(0, previous)
+                carried_length += len(previous) + len(separator)
+            current, length = carried, max(0, carried_length - len(separator))
+
+            # Never let the carried overlap push the next chunk past chunk_size
+            while current and length + len(separator) + len(unit) > chunk_size:
+                length -= len(current.pop(0)) + (len(separator) if current else 0)
+
+        current.append(unit)
+        length += len(unit) + (len(separator) if len(current) > 1 else 0)
+
+    if current:
+        chunks.append(separator.join(current))
+    return chunks
+
+
+def chunk_by_sentences(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """Whole sentences packed up to chunk_size, overlapping by whole sentences"""
+    _check_sizes(chunk_size, chunk_overlap)
+    return _pack(split_sentences(text, max_chars=chunk_size), ' ', chunk_size, chunk_overlap)
+
+
+def chunk_by_paragraphs(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    """Paragraphs packed up to chunk_size; paragraphs longer than that fall back to sentences"""
+    _check_sizes(chunk_size, chunk_overlap)
+    units: List[str] = []
+    for paragraph in text.split('\n\n'):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > chunk_size:
+            units.extend(chunk_by_sentences(paragraph, chunk_size, 0))
+        else:
+            units.append(paragraph)
+    return _pack(units, '\n\n', chunk_size, chunk_overlap)
+
+
+CHUNKING_STRATEGIES: Dict[str, Callable[[str, int, int], List[str]]] = {
+    'chars': chunk_by_chars,
+    'sentences': chunk_by_sentences,
+    'paragraphs': chunk_by_paragraphs
+}
+
+
+def chunk_document(text: str, strategy: str = 'chars', chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    if strategy not in CHUNKING_STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy: {strategy}")
+    return [chunk for chunk in CHUNKING_STRATEGIES[strategy](text, chunk_size, chunk_overlap) if chunk.strip()]
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Context Packer
+Extracts the query-relevant sentences from retrieved chunks and packs them into a token budget
+"""
+
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from lexical_index import tokenize
+from usage_meter import BudgetExceeded, count_tokens
+
+# Model whose tokenizer measures the packed context (the chat model it is written for)
+CONTEXT_MODEL = "gpt-4o-mini"
+
+# Tokens reserved per packed sentence for the " " / " … " joining it to its neighbour
+SEPARATOR_TOKENS = 2
+
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+|\n+')
+
+# Sentences per embeddings request (the API accepts at most 2048 inputs)
+EMBED_BATCH_SIZE = 256
+
+
+def estimate_tokens(text: str, model: str = CONTEXT_MODEL) -> int:
+    """Token count of a piece of text with the model's tiktoken encoding (chars/4 without tiktoken)"""
+    return count_tokens(text, model)
+
+
+def match_text(match: Any) -> str:
+    """Chunk text stored in a match's metadata (`text` for sheet chunks, `content` for coaching calls)"""
+    metadata = match.metadata or {}
+    return metadata.get('text') or metadata.get('content') or ''
+
+
+def split_sentences(text: str, min_chars: int = 25, max_chars: int = 600) -> List[str]:
+    """
+    Split text into sentences
+
+    Fragments shorter than min_chars are merged into the following sentence and
+    run-on transcript text longer than max_chars is cut at word boundaries.
+    """
+    sentences: List[str] = []
+    pending = ''
+
+    for part in SENTENCE_BOUNDARY.split(text):
+        part = part.strip()
+        if not part:
+            continue
+
+        part = f"{pending} {part}".strip() if pending else part
+        if len(part) < min_chars:
+            pending = part
+            continue
+        pending = ''
+
+        while len(part) > max_chars:
+            cut = part.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            sentences.append(part[:cut].strip())
+            part = part[cut:].strip()
+        sentences.append(part)
+
+    if pending:
+        sentences.append(pending)
+
+    return sentences
+
+
+def _lexical_scores(query: str, sentence_terms: List[set]) -> np.ndarray:
+    """IDF-weighted query term overlap (IDF over the candidate sentences), length-dampened"""
+    query_terms = set(tokenize(query))
+    total = len(sentence_terms)
+    scores = np.zeros(total, dtype=np.float32)
+    if not query_terms or not total:
+        return scores
+
+    for term in query_terms:
+        containing = [i for i, terms in enumerate(sentence_terms) if term in terms]
+        if not containing:
+            continue
+        idf = math.log(1 + total / len(containing))
+        scores[containing] += idf
+
+    lengths = np.array([max(len(terms), 1) for terms in sentence_terms], dtype=np.float32)
+    return scores / np.sqrt(lengths)
+
+
+def _embedding_scores(query_embedding: List[float],
+                      sentences: List[str],
+                      embed_fn: Callable[[List[str]], List[List[float]]]) -> Optional[np.ndarray]:
+    """
+    Cosine similarity of each sentence to the query (sentences embedded in batches)
+
+    Returns None when any sentence could not be embedded, so the caller can
+    fall back to lexical scores.
+    """
+    embeddings: List[List[float]] = []
+    try:
+        for start in range(0, len(sentences), EMBED_BATCH_SIZE):
+            embeddings.extend(embed_fn(sentences[start:start + EMBED_BATCH_SIZE]))
+    except BudgetExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ Error embedding sentences, using lexical scores: {e}")
+        return None
+
+    dimension = len(query_embedding)
+    if len(embeddings) != len(sentences) or any(len(embedding) != dimension for embedding in embeddings):
+        return None
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    query /= np.linalg.norm(query) or 1.0
+    return (matrix @ query) / np.where(norms == 0, 1.0, norms)
+
+
+def pack_context(query: str,
+                 matches: List[Any],
+                 token_budget: int = 1500,
+                 query_embedding: Optional[List[float]] = None,
+                 embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 dedup_threshold: float = 0.8,
+                 rank_weight: float = 0.05,
+                 model: str = CONTEXT_MODEL) -> List[Dict[str, Any]]:
+    """
+    Select the best sentences from the matches that fit in token_budget
+
+    Sentences are scored by cosine to query_embedding when embed_fn is given
+    (and every sentence embeds), otherwise by lexical overlap with the query, plus a small bonus for
+    higher-ranked matches. Near-duplicate sentences (token Jaccard at or above
+    dedup_threshold) are packed only once. Tokens are counted with model's
+    tokenizer, with room for the separators between sentences.
+
+    Returns one snippet per contributing match, in match order:
+    {"id", "title", "text", "score", "tokens"}. Non-adjacent sentences of the
+    same match are joined with " … ".
+    """
+    sentences, owners, positions = [], [], []
+    for match_rank, match in enumerate(matches):
+        for position, sentence in enumerate(split_sentences(match_text(match))):
+            sentences.append(sentence)
+            owners.append(match_rank)
+            positions.append(position)
+
+    if not sentences or token_budget <= 0:
+        return []
+
+    sentence_terms = [set(tokenize(sentence)) for sentence in sentences]
+    scores = None
+    if query_embedding and embed_fn:
+        scores = _embedding_scores(query_embedding, sentences, embed_fn)
+    if scores is None:
+        scores = _lexical_scores(query, sentence_terms)
+    scores = scores + rank_weight / (1 + np.asarray(owners, dtype=np.float32))
+
+    selected: List[int] = []
+    used_tokens = 0
+    for i in np.argsort(-scores):
+        tokens = estimate_tokens(sentences[i], model) + SEPARATOR_TOKENS
+        if used_tokens + tokens > token_budget:
+            continue
+
+        terms = sentence_terms[i]
+        duplicate = any(
+            len(terms & sentence_terms[j]) / (len(terms | sentence_terms[j]) or 1) >= dedup_threshold
+            for j in selected
+        )
+        if duplicate:
+            continue
+
+        selected.append(int(i))
+        used_tokens += tokens
+
+    snippets: Dict[int, List[int]] = {}
+    for i in sorted(selected, key=lambda i: (owners[i], positions[i])):
+        snippets.setdefault(owners[i], []).append(i)
+
+    packed = []
+    for match_rank, indexes in snippets.items():
+        match = matches[match_rank]
+        text = sentences[indexes[0]]
+        for previous, current in zip(indexes, indexes[1:]):
+            separator = ' ' if positions[current] == positions[previous] + 1 else ' … '
+            text += separator + sentences[current]
+
+        packed.append({
+            'id': match.id,
+            'title': (match.metadata or {}).get('title', 'Unknown'),
+            'text': text,
+            'score': float(max(scores[i] for i in indexes)),
+            'tokens': estimate_tokens(text, model)
+        })
+
+    return packed
+
+
+def format_context(snippets: List[Dict[str, Any]]) -> str:
+    """Render packed snippets as a prompt context block"""
+    return "\n\n".join(f"[{snippet['title']}]\n{snippet['text']}" for snippet in snippets)
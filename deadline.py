@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Deadline Helpers
+Run blocking calls under a latency budget, hedging slow calls with a duplicate request
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish before its deadline"""
+
+
+class Deadline:
+    """A fixed point in time that stages of a request share"""
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.started = time.perf_counter()
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def remaining_s(self) -> float:
+        return max(0.0, (self.budget_ms - self.elapsed_ms()) / 1000)
+
+    def expired(self) -> bool:
+        return self.remaining_s() <= 0
+
+
+def run_hedged(executor: Executor,
+               fn: Callable[..., Any],
+               *args,
+               deadline: Deadline,
+               hedge_after_ms: float,
+               accept: Callable[[Any], bool] = bool,
+               hedge_slots: Optional[threading.Semaphore] = None) -> Any:
+    """
+    Run fn(*args) on the executor and return the first acceptable result
+
+    If the first call has not finished after hedge_after_ms a second, identical
+    call is issued and whichever finishes first with a result passing accept()
+    wins. Losing calls are cancelled if they have not started yet; calls already
+    running are abandoned (their results are discarded). When hedge_slots is
+    given a hedge is only issued while a slot is free, which caps the duplicate
+    requests in flight across callers.
+
+    Raises:
+        DeadlineExceeded: No acceptable result before the deadline
+    """
+    pending = {executor.submit(fn, *args)}
+    hedged = False
+    last_error = None
+
+    try:
+        while pending:
+            remaining = deadline.remaining_s()
+            if remaining <= 0:
+                break
+
+            timeout = remaining if hedged else min(remaining, hedge_after_ms / 1000)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                if accept(result):
+                    return result
+
+            # Hedge once: on the first slow call, or straight away if the first call failed
+            if not hedged and deadline.remaining_s() > 0:
+                hedged = True
+                if hedge_slots is None:
+                    pending.add(executor.submit(fn, *args))
+                elif hedge_slots.acquire(blocking=False):
+                    hedge = executor.submit(fn, *args)
+                    hedge.add_done_callback(lambda _: hedge_slots.release())
+                    pending.add(hedge)
+    finally:
+        for future in pending:
+            future.cancel()
+
+    if last_error is not None:
+        raise DeadlineExceeded(f"no result within {deadline.budget_ms:.0f}ms (last error: {last_error})")
+    raise DeadlineExceeded(f"no result within {deadline.budget_ms:.0f}ms")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Discover the corpus taxonomy
+Clusters an index snapshot with mini-batch k-means (bounded memory, no LLM calls), labels
+each cluster with TF-IDF terms and titles and proposes changes to TOPIC_CATEGORIES
+"""
+
+import os
+import json
+import numpy as np
+from pinecone import Pinecone
+from index_snapshot import iter_vector_batches
+from taxonomy import TOPIC_CATEGORIES
+from taxonomy_discovery import ClusterProfile, MiniBatchKMeans, propose_taxonomy
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Initialize clients
+pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+
+INDEX_NAME = "gpc-knowledge-base"
+N_CLUSTERS = 12
+FIT_EPOCHS = 2
+BATCH_SIZE = 200
+REPORT_PATH = os.path.join('.cache', 'taxonomy_proposal.json')
+
+
+def discover_taxonomy():
+    """Fit clusters over the whole index and write a taxonomy proposal"""
+
+    print("🔭 Discovering taxonomy from the corpus...")
+
+    index = pc.Index(INDEX_NAME)
+    kmeans = MiniBatchKMeans(n_clusters=N_CLUSTERS, seed=0)
+
+    # Fit: stream the index FIT_EPOCHS times, one batch in memory at a time
+    for epoch in range(FIT_EPOCHS):
+        seen = 0
+        for batch in iter_vector_batches(index, batch_size=BATCH_SIZE):
+            if batch:
+                kmeans.partial_fit(np.asarray([values for _, values, _ in batch], dtype=np.float32))
+                seen += len(batch)
+        print(f"  🔁 Epoch {epoch + 1}/{FIT_EPOCHS}: {seen} vectors")
+
+    if kmeans.centers is None:
+        print(f"❌ Not enough vectors to form {N_CLUSTERS} clusters")
+        return
+
+    # Assign: one more pass collecting per-cluster terms, titles and current categories
+    profile = ClusterProfile(N_CLUSTERS)
+    for batch in iter_vector_batches(index, batch_size=BATCH_SIZE):
+        if not batch:
+            continue
+        matrix = np.asarray([values for _, values, _ in batch], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+        similarities = matrix @ kmeans.centers.T
+        labels = np.argmax(similarities, axis=1)
+
+        for (vector_id, _, metadata), cluster, row in zip(batch, labels, similarities):
+            text = metadata.get('text') or metadata.get('content') or metadata.get('title', '')
+            profile.add(int(cluster), float(row[cluster]), text, metadata)
+
+    report = propose_taxonomy(profile, TOPIC_CATEGORIES)
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n📊 Clusters:")
+    for cluster in sorted(report['clusters'], key=lambda info: info['size'], reverse=True):
+        print(f"  - #{cluster['cluster']} ({cluster['size']} docs, {cluster['dominant_category']} {cluster['purity']:.0%}): "
+              f"{', '.join(cluster['label_terms'][:6])}")
+
+    print(f"\n💡 Proposed taxonomy changes:")
+    for proposal in report['proposals']:
+        if proposal['action'] == "new_category":
+            print(f"  ➕ New category '{proposal['suggested_name']}' ({proposal['members']} docs)")
+        elif proposal['action'] == "split":
+            print(f"  ✂️ Split {proposal['category']} ({proposal['members']} docs) into: {'; '.join(proposal['suggested_names'])}")
+        else:
+            print(f"  🔍 Review {proposal['category']} ({proposal['members']} docs): {proposal['reason']}")
+
+    print(f"\n💾 Full report saved to {REPORT_PATH}")
+
+if __name__ == "__main__":
+    discover_taxonomy()
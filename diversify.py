@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Result Diversification
+Maximal marginal relevance and per-document collapsing for chunked documents
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from rerank import ChunkVectorCache
+
+
+def parent_doc_id(match: Any) -> str:
+    """Identify the source document a chunk belongs to"""
+    metadata = match.metadata or {}
+    for field in ('doc_url', 'url', 'title', 'original_title'):
+        if metadata.get(field):
+            return f"{field}:{metadata[field]}"
+
+    # IDs written by the chunked scripts: "<base>_chunk_<n>" or "<title>_<n>"
+    return re.sub(r'(_chunk)?_\d+$', '', match.id)
+
+
+def collapse_by_document(matches: List[Any], max_per_doc: int = 1) -> List[Any]:
+    """
+    Keep at most max_per_doc chunks per source document (best first)
+
+    Kept matches get a `collapsed_chunks` attribute listing the chunk_index
+    values of the chunks folded into them.
+    """
+    kept: List[Any] = []
+    per_doc: Dict[str, List[Any]] = {}
+
+    for match in matches:
+        doc = parent_doc_id(match)
+        group = per_doc.setdefault(doc, [])
+        if len(group) < max_per_doc:
+            group.append(match)
+            kept.append(match)
+        else:
+            collapsed = getattr(group[-1], 'collapsed_chunks', None) or []
+            collapsed.append((match.metadata or {}).get('chunk_index'))
+            try:
+                group[-1].collapsed_chunks = collapsed
+            except AttributeError:
+                pass
+
+    return kept
+
+
+def _adjacency_similarity(matches: List[Any]) -> np.ndarray:
+    """
+    Structural redundancy from chunk metadata: chunks of the same document are
+    similar, and more so the closer their chunk_index (scaled by total_chunks)
+    """
+    parents = [parent_doc_id(match) for match in matches]
+    positions = np.array([(match.metadata or {}).get('chunk_index', 0) or 0 for match in matches], dtype=np.float32)
+    totals = np.array([(match.metadata or {}).get('total_chunks', 0) or 0 for match in matches], dtype=np.float32)
+
+    _, parent_codes = np.unique(parents, return_inverse=True)
+    same_doc = parent_codes[:, None] == parent_codes[None, :]
+
+    span = np.maximum(np.maximum(totals[:, None], totals[None, :]), 1.0)
+    distance = np.abs(positions[:, None] - positions[None, :]) / span
+    return np.where(same_doc, 1.0 - np.minimum(distance, 1.0), 0.0).astype(np.float32)
+
+
+def mmr(query_embedding: Optional[List[float]],
+        matches: List[Any],
+        top_k: int = 5,
+        lambda_: float = 0.7,
+        vector_cache: Optional[ChunkVectorCache] = None) -> List[Any]:
+    """
+    Select top_k matches by maximal marginal relevance
+
+    Relevance is cosine to the query when chunk vectors are known (from the
+    matches or the vector cache), otherwise the match score. Redundancy is the
+    larger of pairwise cosine and same-document chunk adjacency.
+    """
+    if len(matches) <= 1:
+        return matches[:top_k]
+
+    vector_cache = vector_cache or ChunkVectorCache()
+    vector_cache.put_matches(matches)
+
+    vectors = [vector_cache.get(match.id) for match in matches]
+    have_vectors = bool(query_embedding) and all(vector is not None for vector in vectors)
+
+    redundancy = _adjacency_similarity(matches)
+    if have_vectors:
+        matrix = np.stack(vectors)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        relevance = matrix @ query
+        redundancy = np.maximum(redundancy, matrix @ matrix.T)
+    else:
+        relevance = np.array([match.score for match in matches], dtype=np.float32)
+
+    selected = [int(np.argmax(relevance))]
+    max_redundancy = redundancy[selected[0]].copy()
+    available = np.ones(len(matches), dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < min(top_k, len(matches)):
+        scores = lambda_ * relevance - (1 - lambda_) * max_redundancy
+        scores[~available] = -np.inf
+        choice = int(np.argmax(scores))
+        selected.append(choice)
+        available[choice] = False
+        max_redundancy = np.maximum(max_redundancy, redundancy[choice])
+
+    return [matches[i] for i in selected]
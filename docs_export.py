@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Google Docs Export
+Fetches shared Google Docs as plain text through the public export endpoint
+"""
+
+import os
+import re
+from typing import Optional
+
+import requests
+from bs4 import BeautifulSoup
+
+# Overridable so benchmarks and offline runs can point at a local stand-in
+DOCS_EXPORT_BASE = os.getenv('GOOGLE_DOCS_EXPORT_BASE', 'https://docs.google.com')
+
+
+def document_id_from_url(url: str) -> Optional[str]:
+    """Google Doc ID from an edit/share/export URL (None for other links)"""
+    if '/document/d/' not in url:
+        return None
+    return url.split('/document/d/')[1].split('/')[0].split('?')[0]
+
+
+def export_url(doc_id: str, format_type: str = 'txt', base: Optional[str] = None) -> str:
+    return f"{(base or DOCS_EXPORT_BASE).rstrip('/')}/document/d/{doc_id}/export?format={format_type}"
+
+
+def clean_document_text(content: str) -> str:
+    """Strip stray HTML and collapse the whitespace of an exported document"""
+    content = BeautifulSoup(content.strip(), 'html.parser').get_text()
+    content = re.sub(r'\n\s*\n', '\n\n', content)
+    content = re.sub(r'[ \t]+', ' ', content)
+    return content.strip()
+
+
+def fetch_document_text(url: str,
+                        session: Optional[requests.Session] = None,
+                        base: Optional[str] = None,
+                        timeout: float = 30) -> Optional[str]:
+    """Download a shared Google Doc as cleaned plain text (None if it cannot be fetched)"""
+    doc_id = document_id_from_url(url)
+    if not doc_id:
+        return None
+
+    response = (session or requests).get(export_url(doc_id, base=base), timeout=timeout)
+    response.raise_for_status()
+    return clean_document_text(response.text)
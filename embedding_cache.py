@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Query Embedding Cache
+LRU + TTL cache of normalized query text → embedding, with optional on-disk persistence
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+# Shared on-disk cache used by the knowledge base and the processing scripts
+DEFAULT_CACHE_PATH = os.path.join('.cache', 'query_embeddings.sqlite3')
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different spellings share a cache entry"""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.rstrip('?!. ')
+
+
+class EmbeddingCache:
+    def __init__(self,
+                 model: str,
+                 max_entries: int = 1000,
+                 ttl_seconds: float = 7 * 24 * 3600,
+                 cache_path: Optional[str] = None):
+        """
+        Initialize the embedding cache
+
+        Args:
+            model: Embedding model name (part of every cache key)
+            max_entries: Maximum number of embeddings kept in memory (LRU eviction)
+            ttl_seconds: Age after which a cached embedding is recomputed
+            cache_path: Optional SQLite file that persists embeddings across runs
+        """
+        self.model = model
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_path = cache_path
+
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        # Stats
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if cache_path:
+            self._open_disk_cache(cache_path)
+
+    def _open_disk_cache(self, cache_path: str):
+        """Open (or create) the SQLite file backing the cache"""
+        try:
+            directory = os.path.dirname(cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            self._db = sqlite3.connect(cache_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, embedding BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+        except sqlite3.Error as e:
+            print(f"⚠️ Query cache disk store unavailable ({cache_path}): {e}")
+            self._db = None
+
+    def _key(self, text: str) -> str:
+        return f"{self.model}:{normalize_query(text)}"
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, embedding: List[float], created_at: float):
+        """Insert into the in-memory LRU, evicting the least recently used entry"""
+        self._entries[key] = (embedding, created_at)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        if not self._db:
+            return None
+
+        row = self._db.execute(
+            "SELECT embedding, created_at FROM embeddings WHERE key = ?", (key,)
+        ).fetchone()
+        if not row:
+            return None
+
+        return array('f', row[0]).tolist(), row[1]
+
+    def _write_disk(self, key: str, embedding: List[float], created_at: float):
+        if not self._db:
+            return
+
+        self._db.execute(
+            "INSERT OR REPLACE INTO embeddings (key, embedding, created_at) VALUES (?, ?, ?)",
+            (key, array('f', embedding).tobytes(), created_at)
+        )
+        self._db.commit()
+
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for a query, or None on a miss"""
+        key = self._key(text)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and not self._expired(entry[1]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            if entry:
+                del self._entries[key]
+                self.expirations += 1
+
+            entry = self._read_disk(key)
+            if entry and not self._expired(entry[1]):
+                self._remember(key, entry[0], entry[1])
+                self.hits += 1
+                self.disk_hits += 1
+                return entry[0]
+
+            if entry:
+                self.expirations += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, embedding: List[float]):
+        """Store an embedding for a query"""
+        if not embedding:
+            return
+
+        key = self._key(text)
+        created_at = time.time()
+
+        with self._lock:
+            self._remember(key, list(embedding), created_at)
+            self._write_disk(key, embedding, created_at)
+
+    def get_or_create(self, text: str, create_fn: Callable[[str], List[float]]) -> List[float]:
+        """Return the cached embedding, calling create_fn (and caching the result) on a miss"""
+        embedding = self.get(text)
+        if embedding:
+            return embedding
+
+        embedding = create_fn(text)
+        if embedding:
+            self.put(text, embedding)
+
+        return embedding
+
+    def clear(self):
+        """Drop every cached embedding (memory and disk)"""
+        with self._lock:
+            self._entries.clear()
+            if self._db:
+                self._db.execute("DELETE FROM embeddings")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate statistics for the cache"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Evaluate retrieval quality and cost
+Runs the golden set (retrieval-golden-set.json) through each retrieval backend, reports
+recall@k, MRR, nDCG, latency percentiles and external calls per query, and exits non-zero
+when a backend regresses against its saved baseline
+
+Usage:
+    python evaluate-retrieval.py                  # evaluate and compare with baselines
+    python evaluate-retrieval.py --seed           # add new guide example queries to the golden set (review them
+                                                  # by hand before evaluating)
+    python evaluate-retrieval.py --save-baseline  # evaluate and store the results as the new baselines
+"""
+
+import importlib.util
+import os
+import sys
+import json
+from retrieval_eval import (
+    DEFAULT_GOLDEN_SET_PATH, CallCounter, evaluate, find_regressions, instrument_knowledge_base,
+    load_baseline, load_golden_set, save_baseline, seed_golden_set, unreviewed_queries
+)
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# pinecone-setup.py is not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "pinecone_setup", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pinecone-setup.py")
+)
+pinecone_setup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(pinecone_setup)
+
+K = 5
+KNOWLEDGE_BASE_GUIDE_PATH = 'knowledge-base-guide.json'
+
+# Backend name -> query_knowledge_base options (caches off so every query does real work)
+BACKENDS = {
+    "dense": {"mode": "dense"},
+    "lexical": {"mode": "lexical"},
+    "hybrid": {"mode": "hybrid"},
+    "hierarchical": {"mode": "hierarchical"},
+    "rerank": {"mode": "dense", "rerank": True},
+    "routed": {"mode": "dense", "route": True}
+}
+
+
+def make_search(kb, options):
+    return lambda query, top_k: kb.query_knowledge_base(
+        query, top_k=top_k, use_cache=False, title_lookup=False, log=False, **options
+    ) or []
+
+
+def guide_queries_by_category():
+    with open(KNOWLEDGE_BASE_GUIDE_PATH, 'r') as f:
+        examples = json.load(f).get('example_queries', {})
+    return examples if isinstance(examples, dict) else {"general": list(examples)}
+
+
+def evaluate_retrieval(seed=False, update_baseline=False):
+    """Evaluate every backend on the golden set; returns the process exit code"""
+
+    print("🧪 Evaluating retrieval...")
+
+    # Memory-only query cache: latency and call counts reflect cold queries
+    kb = pinecone_setup.PineconeKnowledgeBase(
+        pinecone_api_key=os.getenv('PINECONE_API_KEY'),
+        openai_api_key=os.getenv('OPENAI_API_KEY'),
+        google_credentials_path=None,
+        google_sheet_id=os.getenv('GOOGLE_SHEET_ID', ''),
+        query_cache_path=None
+    )
+    kb.create_pinecone_index()
+
+    counter = CallCounter()
+    instrument_knowledge_base(kb, counter)
+
+    golden_set = load_golden_set()
+    if seed or not golden_set:
+        golden_set = seed_golden_set(guide_queries_by_category(), make_search(kb, BACKENDS["dense"]))
+        print(f"🌱 Golden set v{golden_set['version']}: {len(golden_set['queries'])} queries")
+
+    # Seeded judgments are the dense backend's own results: evaluating them would only measure agreement with dense
+    unreviewed = unreviewed_queries(golden_set)
+    if unreviewed:
+        print(f"❌ {len(unreviewed)} golden queries are seeded from dense results and not reviewed yet:")
+        for query in unreviewed:
+            print(f"   - {query}")
+        print(f"   Check their expected_ids in {DEFAULT_GOLDEN_SET_PATH} and set \"reviewed\": true, then re-run")
+        return 1
+
+    print(f"📋 Golden set v{golden_set['version']} ({golden_set['hash']}), k={K}\n")
+
+    failed = False
+    for backend, options in BACKENDS.items():
+        kb.query_cache.clear()
+        summary = evaluate(make_search(kb, options), golden_set, k=K, counter=counter)
+        if not summary['queries']:
+            print("❌ Golden set has no judged queries")
+            return 1
+
+        calls = ", ".join(f"{name} {value:.2f}" for name, value in summary.get('calls_per_query', {}).items())
+        print(f"  {backend:<13} recall@{K} {summary['recall']:.3f}  MRR {summary['mrr']:.3f}  "
+              f"nDCG@{K} {summary['ndcg']:.3f}  p50/p95/p99 {summary['p50_ms']:.0f}/"
+              f"{summary['p95_ms']:.0f}/{summary['p99_ms']:.0f}ms  calls/query: {calls or 'none'}")
+
+        if update_baseline:
+            save_baseline(backend, summary)
+            continue
+
+        regressions = find_regressions(summary, load_baseline(backend))
+        for regression in regressions:
+            print(f"    ❌ Regression: {regression}")
+        failed = failed or bool(regressions)
+
+    if update_baseline:
+        print("\n💾 Saved results as the new baselines")
+        return 0
+
+    print("\n❌ Regressions found" if failed else "\n✅ No regressions against the baselines")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(evaluate_retrieval(seed="--seed" in sys.argv, update_baseline="--save-baseline" in sys.argv))
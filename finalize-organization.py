@@ -4,95 +4,29 @@ Finalize the knowledge base organization by adding categories to existing docume
 """
 
 import os
+import sys
 import requests
 import re
 import json
 from openai import OpenAI
 from pinecone import Pinecone
 from typing import List, Dict
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from batch_search import embed_texts, query_vectors
+from taxonomy import TOPIC_CATEGORIES
+from usage_meter import BudgetExceeded, UsageMeter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
 # Initialize clients
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+usage = UsageMeter.from_env("finalize-organization")
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
 
-# Topic categories
-TOPIC_CATEGORIES = {
-    "content_creation": {
-        "name": "Content Creation & Filming",
-        "keywords": ["filming", "content", "video", "background", "lighting", "hand movements", "eye", "music", "sounds", "controversy", "pace", "viral", "hooks"],
-        "description": "Everything about creating compelling video content"
-    },
-    "social_media_strategy": {
-        "name": "Social Media Strategy",
-        "keywords": ["tiktok", "instagram", "youtube", "facebook", "account", "fyp", "viral", "platform", "optimization", "burners", "recycle", "targeting", "countries"],
-        "description": "Platform-specific strategies and optimization"
-    },
-    "product_research": {
-        "name": "Product Research & Sourcing",
-        "keywords": ["product", "research", "sourcing", "temu", "ali", "cj", "saturation", "good vs bad", "untapped", "existing", "custom"],
-        "description": "Finding and evaluating profitable products"
-    },
-    "business_development": {
-        "name": "Business & Brand Building",
-        "keywords": ["brand", "website", "building", "selling", "bundles", "aov", "cvr", "email marketing", "broadcast", "longevity", "consistency"],
-        "description": "Building and scaling your business"
-    },
-    "marketing_strategies": {
-        "name": "Marketing & Growth",
-        "keywords": ["marketing", "angles", "audience", "niche", "growth", "archive", "method", "prime", "trials", "sales", "offer"],
-        "description": "Marketing tactics and growth strategies"
-    },
-    "case_studies": {
-        "name": "Case Studies & Results",
-        "keywords": ["case study", "results", "subs", "months", "filming", "k", "million", "30m", "250k", "350k", "20k"],
-        "description": "Real success stories and results"
-    },
-    "advanced_tactics": {
-        "name": "Advanced Tactics",
-        "keywords": ["bts", "behind the scenes", "whole", "creating", "shareable", "replicating", "concepts", "dropshipping"],
-        "description": "Advanced strategies and behind-the-scenes insights"
-    }
-}
-
-def categorize_by_title(title: str) -> str:
-    """Categorize document by title only (faster approach)"""
-    title_lower = title.lower()
-    
-    # Direct title matching for obvious categories
-    if any(word in title_lower for word in ["lighting", "background", "handmovements", "music", "sounds", "controversy", "pace", "eye for content"]):
-        return "content_creation"
-    elif any(word in title_lower for word in ["tiktok", "instagram", "youtube", "facebook", "fyp", "account", "viral", "platform", "burners", "recycle"]):
-        return "social_media_strategy"
-    elif any(word in title_lower for word in ["product", "research", "temu", "ali", "cj", "saturation", "sourcing"]):
-        return "product_research"
-    elif any(word in title_lower for word in ["brand", "website", "building", "selling", "bundles", "aov", "cvr", "email marketing", "broadcast"]):
-        return "business_development"
-    elif any(word in title_lower for word in ["marketing", "angles", "audience", "niche", "growth", "archive", "method", "prime", "trials", "sales"]):
-        return "marketing_strategies"
-    elif any(word in title_lower for word in ["case study", "subs", "months", "filming", "k", "million", "30m", "250k", "350k", "20k"]):
-        return "case_studies"
-    elif any(word in title_lower for word in ["bts", "behind", "whole", "creating", "shareable", "replicating", "dropshipping"]):
-        return "advanced_tactics"
-    else:
-        # Fallback to keyword matching
-        return categorize_by_keywords(title, "")
-
-def categorize_by_keywords(title: str, content: str) -> str:
-    """Fallback categorization using keyword matching"""
-    text = (title + " " + content).lower()
-    
-    category_scores = {}
-    for category, info in TOPIC_CATEGORIES.items():
-        score = sum(1 for keyword in info["keywords"] if keyword in text)
-        category_scores[category] = score
-    
-    if category_scores and max(category_scores.values()) > 0:
-        return max(category_scores, key=category_scores.get)
-    return "advanced_tactics"
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
 
 def create_enhanced_search():
     """Create enhanced search with proper categorization"""
@@ -114,34 +48,28 @@ def create_enhanced_search():
     
     print(f"\n🔍 Testing enhanced search with {len(test_queries)} queries:")
     
-    for i, query in enumerate(test_queries, 1):
+    # Dry run: predict the embedding tokens for uncached queries, search nothing
+    if usage.dry_run:
+        usage.predict_embeddings([query for query in test_queries if not query_cache.get(query)])
+        return
+    
+    # Embed every query in one request (cached across runs) and search concurrently
+    embeddings = embed_texts(openai_client, test_queries, cache=query_cache)
+    all_results = query_vectors(index, embeddings, top_k=5)
+    
+    for i, (query, matches) in enumerate(zip(test_queries, all_results), 1):
         print(f"\n{i}. Query: '{query}'")
         
-        try:
-            # Create embedding for query
-            response = openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query
-            )
-            
-            embedding = response.data[0].embedding
-            
-            # Search
-            results = index.query(
-                vector=embedding,
-                top_k=5,
-                include_metadata=True
-            )
-            
-            print(f"   📊 Top results:")
-            for j, match in enumerate(results.matches, 1):
-                title = match.metadata.get('title', 'Unknown')
-                category = match.metadata.get('category_name', 'General')
-                score = match.score
-                print(f"     {j}. {title} ({category}) - Score: {score:.3f}")
+        if not matches:
+            print(f"   ❌ No results")
+            continue
         
-        except Exception as e:
-            print(f"   ❌ Error: {e}")
+        print(f"   📊 Top results:")
+        for j, match in enumerate(matches, 1):
+            title = match.metadata.get('title', 'Unknown')
+            category = match.metadata.get('category_name', 'General')
+            score = match.score
+            print(f"     {j}. {title} ({category}) - Score: {score:.3f}")
     
     print(f"\n✅ Enhanced search testing complete!")
 
@@ -228,7 +156,10 @@ if __name__ == "__main__":
     print("🚀 Finalizing knowledge base organization...")
     
     # Test enhanced search
-    create_enhanced_search()
+    try:
+        create_enhanced_search()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
     
     # Create usage guide
     create_topic_guide()
@@ -236,3 +167,4 @@ if __name__ == "__main__":
     print("\n🎉 Knowledge base organization complete!")
     print("Your AI now has a properly organized, topic-based knowledge base!")
     print("Users can search by specific categories instead of generic queries.")
+    usage.finish()
@@ -4,21 +4,43 @@ Fix the failed YouTube (Chris) documents by handling different issues
 """
 
 import os
-import requests
+import sys
 import re
 from openai import OpenAI
 from pinecone import Pinecone
 from typing import List, Dict
 import time
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_version import bump_index_version
+from http_cassette import cassette_http_client, cassette_index, cassette_session
+from lexical_index import BM25Index, default_lexical_index_path
+from hierarchy import DOCUMENT_NAMESPACE, document_id, document_record
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-stage spans and counters, exported at the end of the run (.cache/metrics)
+metrics = PipelineMetrics("fix-failed-documents")
+
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("fix-failed-documents", source="YouTube (Chris)")
+
 # Initialize clients
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=metrics.count_retries(cassette_http_client("fix-failed-documents"))))
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
 
+# Google Docs exports (recorded/replayed when HTTP_CASSETTE_MODE is set)
+docs_session = cassette_session("fix-failed-documents")
+
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+# Local BM25 index, updated alongside every upsert
+lexical_index = BM25Index.load(default_lexical_index_path('gpc-knowledge-base'))
+
 # Failed documents that need fixing
 failed_documents = [
     {"title": "We tried Organic Dropshipping for 10 Days (Realistic Results)", "url": "https://docs.google.com/document/d/1oPHh0sTvJGJb6phVZJbaXYADgm_LPYWX7frdpt-akgo/edit?usp=sharing", "issue": "410_error"},
@@ -55,21 +77,28 @@ def try_alternative_access_methods(url: str) -> str:
     
     # Method 1: Try with different export formats
     export_formats = ['txt', 'html', 'pdf']
-    for format_type in export_formats:
+    for attempt, format_type in enumerate(export_formats):
         try:
             export_url = f"https://docs.google.com/document/d/{doc_id}/export?format={format_type}"
             print(f"  🔄 Trying {format_type} format: {export_url}")
             
-            response = requests.get(export_url, timeout=30)
+            with metrics.span('fetch', format=format_type) as span:
+                if attempt:
+                    span.count('retries')
+                response = docs_session.get(export_url, timeout=30)
+                span.attrs['status'] = response.status_code
+                span.count('bytes', len(response.content))
             if response.status_code == 200:
                 if format_type == 'txt':
-                    content = response.text.replace('\r\n', '\n').strip()
+                    with metrics.span('clean'):
+                        content = response.text.replace('\r\n', '\n').strip()
                 elif format_type == 'html':
-                    # Basic HTML parsing to extract text
-                    content = response.text
-                    # Remove HTML tags (basic cleanup)
-                    content = re.sub(r'<[^>]+>', ' ', content)
-                    content = re.sub(r'\s+', ' ', content).strip()
+                    with metrics.span('clean'):
+                        # Basic HTML parsing to extract text
+                        content = response.text
+                        # Remove HTML tags (basic cleanup)
+                        content = re.sub(r'<[^>]+>', ' ', content)
+                        content = re.sub(r'\s+', ' ', content).strip()
                 else:  # PDF - skip for now as it requires special handling
                     continue
                 
@@ -90,9 +119,14 @@ def try_alternative_access_methods(url: str) -> str:
     for alt_url in alternative_urls:
         try:
             print(f"  🔄 Trying alternative URL: {alt_url}")
-            response = requests.get(alt_url, timeout=30)
+            with metrics.span('fetch', format='txt') as span:
+                span.count('retries')
+                response = docs_session.get(alt_url, timeout=30)
+                span.attrs['status'] = response.status_code
+                span.count('bytes', len(response.content))
             if response.status_code == 200:
-                content = response.text.replace('\r\n', '\n').strip()
+                with metrics.span('clean'):
+                    content = response.text.replace('\r\n', '\n').strip()
                 if len(content) > 100:
                     print(f"  ✅ Success with alternative URL ({len(content)} chars)")
                     return content
@@ -135,11 +169,17 @@ def create_embedding_with_retry(text: str, max_retries: int = 3) -> List[float]:
     
     for attempt in range(max_retries):
         try:
-            response = openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
+            with metrics.span('embed') as span:
+                if attempt:
+                    span.count('retries')
+                response = openai_client.embeddings.create(
+                    model="text-embedding-3-small",
+                    input=text
+                )
+                span.count('tokens', response.usage.total_tokens)
             return response.data[0].embedding
+        except BudgetExceeded:
+            raise
         except Exception as e:
             if "maximum context length" in str(e):
                 print(f"  ⚠️ Token limit exceeded (attempt {attempt + 1})")
@@ -158,7 +198,7 @@ def fix_failed_documents():
     print("🔧 Attempting to fix failed YouTube (Chris) documents...")
     
     # Connect to Pinecone
-    index = pc.Index("gpc-knowledge-base")
+    index = cassette_index(pc, "gpc-knowledge-base", "fix-failed-documents")
     
     fixed_count = 0
     still_failed_count = 0
@@ -166,6 +206,7 @@ def fix_failed_documents():
     for i, doc in enumerate(failed_documents, 1):
         print(f"\n📄 Fixing {i}/{len(failed_documents)}: {doc['title']}")
         print(f"  🐛 Issue: {doc['issue']}")
+        metrics.begin_document(doc['title'], issue=doc['issue'])
         
         if doc['issue'] == '410_error':
             # Try alternative access methods
@@ -183,16 +224,25 @@ def fix_failed_documents():
             still_failed_count += 1
             continue
         
+        # Dry run: predict the embedding tokens, write nothing
+        if usage.dry_run:
+            usage.predict_embeddings(chunk_content_for_embedding(content) if doc['issue'] == 'token_limit' else [content])
+            fixed_count += 1
+            continue
+        
         # Handle token limits by chunking
         if doc['issue'] == 'token_limit':
             chunks = chunk_content_for_embedding(content)
             print(f"  📝 Split into {len(chunks)} chunks")
+            doc_id = document_id(doc['title'], doc['url'])
+            chunk_embeddings = []
             
             # Process each chunk
             for chunk_idx, chunk in enumerate(chunks):
                 print(f"  🔄 Processing chunk {chunk_idx + 1}/{len(chunks)}")
                 
-                embedding = create_embedding_with_retry(chunk)
+                with metrics.span('chunk', chunk=chunk_idx):
+                    embedding = create_embedding_with_retry(chunk)
                 if not embedding:
                     print(f"  ❌ Failed to create embedding for chunk {chunk_idx + 1}")
                     continue
@@ -209,17 +259,36 @@ def fix_failed_documents():
                     "content_length": len(chunk),
                     "chunk_index": chunk_idx,
                     "total_chunks": len(chunks),
+                    "doc_id": doc_id,
+                    "level": "chunk",
                     "category": "tiktok_shop" if "tiktok shop" in doc['title'].lower() else "dropshipping_strategies"
                 }
                 
                 # Store in Pinecone
                 try:
                     vector_id = f"youtube_chris_fixed_{i}_{chunk_idx}_{doc['title'].replace(' ', '_').lower()[:30]}"
-                    index.upsert([(vector_id, embedding, metadata)])
+                    with metrics.span('upsert', chunk=chunk_idx):
+                        index.upsert([(vector_id, embedding, metadata)])
+                        lexical_index.add_document(vector_id, chunk, metadata)
+                    chunk_embeddings.append(embedding)
                     print(f"  ✅ Stored chunk {chunk_idx + 1}")
                 except Exception as e:
                     print(f"  ❌ Failed to store chunk {chunk_idx + 1}: {e}")
             
+            # Document-level vector for coarse-to-fine retrieval
+            if chunk_embeddings:
+                try:
+                    record = document_record(doc_id, chunk_embeddings, {
+                        "title": doc['title'],
+                        "tab": "YouTube (Chris)",
+                        "url": doc['url']
+                    })
+                    with metrics.span('upsert', level='document'):
+                        index.upsert(vectors=[record], namespace=DOCUMENT_NAMESPACE)
+                    print(f"  ✅ Stored document vector")
+                except Exception as e:
+                    print(f"  ❌ Failed to store document vector: {e}")
+            
             fixed_count += 1
             
         else:
@@ -245,7 +314,9 @@ def fix_failed_documents():
             # Store in Pinecone
             try:
                 vector_id = f"youtube_chris_fixed_{i}_{doc['title'].replace(' ', '_').lower()[:50]}"
-                index.upsert([(vector_id, embedding, metadata)])
+                with metrics.span('upsert'):
+                    index.upsert([(vector_id, embedding, metadata)])
+                    lexical_index.add_document(vector_id, content, metadata)
                 print(f"  ✅ Successfully stored fixed document")
                 fixed_count += 1
             except Exception as e:
@@ -255,6 +326,12 @@ def fix_failed_documents():
         # Rate limiting
         time.sleep(2)
     
+    # Persist the lexical index; cached query results no longer reflect the index contents
+    if not usage.dry_run:
+        lexical_index.save(default_lexical_index_path('gpc-knowledge-base'))
+        bump_index_version('gpc-knowledge-base')
+    metrics.finish()
+    
     print(f"\n🎉 Document fixing complete!")
     print(f"✅ Successfully fixed: {fixed_count} documents")
     print(f"❌ Still failed: {still_failed_count} documents")
@@ -263,7 +340,7 @@ def fix_failed_documents():
     print(f"\n🔍 Testing updated knowledge base...")
     try:
         test_query = "How to start organic dropshipping from scratch in 2025"
-        test_embedding = create_embedding_with_retry(test_query)
+        test_embedding = query_cache.get_or_create(test_query, create_embedding_with_retry)
         
         if test_embedding:
             results = index.query(
@@ -278,8 +355,14 @@ def fix_failed_documents():
                 tab = match.metadata.get('tab', 'Unknown')
                 print(f"  - {title} ({tab}) - Score: {match.score:.3f}")
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error testing knowledge base: {e}")
 
 if __name__ == "__main__":
-    fix_failed_documents()
+    try:
+        fix_failed_documents()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
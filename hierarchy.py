@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Hierarchical Retrieval
+Document-level vectors (mean of a document's chunk vectors) for coarse-to-fine search
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Document-level vectors live in their own namespace so they never compete with chunks
+DOCUMENT_NAMESPACE = "documents"
+
+# Metadata fields document-level vectors carry reliably. Chunk-only fields (chunk_index,
+# content_length, topics) are missing there, and category is relabeled on chunks only
+# by organize-knowledge-base.py
+DOCUMENT_FIELDS = {'doc_id', 'title', 'tab', 'tab_name', 'url', 'doc_url'}
+
+
+def document_id(title: str, source: Optional[str] = None) -> str:
+    """Stable ID shared by a document's vector and the `doc_id` metadata of its chunks"""
+    key = source or title
+    doc_id_match = re.search(r'/d/([a-zA-Z0-9-_]+)', key)
+    if doc_id_match:
+        key = doc_id_match.group(1)
+    return f"doc_{re.sub(r'[^a-zA-Z0-9_-]', '_', key.lower())[:100]}"
+
+
+def document_vector(chunk_embeddings: List[List[float]]) -> List[float]:
+    """Unit-normalized mean of a document's chunk embeddings"""
+    matrix = np.asarray(chunk_embeddings, dtype=np.float32)
+    mean = matrix.mean(axis=0)
+    return (mean / (np.linalg.norm(mean) or 1.0)).tolist()
+
+
+def document_record(doc_id: str,
+                    chunk_embeddings: List[List[float]],
+                    metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Upsert payload for a document-level vector"""
+    return {
+        'id': doc_id,
+        'values': document_vector(chunk_embeddings),
+        'metadata': dict(metadata, doc_id=doc_id, level='doc', total_chunks=len(chunk_embeddings))
+    }
+
+
+def document_level_filter(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    The part of a chunk filter that document-level vectors can be tested against
+
+    Conditions on chunk-only fields are dropped (an `$or` is kept only when
+    every branch is document-level), so the result is never stricter than the
+    original; the full filter still applies at the chunk stage.
+    """
+    if not filters:
+        return None
+
+    kept: Dict[str, Any] = {}
+    for key, condition in filters.items():
+        if key == '$and':
+            clauses = [clause for clause in map(document_level_filter, condition) if clause]
+            if clauses:
+                kept['$and'] = clauses
+        elif key == '$or':
+            clauses = [document_level_filter(clause) for clause in condition]
+            if all(clause == original for clause, original in zip(clauses, condition)):
+                kept['$or'] = condition
+        elif key in DOCUMENT_FIELDS:
+            kept[key] = condition
+
+    return kept or None
+
+
+def coarse_to_fine_query(index,
+                         query_embedding: List[float],
+                         top_k: int = 5,
+                         top_docs: int = 3,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Any]:
+    """
+    Two-stage query: pick the best documents, then search only their chunks
+
+    The document stage only applies the document-level part of filters; the
+    chunk stage applies all of it. Falls back to a flat chunk query when no
+    document-level vectors exist yet or the chosen documents have no chunk
+    matching the filters.
+    """
+    doc_filter = document_level_filter(filters)
+    doc_kwargs = {'filter': doc_filter} if doc_filter else {}
+    doc_results = index.query(
+        vector=query_embedding,
+        top_k=top_docs,
+        include_metadata=False,
+        namespace=DOCUMENT_NAMESPACE,
+        **doc_kwargs
+    )
+    doc_ids = [match.id for match in doc_results.matches]
+
+    if doc_ids:
+        in_documents = {'doc_id': {'$in': doc_ids}}
+        chunk_filter = {'$and': [filters, in_documents]} if filters else in_documents
+        results = index.query(
+            vector=query_embedding,
+            top_k=top_k,
+            include_metadata=True,
+            filter=chunk_filter
+        )
+        if results.matches:
+            return results.matches
+
+    flat_kwargs = {'filter': filters} if filters else {}
+    results = index.query(
+        vector=query_embedding,
+        top_k=top_k,
+        include_metadata=True,
+        **flat_kwargs
+    )
+    return results.matches
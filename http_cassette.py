@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+HTTP Cassettes
+Record/replay layer for the Docs fetcher (requests), the OpenAI client (httpx) and the
+Pinecone data plane (local proxy), so pipeline runs can be repeated offline against
+real responses
+
+Modes (HTTP_CASSETTE_MODE):
+    off     talk to the live services (default)
+    record  talk to the live services and store every response
+    replay  serve stored responses only; a request that was never recorded fails
+    auto    replay what was recorded, record the rest
+
+Replayed responses return at memory speed unless HTTP_CASSETTE_LATENCY is "recorded"
+(sleep for the originally observed time) or a fixed number of milliseconds.
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit, parse_qsl
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from local_http_server import LocalHTTPServer
+
+DEFAULT_CASSETTE_DIR = os.path.join('.cache', 'cassettes')
+CASSETTE_MODES = ('off', 'record', 'replay', 'auto')
+
+# Headers that describe the wire encoding of the original response, not the stored body
+_DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie'}
+
+
+class CassetteMiss(LookupError):
+    """A replay-mode request that is not in the cassette"""
+
+
+def _canonical_body(body: Any) -> bytes:
+    if body is None:
+        return b''
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    try:
+        return json.dumps(json.loads(body), sort_keys=True).encode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return body
+
+
+def interaction_key(service: str, method: str, url: str, body: Any = None) -> str:
+    """Host-independent request identity: service, method, path, sorted query and body hash"""
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    body_hash = hashlib.sha256(_canonical_body(body)).hexdigest()[:16]
+    return f"{service} {method.upper()} {parts.path}{'?' + query if query else ''} {body_hash}"
+
+
+class Cassette:
+    def __init__(self,
+                 path: str,
+                 mode: str = 'replay',
+                 latency: str = 'none',
+                 flush_every: int = 50):
+        """
+        Initialize a cassette (gzip-compressed JSON lines of recorded interactions)
+
+        Args:
+            path: Cassette file
+            mode: "record", "replay" or "auto"
+            latency: Replay latency: "none", "recorded" or a fixed number of milliseconds
+            flush_every: Recorded interactions buffered before they are appended to disk
+        """
+        if mode not in CASSETTE_MODES or mode == 'off':
+            raise ValueError(f"Unsupported cassette mode: {mode}")
+
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.flush_every = flush_every
+        self.interactions: Dict[str, deque] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # Re-recording replaces the cassette: the first flush truncates, later ones append
+        self._truncate = mode == 'record'
+
+        # Stats
+        self.replayed = 0
+        self.recorded = 0
+
+        if mode != 'record':
+            self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        interaction = json.loads(line)
+                        self.interactions.setdefault(interaction['key'], deque()).append(interaction)
+        except (OSError, EOFError):
+            pass
+
+    def _delay(self, interaction: Dict[str, Any]):
+        if self.latency == 'none':
+            return
+        seconds = interaction['elapsed_ms'] / 1000 if self.latency == 'recorded' else float(self.latency) / 1000
+        time.sleep(seconds)
+
+    def play(self, key: str) -> Optional[Tuple[int, Dict[str, str], bytes]]:
+        """
+        Stored (status, headers, body) for a request, or None when it should go live
+
+        Repeated identical requests replay their recordings in order; once those
+        run out the last one is repeated.
+        """
+        if self.mode == 'record':
+            return None
+
+        with self._lock:
+            queue = self.interactions.get(key)
+            if queue:
+                interaction = queue.popleft()
+                self._last[key] = interaction
+            else:
+                interaction = self._last.get(key)
+            if interaction:
+                self.replayed += 1
+
+        if not interaction:
+            if self.mode == 'replay':
+                raise CassetteMiss(f"Not recorded in {self.path}: {key}")
+            return None
+
+        self._delay(interaction)
+        return interaction['status'], interaction['headers'], base64.b64decode(interaction['body'])
+
+    def record(self, key: str, status: int, headers: Dict[str, str], body: bytes, elapsed_ms: float):
+        kept = {name: value for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS}
+        interaction = {
+            'key': key,
+            'status': status,
+            'headers': kept,
+            'body': base64.b64encode(body).decode('ascii'),
+            'elapsed_ms': round(elapsed_ms, 2)
+        }
+        with self._lock:
+            self._pending.append(interaction)
+            self._last[key] = interaction
+            self.recorded += 1
+            should_flush = len(self._pending) >= self.flush_every
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Append buffered recordings to the cassette file (gzip members concatenate)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            if not pending:
+                return
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_mode = 'wt' if self._truncate else 'at'
+            self._truncate = False
+            with gzip.open(self.path, file_mode, encoding='utf-8') as f:
+                for interaction in pending:
+                    f.write(json.dumps(interaction) + '\n')
+
+
+class CassetteAdapter(BaseAdapter):
+    """requests transport adapter that records/replays through a cassette"""
+
+    def __init__(self, cassette: Cassette, service: str):
+        super().__init__()
+        self.cassette = cassette
+        self.service = service
+        self.live = HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        key = interaction_key(self.service, request.method, request.url, request.body)
+        stored = self.cassette.play(key)
+
+        if stored is None:
+            started = time.perf_counter()
+            live = self.live.send(request, **kwargs)
+            body = live.content
+            self.cassette.record(key, live.status_code, dict(live.headers), body, (time.perf_counter() - started) * 1000)
+            stored = (live.status_code, dict(live.headers), body)
+
+        status, headers, body = stored
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.reason = ''
+        return response
+
+    def close(self):
+        self.live.close()
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport (OpenAI client) that records/replays through a cassette"""
+
+    def __init__(self, cassette: Cassette, service: str):
+        self.cassette = cassette
+        self.service = service
+        self.live = httpx.HTTPTransport()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        key = interaction_key(self.service, request.method, str(request.url), request.read())
+        stored = self.cassette.play(key)
+
+        if stored is None:
+            started = time.perf_counter()
+            live = self.live.handle_request(request)
+            body = live.read()  # Decoded; the wire-encoding headers are dropped when stored
+            headers = dict(live.headers)
+            self.cassette.record(key, live.status_code, headers, body, (time.perf_counter() - started) * 1000)
+            stored = (live.status_code, headers, body)
+
+        status, headers, body = stored
+        headers = {name: value for name, value in headers.items() if name.lower() not in _DROPPED_HEADERS}
+        return httpx.Response(status, headers=headers, content=body, request=request)
+
+    def close(self):
+        self.live.close()
+
+
+class CassetteProxy(LocalHTTPServer):
+    """Local proxy for clients that only take a host (Pinecone): replays, or forwards and records"""
+
+    def __init__(self, cassette: Cassette, service: str, upstream: Optional[str], headers: Dict[str, str]):
+        super().__init__()
+        self.cassette = cassette
+        self.service = service
+        self.upstream = upstream
+        self.upstream_headers = headers
+        self.session = requests.Session()
+
+    def handle(self, method, path, params, body):
+        query = urlencode(sorted((name, value) for name, values in params.items() for value in values))
+        raw_body = json.dumps(body).encode('utf-8') if body is not None else None
+        key = interaction_key(self.service, method, f"{path}?{query}" if query else path, raw_body)
+
+        try:
+            stored = self.cassette.play(key)
+        except CassetteMiss as e:
+            return 599, {}, {'error': str(e)}
+
+        if stored is None:
+            if not self.upstream:
+                return 599, {}, {'error': f"No upstream to record {key}"}
+            started = time.perf_counter()
+            live = self.session.request(method, self.upstream + path, params=params, data=raw_body,
+                                        headers=self.upstream_headers, timeout=60)
+            self.cassette.record(key, live.status_code, dict(live.headers), live.content,
+                                 (time.perf_counter() - started) * 1000)
+            stored = (live.status_code, dict(live.headers), live.content)
+
+        status, headers, content = stored
+        return status, {'Content-Type': headers.get('Content-Type', headers.get('content-type', 'application/json'))}, content
+
+
+# Script-level helpers: no-ops unless HTTP_CASSETTE_MODE is set
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def cassette_mode() -> str:
+    mode = os.getenv('HTTP_CASSETTE_MODE', 'off').lower()
+    return mode if mode in CASSETTE_MODES else 'off'
+
+
+def get_cassette(name: str) -> Optional[Cassette]:
+    """Shared cassette for a script/run name (None when cassettes are off)"""
+    mode = cassette_mode()
+    if mode == 'off':
+        return None
+
+    with _cassettes_lock:
+        if name not in _cassettes:
+            directory = os.getenv('HTTP_CASSETTE_DIR', DEFAULT_CASSETTE_DIR)
+            _cassettes[name] = Cassette(
+                os.path.join(directory, f"{name}.jsonl.gz"),
+                mode=mode,
+                latency=os.getenv('HTTP_CASSETTE_LATENCY', 'none')
+            )
+            print(f"📼 HTTP cassette '{name}' in {mode} mode")
+        return _cassettes[name]
+
+
+def cassette_session(name: str) -> requests.Session:
+    """requests session for the Docs fetcher"""
+    session = requests.Session()
+    cassette = get_cassette(name)
+    if cassette:
+        adapter = CassetteAdapter(cassette, 'docs')
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+    return session
+
+
+def cassette_http_client(name: str) -> Optional[httpx.Client]:
+    """httpx client for OpenAI(http_client=...) (None keeps the client's default)"""
+    cassette = get_cassette(name)
+    if not cassette:
+        return None
+    return httpx.Client(transport=CassetteTransport(cassette, 'openai'), timeout=httpx.Timeout(600.0, connect=5.0))
+
+
+def cassette_index(pc, index_name: str, name: str):
+    """Pinecone index handle, routed through a recording/replaying local proxy when cassettes are on"""
+    cassette = get_cassette(name)
+    if not cassette:
+        return pc.Index(index_name)
+
+    # Replay-only runs never need the (network) host lookup
+    upstream = None
+    if cassette.mode != 'replay':
+        upstream = f"https://{pc.describe_index(index_name).host}"
+
+    proxy = CassetteProxy(cassette, 'pinecone', upstream, {'Api-Key': os.getenv('PINECONE_API_KEY', '')})
+    proxy.start()
+    return pc.Index(host=proxy.url)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Index Snapshot
+Streams every vector (values + metadata) out of a serverless Pinecone index in fixed-size batches
+and reconstructs source documents from their chunks
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Synthetic vectors that are not corpus content
+EXCLUDED_ID_PREFIXES = ("topic_",)
+
+VectorRecord = Tuple[str, List[float], Dict[str, Any]]
+
+
+def iter_vector_batches(index,
+                        batch_size: int = 100,
+                        namespace: Optional[str] = None,
+                        limit: Optional[int] = None) -> Iterator[List[VectorRecord]]:
+    """
+    Yield (id, values, metadata) batches for every chunk vector in the index
+
+    IDs are paged with index.list() and fetched batch_size at a time, so
+    memory stays bounded by one batch however large the index is.
+    """
+    kwargs = {'namespace': namespace} if namespace else {}
+    seen = 0
+
+    for id_page in index.list(**kwargs):
+        ids = [vector_id for vector_id in id_page if not vector_id.startswith(EXCLUDED_ID_PREFIXES)]
+
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+            if limit is not None:
+                batch_ids = batch_ids[:max(0, limit - seen)]
+            if not batch_ids:
+                return
+
+            response = index.fetch(ids=batch_ids, **kwargs)
+            records = [
+                (vector_id, vector.values, vector.metadata or {})
+                for vector_id, vector in response.vectors.items()
+                if vector.values
+            ]
+            seen += len(batch_ids)
+            yield records
+
+
+def merge_chunk_texts(texts: List[str], max_overlap: int = 1000) -> str:
+    """Rebuild a document from its consecutive chunks, dropping the text neighbouring chunks share"""
+    merged = texts[0] if texts else ''
+    for text in texts[1:]:
+        overlap = 0
+        for size in range(min(max_overlap, len(merged), len(text)), 0, -1):
+            if merged.endswith(text[:size]):
+                overlap = size
+                break
+        merged += text[overlap:]
+    return merged
+
+
+def snapshot_documents(index,
+                       doc_key: Callable[[str, Dict[str, Any]], str],
+                       namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Reconstruct the source documents of an index from its chunk metadata
+
+    Chunks are grouped with doc_key(id, metadata), ordered by chunk_index and
+    merged; one-vector-per-document records (coaching calls) keep their content.
+    """
+    grouped: Dict[str, List[Tuple[int, str, Dict[str, Any]]]] = {}
+    for batch in iter_vector_batches(index, namespace=namespace):
+        for vector_id, _, metadata in batch:
+            text = metadata.get('text') or metadata.get('content')
+            if text:
+                grouped.setdefault(doc_key(vector_id, metadata), []).append(
+                    (int(metadata.get('chunk_index', 0)), text, metadata)
+                )
+
+    documents = []
+    for key, chunks in grouped.items():
+        chunks.sort(key=lambda chunk: chunk[0])
+        metadata = chunks[0][2]
+        documents.append({
+            'doc_id': key,
+            'title': metadata.get('title', ''),
+            'tab_name': metadata.get('tab_name') or metadata.get('category', ''),
+            'text': merge_chunk_texts([text for _, text, _ in chunks])
+        })
+    return documents
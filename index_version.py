@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Index Version Markers
+Local record of when each Pinecone index was last rebuilt, used to invalidate caches
+"""
+
+import json
+import os
+import time
+from typing import Dict
+
+DEFAULT_VERSIONS_PATH = os.path.join('.cache', 'index_versions.json')
+
+
+def _load_versions(path: str) -> Dict[str, str]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_index_version(index_name: str, path: str = DEFAULT_VERSIONS_PATH) -> str:
+    """Return the current version marker for an index ("0" if it was never bumped)"""
+    return _load_versions(path).get(index_name, "0")
+
+
+def bump_index_version(index_name: str, path: str = DEFAULT_VERSIONS_PATH) -> str:
+    """Record that an index was rebuilt or its vectors changed; returns the new version"""
+    versions = _load_versions(path)
+    version = str(int(time.time() * 1000))
+    versions[index_name] = version
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path, 'w') as f:
+        json.dump(versions, f, indent=2)
+
+    return version
+
+
+class IndexVersionWatcher:
+    """Cheap repeated version checks: the marker file is only re-read when it changes"""
+
+    def __init__(self, index_name: str, path: str = DEFAULT_VERSIONS_PATH):
+        self.index_name = index_name
+        self.path = path
+        self._mtime = None
+        self._version = "0"
+
+    def current(self) -> str:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return "0"
+
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self._version = get_index_version(self.index_name, self.path)
+
+        return self._version
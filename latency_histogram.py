@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Latency Histogram
+HDR-style histogram: log-spaced buckets with a fixed relative precision, constant memory
+and mergeable across threads or runs
+"""
+
+import math
+import threading
+from typing import Any, Dict
+
+import numpy as np
+
+REPORTED_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+class LatencyHistogram:
+    def __init__(self, lowest_ms: float = 0.01, highest_ms: float = 120_000.0, precision: float = 0.01):
+        """
+        Initialize an empty histogram
+
+        Args:
+            lowest_ms: Smallest distinguishable value (smaller values land in the first bucket)
+            highest_ms: Largest tracked value (larger values land in the last bucket)
+            precision: Relative bucket width (0.01 = values are reported within 1%)
+        """
+        self.lowest_ms = lowest_ms
+        self.highest_ms = highest_ms
+        self.precision = precision
+        self._log_ratio = math.log1p(precision)
+        self.counts = np.zeros(self._index(highest_ms) + 1, dtype=np.int64)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.min_ms = math.inf
+        self.max_ms = 0.0
+        self._lock = threading.Lock()
+
+    def _index(self, value_ms: float) -> int:
+        if value_ms <= self.lowest_ms:
+            return 0
+        return int(math.log(value_ms / self.lowest_ms) / self._log_ratio)
+
+    def _bucket_value(self, index: int) -> float:
+        """Upper edge of a bucket"""
+        return self.lowest_ms * math.exp((index + 1) * self._log_ratio)
+
+    def record(self, value_ms: float, count: int = 1):
+        index = min(self._index(value_ms), len(self.counts) - 1)
+        with self._lock:
+            self.counts[index] += count
+            self.total += count
+            self.sum_ms += value_ms * count
+            self.min_ms = min(self.min_ms, value_ms)
+            self.max_ms = max(self.max_ms, value_ms)
+
+    def merge(self, other: "LatencyHistogram"):
+        """Add another histogram with the same bucket layout"""
+        if (other.lowest_ms, other.highest_ms, other.precision) != (self.lowest_ms, self.highest_ms, self.precision):
+            raise ValueError("Histograms with different bucket layouts cannot be merged")
+        with self._lock:
+            self.counts += other.counts
+            self.total += other.total
+            self.sum_ms += other.sum_ms
+            self.min_ms = min(self.min_ms, other.min_ms)
+            self.max_ms = max(self.max_ms, other.max_ms)
+
+    def percentile(self, percentile: float) -> float:
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(percentile / 100 * self.total))
+        index = int(np.searchsorted(np.cumsum(self.counts), rank))
+        return min(self._bucket_value(index), self.max_ms)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.sum_ms / self.total if self.total else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {'count': int(self.total), 'mean_ms': round(self.mean_ms, 3)}
+        if self.total:
+            summary['min_ms'] = round(self.min_ms, 3)
+            for percentile in REPORTED_PERCENTILES:
+                summary[f"p{percentile:g}_ms"] = round(self.percentile(percentile), 3)
+            summary['max_ms'] = round(self.max_ms, 3)
+        return summary
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Learn category centroids from the corpus
+Streams every chunk embedding, averages the members of each category into a centroid
+(with spread statistics), saves them to the local side file used by the query router and
+zero-shot classifier, and removes the synthetic topic_* vectors from the index
+"""
+
+import os
+import numpy as np
+from pinecone import Pinecone
+from category_classifier import load_centroids, save_centroids
+from index_snapshot import iter_vector_batches
+from index_version import bump_index_version
+from taxonomy import TOPIC_CATEGORIES
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Initialize clients
+pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+
+INDEX_NAME = "gpc-knowledge-base"
+EMBEDDING_DIMENSION = 1536
+MIN_MEMBERS = 3  # Fewer members than this keep the previous (description) centroid
+
+
+def learn_category_centroids():
+    """Compute per-category centroids and spread from member chunk embeddings"""
+
+    print("🧮 Learning category centroids from the corpus...")
+
+    index = pc.Index(INDEX_NAME)
+
+    # Running sums of unit-normalized member vectors: one pass, memory bounded by one batch
+    categories = list(TOPIC_CATEGORIES.keys())
+    sums = np.zeros((len(categories), EMBEDDING_DIMENSION), dtype=np.float64)
+    counts = np.zeros(len(categories), dtype=np.int64)
+    scanned = 0
+
+    for batch in iter_vector_batches(index, batch_size=100):
+        for vector_id, values, metadata in batch:
+            category = metadata.get('category')
+            if category not in TOPIC_CATEGORIES:
+                continue
+            vector = np.asarray(values, dtype=np.float64)
+            sums[categories.index(category)] += vector / (np.linalg.norm(vector) or 1.0)
+            counts[categories.index(category)] += 1
+        scanned += len(batch)
+        print(f"  📦 Scanned {scanned} vectors")
+
+    previous = (load_centroids() or {}).get('categories', {})
+    learned = {}
+
+    for i, category in enumerate(categories):
+        if counts[i] < MIN_MEMBERS:
+            if category in previous:
+                learned[category] = previous[category]
+                print(f"  ⚠️ {TOPIC_CATEGORIES[category]['name']}: only {counts[i]} members, keeping previous centroid")
+            continue
+
+        # For unit vectors, the mean cosine to the normalized centroid is |sum| / n
+        norm = np.linalg.norm(sums[i])
+        mean_similarity = norm / counts[i]
+        learned[category] = {
+            "centroid": (sums[i] / norm).astype(np.float32).tolist(),
+            "count": int(counts[i]),
+            "mean_similarity": round(float(mean_similarity), 4),
+            "spread": round(float(1.0 - mean_similarity), 4)
+        }
+        print(f"  ✅ {TOPIC_CATEGORIES[category]['name']}: {counts[i]} members, spread {1.0 - mean_similarity:.3f}")
+
+    if not learned:
+        print("❌ No categorized vectors found - run organize-knowledge-base.py first")
+        return
+
+    save_centroids(learned, source="corpus")
+    print(f"💾 Saved {len(learned)} category centroids")
+
+    remove_topic_vectors(index)
+
+def remove_topic_vectors(index):
+    """Delete the synthetic topic_* vectors so they no longer compete with real content"""
+    topic_ids = [f"topic_{category_key}" for category_key in TOPIC_CATEGORIES]
+    try:
+        index.delete(ids=topic_ids)
+        bump_index_version(INDEX_NAME)
+        print(f"🗑️ Removed {len(topic_ids)} synthetic topic vectors from the index")
+    except Exception as e:
+        print(f"❌ Error removing topic vectors: {e}")
+
+if __name__ == "__main__":
+    learn_category_centroids()
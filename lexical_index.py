@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Lexical Index
+Local BM25 inverted index over chunk text, plus reciprocal-rank fusion for hybrid search
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "was", "what", "with",
+    "you", "your", "do", "does", "can", "my", "me", "we"
+}
+
+
+def default_lexical_index_path(index_name: str) -> str:
+    """Local file holding the lexical index for a Pinecone index"""
+    return os.path.join('.cache', f"lexical_{index_name}.json")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with stopwords removed"""
+    return [token for token in re.findall(r"[a-z0-9$]+", text.lower()) if token not in STOPWORDS]
+
+
+def matches_filter(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a Pinecone-style metadata filter (equality, $eq, $ne, $in, $nin) locally"""
+    if not filters:
+        return True
+
+    for field, condition in filters.items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            for op, expected in condition.items():
+                if op == '$eq' and value != expected:
+                    return False
+                if op == '$ne' and value == expected:
+                    return False
+                if op == '$in' and value not in expected:
+                    return False
+                if op == '$nin' and value in expected:
+                    return False
+        elif value != condition:
+            return False
+
+    return True
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        """
+        Initialize an empty BM25 index
+
+        Args:
+            k1: Term-frequency saturation
+            b: Document-length normalization strength
+        """
+        self.k1 = k1
+        self.b = b
+
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.doc_terms: Dict[str, Dict[str, int]] = {}
+        self.metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._norms: Optional[Dict[str, float]] = None
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def add_document(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Index (or re-index) one chunk of text"""
+        if doc_id in self.doc_lengths:
+            self.remove_document(doc_id)
+
+        terms = Counter(tokenize(text))
+        for term, count in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+
+        length = sum(terms.values())
+        self.doc_terms[doc_id] = dict(terms)
+        self.doc_lengths[doc_id] = length
+        self.metadata[doc_id] = metadata or {}
+        self._total_length += length
+        self._norms = None
+
+    def remove_document(self, doc_id: str):
+        """Remove a chunk from the index"""
+        for term in self.doc_terms.pop(doc_id, {}):
+            docs = self.postings.get(term, {})
+            docs.pop(doc_id, None)
+            if not docs:
+                self.postings.pop(term, None)
+
+        self._total_length -= self.doc_lengths.pop(doc_id, 0)
+        self.metadata.pop(doc_id, None)
+        self._norms = None
+
+    def _length_norms(self) -> Dict[str, float]:
+        """Per-document BM25 length normalization (recomputed only after the index changes)"""
+        if self._norms is None:
+            avg_length = self._total_length / len(self.doc_lengths) if self.doc_lengths else 1.0
+            self._norms = {
+                doc_id: self.k1 * (1 - self.b + self.b * length / avg_length)
+                for doc_id, length in self.doc_lengths.items()
+            }
+        return self._norms
+
+    def search(self,
+               query: str,
+               top_k: int = 10,
+               filters: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """Return the top (doc_id, bm25_score) pairs for a query"""
+        if not self.doc_lengths:
+            return []
+
+        norms = self._length_norms()
+        total_docs = len(self.doc_lengths)
+        scores: Dict[str, float] = {}
+
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+
+            idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norms[doc_id])
+
+        if filters:
+            scores = {doc_id: score for doc_id, score in scores.items()
+                      if matches_filter(self.metadata[doc_id], filters)}
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    def score_documents(self, query: str, doc_ids: List[str]) -> List[float]:
+        """BM25 scores of the query against specific documents (0.0 for unknown IDs)"""
+        norms = self._length_norms()
+        total_docs = len(self.doc_lengths)
+        scores = [0.0] * len(doc_ids)
+
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+
+            idf = math.log(1 + (total_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for i, doc_id in enumerate(doc_ids):
+                tf = docs.get(doc_id)
+                if tf:
+                    scores[i] += idf * tf * (self.k1 + 1) / (tf + norms[doc_id])
+
+        return scores
+
+    def search_matches(self,
+                       query: str,
+                       top_k: int = 10,
+                       filters: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """Search and return match objects shaped like Pinecone results (id, score, metadata)"""
+        return [
+            SimpleNamespace(id=doc_id, score=score, metadata=self.metadata.get(doc_id, {}))
+            for doc_id, score in self.search(query, top_k, filters)
+        ]
+
+    def save(self, path: str):
+        """Write the index to a JSON file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(path, 'w') as f:
+            json.dump({
+                'k1': self.k1,
+                'b': self.b,
+                'documents': {
+                    doc_id: {'terms': terms, 'metadata': self.metadata.get(doc_id, {})}
+                    for doc_id, terms in self.doc_terms.items()
+                }
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index saved with save(); returns an empty index if the file does not exist"""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+
+        index = cls(k1=data.get('k1', 1.2), b=data.get('b', 0.75))
+        for doc_id, doc in data.get('documents', {}).items():
+            terms = doc['terms']
+            for term, count in terms.items():
+                index.postings.setdefault(term, {})[doc_id] = count
+            index.doc_terms[doc_id] = terms
+            index.doc_lengths[doc_id] = sum(terms.values())
+            index.metadata[doc_id] = doc.get('metadata', {})
+            index._total_length += index.doc_lengths[doc_id]
+
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse several ranked ID lists with reciprocal-rank fusion
+
+    Each list contributes 1 / (k + rank) for every ID it contains.
+    Returns (id, fused_score) pairs sorted best first.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, 1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
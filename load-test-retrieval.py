@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Load-test the retrieval path
+Drives query_knowledge_base in-process (or a running retrieval-service.py) with a replayable
+query mix at stepped concurrency or target QPS levels, records HDR-style latency histograms
+per stage (embed, vector query, rerank, hydrate, ...) and reports the throughput ceiling and
+error rates
+
+Usage:
+    python load-test-retrieval.py                          # in-process, stepped concurrency
+    LOAD_TEST_MODE=qps python load-test-retrieval.py       # open-loop target QPS levels
+    LOAD_TEST_TARGET=http://127.0.0.1:8765 python load-test-retrieval.py
+    LOAD_TEST_CACHES=1 python load-test-retrieval.py       # with caches and title fast path on
+"""
+
+import importlib.util
+import os
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from latency_histogram import LatencyHistogram
+from retrieval_eval import load_golden_set
+from stage_timer import collect_stages, stage
+from warm_cache import logged_queries, warm_queries
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+TARGET = os.getenv('LOAD_TEST_TARGET', 'inprocess')
+LOAD_MODE = os.getenv('LOAD_TEST_MODE', 'concurrency')  # "concurrency" (closed loop) or "qps" (open loop)
+LEVELS = {
+    "concurrency": [1, 2, 4, 8, 16, 32],
+    "qps": [2, 5, 10, 20, 40, 80]
+}
+LEVEL_DURATION_S = 30
+MAX_WORKERS = 256  # Open-loop worker pool (requests beyond this queue, and the queueing is measured)
+TOP_K = 5
+# Caches (semantic, warm answers, query embeddings, title fast path) stay off unless
+# LOAD_TEST_CACHES=1, so the numbers measure the embed + vector query path
+USE_CACHES = os.getenv('LOAD_TEST_CACHES', '0') == '1'
+QUERY_OPTIONS = {"mode": "dense", "use_cache": USE_CACHES, "title_lookup": USE_CACHES}
+SEED = 42
+
+# A level is healthy while it meets both; stepping stops at the first clearly saturated level
+SLO_P95_MS = 1000.0
+MAX_ERROR_RATE = 0.01
+
+MIX_PATH = os.path.join('.cache', 'load_mix.json')
+REPORT_DIR = os.path.join('.cache', 'benchmarks')
+
+
+def build_query_mix():
+    """
+    Weighted query mix, saved so later runs replay the same traffic
+
+    Logged queries are weighted by how often they were asked; common
+    questions, guide examples and golden-set queries fill in with weight 1.
+    """
+    if os.path.exists(MIX_PATH):
+        with open(MIX_PATH, 'r') as f:
+            return json.load(f)
+
+    weights = {}
+    for query in logged_queries():
+        weights[query] = weights.get(query, 0) + 1
+
+    golden_set = load_golden_set() or {'queries': []}
+    for query in warm_queries() + [item['query'] for item in golden_set['queries']]:
+        weights.setdefault(query, 1)
+
+    mix = {"seed": SEED, "queries": [{"query": query, "weight": weight} for query, weight in weights.items()]}
+    os.makedirs(os.path.dirname(MIX_PATH), exist_ok=True)
+    with open(MIX_PATH, 'w') as f:
+        json.dump(mix, f, indent=2)
+    return mix
+
+
+class QuerySequence:
+    """Deterministic query order drawn from the mix (same seed, same traffic)"""
+
+    def __init__(self, mix):
+        self.rng = random.Random(mix['seed'])
+        self.queries = [item['query'] for item in mix['queries']]
+        self.weights = [item['weight'] for item in mix['queries']]
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            return self.rng.choices(self.queries, self.weights)[0]
+
+
+def parse_server_timing(header):
+    """Stage durations from a Server-Timing header (aggregate entries dropped)"""
+    stages = {}
+    for entry in header.split(','):
+        name, _, params = entry.strip().partition(';')
+        if name and name not in ('search', 'total') and params.startswith('dur='):
+            stages[name] = float(params[4:])
+    return stages
+
+
+class RetrievalTarget:
+    """Runs one query against the in-process knowledge base or the HTTP service"""
+
+    def __init__(self, target):
+        self.target = target
+        self.local = threading.local()
+        if target == 'inprocess':
+            # pinecone-setup.py is not an importable module name
+            spec = importlib.util.spec_from_file_location(
+                "pinecone_setup", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pinecone-setup.py")
+            )
+            pinecone_setup = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(pinecone_setup)
+
+            self.kb = pinecone_setup.PineconeKnowledgeBase(
+                pinecone_api_key=os.getenv('PINECONE_API_KEY'),
+                openai_api_key=os.getenv('OPENAI_API_KEY'),
+                google_credentials_path=None,
+                google_sheet_id=os.getenv('GOOGLE_SHEET_ID', '')
+            )
+            self.kb.connect_pinecone_index()
+
+    def query(self, query):
+        """Returns (ok, result_count, stage timings in ms)"""
+        if self.target == 'inprocess':
+            with collect_stages() as stages:
+                matches = self.kb.query_knowledge_base(query, TOP_K, log=False, raise_errors=True, **QUERY_OPTIONS)
+                with stage('hydrate'):
+                    results = [{'id': m.id, 'score': m.score, 'metadata': dict(m.metadata or {})} for m in matches]
+            return True, len(results), stages
+
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        response = self.local.session.post(
+            f"{self.target.rstrip('/')}/search",
+            json=dict(QUERY_OPTIONS, query=query, top_k=TOP_K),
+            timeout=60
+        )
+        if response.status_code != 200:
+            return False, 0, {}
+        return True, len(response.json().get('results', [])), parse_server_timing(response.headers.get('Server-Timing', ''))
+
+
+class LevelStats:
+    def __init__(self):
+        self.total = LatencyHistogram()
+        self.stages = {}
+        self.ok = 0
+        self.errors = 0
+        self.empty = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency_ms, ok, result_count, stages):
+        self.total.record(latency_ms)
+        with self._lock:
+            if not ok:
+                self.errors += 1
+            elif not result_count:
+                self.empty += 1
+            else:
+                self.ok += 1
+            histograms = [(self.stages.setdefault(name, LatencyHistogram()), ms) for name, ms in stages.items()]
+        for histogram, ms in histograms:
+            histogram.record(ms)
+
+
+def timed_query(target, sequence, stats, intended_start=None):
+    """One request; open-loop latency counts from the intended start (no coordinated omission)"""
+    query = sequence.next()
+    started = intended_start if intended_start is not None else time.perf_counter()
+    try:
+        ok, result_count, stages = target.query(query)
+    except Exception:
+        ok, result_count, stages = False, 0, {}
+    stats.record((time.perf_counter() - started) * 1000, ok, result_count, stages)
+
+
+def run_concurrency_level(target, sequence, workers):
+    stats = LevelStats()
+    deadline = time.perf_counter() + LEVEL_DURATION_S
+
+    def worker():
+        while time.perf_counter() < deadline:
+            timed_query(target, sequence, stats)
+
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def run_qps_level(target, sequence, qps):
+    stats = LevelStats()
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        started = time.perf_counter()
+        for i in range(int(qps * LEVEL_DURATION_S)):
+            intended = started + i / qps
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(timed_query, target, sequence, stats, intended)
+    return stats
+
+
+def level_report(level, stats, elapsed):
+    requests_made = stats.ok + stats.errors + stats.empty
+    summary = stats.total.summary()
+    return {
+        "level": level,
+        "requests": requests_made,
+        "throughput_qps": round(requests_made / elapsed, 2),
+        "error_rate": round(stats.errors / requests_made, 4) if requests_made else 0.0,
+        "empty_rate": round(stats.empty / requests_made, 4) if requests_made else 0.0,
+        "latency": summary,
+        "stages": {name: histogram.summary() for name, histogram in sorted(stats.stages.items())},
+        "healthy": bool(requests_made) and summary.get('p95_ms', 0.0) <= SLO_P95_MS
+                   and stats.errors / requests_made <= MAX_ERROR_RATE
+    }
+
+
+def load_test_retrieval():
+    """Step through the load levels and report where the retrieval path saturates"""
+
+    print(f"📈 Load-testing retrieval ({TARGET}, {LOAD_MODE} mode, caches {'on' if USE_CACHES else 'off'})...")
+
+    mix = build_query_mix()
+    if not mix['queries']:
+        print("❌ No queries for the load mix (query log, common questions and golden set are empty)")
+        return
+    print(f"🎲 Query mix: {len(mix['queries'])} distinct queries (seed {mix['seed']}, saved in {MIX_PATH})")
+
+    target = RetrievalTarget(TARGET)
+    sequence = QuerySequence(mix)
+    run_level = run_concurrency_level if LOAD_MODE == "concurrency" else run_qps_level
+
+    levels = []
+    for level in LEVELS[LOAD_MODE]:
+        started = time.perf_counter()
+        stats = run_level(target, sequence, level)
+        report = level_report(level, stats, time.perf_counter() - started)
+        levels.append(report)
+
+        latency = report['latency']
+        print(f"\n  {'🟢' if report['healthy'] else '🔴'} {LOAD_MODE} {level}: {report['throughput_qps']} req/s, "
+              f"errors {report['error_rate']:.1%}, empty {report['empty_rate']:.1%}, "
+              f"p50/p95/p99 {latency.get('p50_ms', 0):.0f}/{latency.get('p95_ms', 0):.0f}/{latency.get('p99_ms', 0):.0f}ms")
+        for name, stage_summary in report['stages'].items():
+            print(f"      {name:<15} p50 {stage_summary['p50_ms']:8.1f}  p95 {stage_summary['p95_ms']:8.1f}  "
+                  f"p99 {stage_summary['p99_ms']:8.1f} ms  (n={stage_summary['count']})")
+
+        # Clearly saturated: further levels only add errors
+        if report['error_rate'] > 5 * MAX_ERROR_RATE or latency.get('p95_ms', 0) > 2 * SLO_P95_MS:
+            print("  ⛔ Saturated, stopping")
+            break
+
+    healthy = [report for report in levels if report['healthy']]
+    ceiling = max(healthy, key=lambda report: report['throughput_qps']) if healthy else None
+    if ceiling:
+        print(f"\n🏁 Throughput ceiling: {ceiling['throughput_qps']} req/s at {LOAD_MODE} {ceiling['level']} "
+              f"(p95 ≤ {SLO_P95_MS:.0f}ms, errors ≤ {MAX_ERROR_RATE:.0%})")
+    else:
+        print(f"\n🏁 No level met the SLO (p95 ≤ {SLO_P95_MS:.0f}ms, errors ≤ {MAX_ERROR_RATE:.0%})")
+
+    os.makedirs(REPORT_DIR, exist_ok=True)
+    report_path = os.path.join(REPORT_DIR, f"load_{LOAD_MODE}_{int(time.time())}.json")
+    with open(report_path, 'w') as f:
+        json.dump({
+            "target": TARGET, "mode": LOAD_MODE, "options": QUERY_OPTIONS, "caches": USE_CACHES, "level_duration_s": LEVEL_DURATION_S,
+            "slo_p95_ms": SLO_P95_MS, "max_error_rate": MAX_ERROR_RATE,
+            "ceiling_qps": ceiling['throughput_qps'] if ceiling else None, "levels": levels
+        }, f, indent=2)
+    print(f"💾 Report saved to {report_path}")
+
+if __name__ == "__main__":
+    load_test_retrieval()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Local HTTP Server
+Threaded JSON HTTP server on 127.0.0.1 for in-process stand-ins and proxies; subclasses
+route requests by overriding handle()
+"""
+
+import json
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+Response = Tuple[int, Dict[str, str], Any]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def _dispatch(self, method: str):
+        parsed = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'null') if length else None
+        server = self.server.app
+
+        if parsed.path == '/_stats':
+            status, headers, payload = 200, {}, server.stats()
+        else:
+            server.count('requests')
+            status, headers, payload = server.handle(method, parsed.path, parse_qs(parsed.query), body)
+        server.count(f"status_{status}")
+
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', headers.pop('Content-Type', 'application/json'))
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LocalHTTPServer:
+    """Threaded local HTTP server with request counters"""
+
+    def __init__(self, port: int = 0):
+        self.port = port
+        self.counts: Counter = Counter()
+        self._lock = threading.Lock()
+        self.httpd: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> str:
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', self.port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self.url
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counts[name] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts)
+
+    def handle(self, method: str, path: str, params: Dict[str, List[str]], body: Any) -> Response:
+        return 404, {}, {'error': f"no route for {method} {path}"}
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Local Service Stand-ins
+Small HTTP servers that mimic the Google Docs export endpoint, the OpenAI embeddings API and
+the Pinecone data plane, so the ingestion path can be benchmarked without live services
+"""
+
+import json
+import multiprocessing
+import random
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.request import urlopen
+
+import numpy as np
+
+from local_http_server import LocalHTTPServer, Response
+
+TRANSCRIPT_WORDS = (
+    "amazon listing product supplier margin launch brand customers sales strategy content video "
+    "audience ads budget inventory shipping reviews keywords ranking pricing profit store email "
+    "funnel offer coaching mindset growth traffic conversion creative hook niche research test "
+    "scale team process goal revenue market competitor bundle packaging sample order cash flow"
+).split()
+FILLER_WORDS = "so and the you we that it is to of a in for what like just really know think".split()
+
+
+class DocsExportStandIn(LocalHTTPServer):
+    def __init__(self, sizes: Sequence[int] = (5000, 20000, 60000), seed: int = 0, port: int = 0):
+        """
+        Initialize the Docs export stand-in (GET /document/d/<id>/export)
+
+        Args:
+            sizes: Transcript sizes in characters; each document ID maps to one deterministically
+            seed: Seed for the synthetic transcript text
+            port: Port to bind (0 = any free port)
+        """
+        super().__init__(port)
+        self.sizes = list(sizes)
+        self.seed = seed
+
+    def transcript(self, doc_id: str) -> str:
+        """Deterministic synthetic coaching-call transcript for a document ID"""
+        key = zlib.crc32(doc_id.encode('utf-8'))
+        rng = random.Random(self.seed * 1_000_003 + key)
+        size = self.sizes[key % len(self.sizes)]
+
+        lines, length, seconds = [], 0, 0
+        while length < size:
+            words = [
+                rng.choice(TRANSCRIPT_WORDS) if rng.random() < 0.4 else rng.choice(FILLER_WORDS)
+                for _ in range(rng.randint(8, 40))
+            ]
+            seconds += rng.randint(5, 40)
+            speaker = rng.choice(("Chris", "Student"))
+            line = f"[{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}] {speaker}: {' '.join(words).capitalize()}."
+            lines.append(line)
+            length += len(line) + 1
+
+        return "\n".join(lines)[:size]
+
+    def handle(self, method, path, params, body):
+        parts = path.strip('/').split('/')
+        if method == 'GET' and len(parts) == 4 and parts[:2] == ['document', 'd'] and parts[3] == 'export':
+            text = self.transcript(parts[2]).encode('utf-8')
+            self.count('exports')
+            self.count('bytes_served', len(text))
+            return 200, {'Content-Type': 'text/plain; charset=utf-8'}, text
+        return super().handle(method, path, params, body)
+
+
+class EmbeddingsStandIn(LocalHTTPServer):
+    def __init__(self,
+                 dimension: int = 1536,
+                 latency_ms: float = 50.0,
+                 per_input_ms: float = 0.5,
+                 rate_limit_rate: float = 0.0,
+                 retry_after_ms: int = 100,
+                 seed: int = 0,
+                 port: int = 0):
+        """
+        Initialize the OpenAI-compatible embeddings stand-in (POST /v1/embeddings)
+
+        Args:
+            dimension: Embedding dimension
+            latency_ms: Fixed latency added to every request
+            per_input_ms: Extra latency per input text
+            rate_limit_rate: Fraction of requests rejected with 429
+            retry_after_ms: retry-after-ms header sent with 429 responses
+            seed: Seed for the 429 injection
+            port: Port to bind (0 = any free port)
+        """
+        super().__init__(port)
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+        self.per_input_ms = per_input_ms
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after_ms = retry_after_ms
+        self.rng = random.Random(seed)
+
+    def embedding(self, text: str) -> List[float]:
+        """Deterministic unit vector for a text (identical texts embed identically)"""
+        vector = np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def handle(self, method, path, params, body):
+        if method != 'POST' or path.rstrip('/') not in ('/v1/embeddings', '/embeddings'):
+            return super().handle(method, path, params, body)
+
+        inputs = body.get('input', [])
+        inputs = [inputs] if isinstance(inputs, str) else list(inputs)
+        time.sleep((self.latency_ms + self.per_input_ms * len(inputs)) / 1000)
+
+        with self._lock:
+            limited = self.rng.random() < self.rate_limit_rate
+        if limited:
+            self.count('rate_limited')
+            return 429, {'retry-after-ms': str(self.retry_after_ms)}, {
+                'error': {'message': 'Rate limit reached (stand-in)', 'type': 'requests', 'code': 'rate_limit_exceeded'}
+            }
+
+        tokens = sum(max(1, len(text) // 4) for text in inputs)
+        self.count('embedding_requests')
+        self.count('inputs', len(inputs))
+        self.count('tokens', tokens)
+        return 200, {}, {
+            'object': 'list',
+            'data': [{'object': 'embedding', 'index': i, 'embedding': self.embedding(text)} for i, text in enumerate(inputs)],
+            'model': body.get('model', 'text-embedding-3-small'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}
+        }
+
+
+def _matches_filter(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Subset of Pinecone metadata filtering: equality, $eq/$ne/$in/$nin, $and/$or"""
+    for key, condition in (filters or {}).items():
+        if key == '$and':
+            if not all(_matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+        if key == '$or':
+            if not any(_matches_filter(metadata, clause) for clause in condition):
+                return False
+            continue
+
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {'$eq': condition}
+        for operator, expected in condition.items():
+            if operator == '$eq' and value != expected:
+                return False
+            if operator == '$ne' and value == expected:
+                return False
+            if operator == '$in' and value not in expected:
+                return False
+            if operator == '$nin' and value in expected:
+                return False
+    return True
+
+
+class PineconeStandIn(LocalHTTPServer):
+    def __init__(self, dimension: int = 1536, latency_ms: float = 5.0, port: int = 0):
+        """
+        Initialize the Pinecone data-plane stand-in (upsert, query, fetch, list, delete, stats)
+
+        Args:
+            dimension: Index dimension
+            latency_ms: Fixed latency added to every request
+            port: Port to bind (0 = any free port)
+        """
+        super().__init__(port)
+        self.dimension = dimension
+        self.latency_ms = latency_ms
+        self.namespaces: Dict[str, Dict[str, Tuple[np.ndarray, Dict[str, Any]]]] = {}
+
+    def _namespace(self, name: Optional[str]) -> Dict[str, Tuple[np.ndarray, Dict[str, Any]]]:
+        return self.namespaces.setdefault(name or '', {})
+
+    def _vector_json(self, vector_id: str, record) -> Dict[str, Any]:
+        return {'id': vector_id, 'values': record[0].tolist(), 'metadata': record[1]}
+
+    def handle(self, method, path, params, body):
+        time.sleep(self.latency_ms / 1000)
+        body = body or {}
+        namespace_name = body.get('namespace') or params.get('namespace', [''])[0]
+
+        with self._lock:
+            namespace = self._namespace(namespace_name)
+
+            if path == '/vectors/upsert':
+                for vector in body.get('vectors', []):
+                    namespace[vector['id']] = (np.asarray(vector['values'], dtype=np.float32), vector.get('metadata') or {})
+                self.counts['upsert_requests'] += 1
+                self.counts['vectors_upserted'] += len(body.get('vectors', []))
+                return 200, {}, {'upsertedCount': len(body.get('vectors', []))}
+
+            if path == '/query':
+                self.counts['query_requests'] += 1
+                return 200, {}, self._query(namespace, body, namespace_name)
+
+            if path == '/vectors/fetch':
+                self.counts['fetch_requests'] += 1
+                ids = params.get('ids', [])
+                return 200, {}, {
+                    'vectors': {i: self._vector_json(i, namespace[i]) for i in ids if i in namespace},
+                    'namespace': namespace_name
+                }
+
+            if path == '/vectors/list':
+                prefix = params.get('prefix', [''])[0]
+                limit = int(params.get('limit', ['100'])[0])
+                start = int(params.get('paginationToken', ['0'])[0])
+                ids = sorted(i for i in namespace if i.startswith(prefix))
+                page = {'vectors': [{'id': i} for i in ids[start:start + limit]], 'namespace': namespace_name}
+                if start + limit < len(ids):
+                    page['pagination'] = {'next': str(start + limit)}
+                return 200, {}, page
+
+            if path == '/vectors/delete':
+                if body.get('deleteAll'):
+                    namespace.clear()
+                for vector_id in body.get('ids', []):
+                    namespace.pop(vector_id, None)
+                return 200, {}, {}
+
+            if path == '/describe_index_stats':
+                total = sum(len(records) for records in self.namespaces.values())
+                return 200, {}, {
+                    'dimension': self.dimension,
+                    'indexFullness': 0.0,
+                    'totalVectorCount': total,
+                    'namespaces': {name: {'vectorCount': len(records)} for name, records in self.namespaces.items()}
+                }
+
+        return super().handle(method, path, params, body)
+
+    def _query(self, namespace, body: Dict[str, Any], namespace_name: str) -> Dict[str, Any]:
+        """Brute-force cosine search over the namespace"""
+        vector = body.get('vector')
+        if vector is None and body.get('id') in namespace:
+            vector = namespace[body['id']][0]
+
+        candidates = [(i, record) for i, record in namespace.items() if _matches_filter(record[1], body.get('filter'))]
+        if vector is None or not candidates:
+            return {'matches': [], 'namespace': namespace_name}
+
+        query = np.asarray(vector, dtype=np.float32)
+        matrix = np.stack([record[0] for _, record in candidates])
+        scores = matrix @ query / ((np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)) + 1e-12)
+        order = np.argsort(-scores)[:int(body.get('topK', 10))]
+
+        matches = []
+        for position in order:
+            vector_id, record = candidates[position]
+            match = {'id': vector_id, 'score': float(scores[position])}
+            if body.get('includeValues'):
+                match['values'] = record[0].tolist()
+            if body.get('includeMetadata'):
+                match['metadata'] = record[1]
+            matches.append(match)
+        return {'matches': matches, 'namespace': namespace_name}
+
+
+def _serve(settings: Dict[str, Dict[str, Any]], connection):
+    servers = {
+        'docs': DocsExportStandIn(**settings.get('docs', {})),
+        'embeddings': EmbeddingsStandIn(**settings.get('embeddings', {})),
+        'pinecone': PineconeStandIn(**settings.get('pinecone', {}))
+    }
+    connection.send({name: server.start() for name, server in servers.items()})
+    connection.recv()  # Blocks until the parent asks us to stop
+    for server in servers.values():
+        server.stop()
+
+
+class StandInCluster:
+    """All three stand-ins in a child process, so they do not share the measured process's memory or GIL"""
+
+    def __init__(self, settings: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.settings = settings or {}
+        self.urls: Dict[str, str] = {}
+        self._process = None
+        self._connection = None
+
+    def __enter__(self) -> "StandInCluster":
+        self._connection, child = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(self.settings, child), daemon=True)
+        self._process.start()
+        self.urls = self._connection.recv()
+        return self
+
+    def __exit__(self, *exc):
+        self._connection.send('stop')
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Request counters of every stand-in"""
+        stats = {}
+        for name, url in self.urls.items():
+            with urlopen(f"{url}/_stats", timeout=5) as response:
+                stats[name] = json.loads(response.read())
+        return stats
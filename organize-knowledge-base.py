@@ -4,113 +4,43 @@ Organize and categorize the knowledge base with proper topics
 """
 
 import os
+import sys
 from openai import OpenAI
 from pinecone import Pinecone
 from typing import List, Dict
 import json
+from concurrent.futures import ThreadPoolExecutor
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from batch_search import embed_texts, query_vectors
+from category_classifier import CategoryClassifier, load_centroids, save_centroids
+from index_version import bump_index_version
+from taxonomy import TOPIC_CATEGORIES, categorize_by_keywords
+from batch_categorizer import CategoryCache, categorize_all, taxonomy_signature
+from usage_meter import BudgetExceeded, UsageMeter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("organize-knowledge-base", source="All tabs")
+
 # Initialize clients
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
 
-# Define proper topic categories based on your content
-TOPIC_CATEGORIES = {
-    "content_creation": {
-        "name": "Content Creation & Filming",
-        "keywords": ["filming", "content", "video", "background", "lighting", "hand movements", "eye", "music", "sounds", "controversy", "pace", "viral", "hooks"],
-        "description": "Everything about creating compelling video content"
-    },
-    "social_media_strategy": {
-        "name": "Social Media Strategy",
-        "keywords": ["tiktok", "instagram", "youtube", "facebook", "account", "fyp", "viral", "platform", "optimization", "burners", "recycle", "targeting", "countries"],
-        "description": "Platform-specific strategies and optimization"
-    },
-    "product_research": {
-        "name": "Product Research & Sourcing",
-        "keywords": ["product", "research", "sourcing", "temu", "ali", "cj", "saturation", "good vs bad", "untapped", "existing", "custom"],
-        "description": "Finding and evaluating profitable products"
-    },
-    "business_development": {
-        "name": "Business & Brand Building",
-        "keywords": ["brand", "website", "building", "selling", "bundles", "aov", "cvr", "email marketing", "broadcast", "longevity", "consistency"],
-        "description": "Building and scaling your business"
-    },
-    "marketing_strategies": {
-        "name": "Marketing & Growth",
-        "keywords": ["marketing", "angles", "audience", "niche", "growth", "archive", "method", "prime", "trials", "sales", "offer"],
-        "description": "Marketing tactics and growth strategies"
-    },
-    "case_studies": {
-        "name": "Case Studies & Results",
-        "keywords": ["case study", "results", "subs", "months", "filming", "k", "million", "30m", "250k", "350k", "20k"],
-        "description": "Real success stories and results"
-    },
-    "advanced_tactics": {
-        "name": "Advanced Tactics",
-        "keywords": ["bts", "behind the scenes", "whole", "creating", "shareable", "replicating", "concepts", "dropshipping"],
-        "description": "Advanced strategies and behind-the-scenes insights"
-    }
-}
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
 
-def categorize_document(title: str, content: str) -> str:
-    """Categorize a document based on its title and content"""
-    
-    # Create a prompt for AI categorization
-    prompt = f"""
-    Based on the document title and content, categorize this into one of these categories:
-    
-    1. content_creation - Content Creation & Filming (filming, video production, lighting, etc.)
-    2. social_media_strategy - Social Media Strategy (platform optimization, viral tactics, etc.)
-    3. product_research - Product Research & Sourcing (finding products, market research, etc.)
-    4. business_development - Business & Brand Building (websites, branding, scaling, etc.)
-    5. marketing_strategies - Marketing & Growth (marketing tactics, audience targeting, etc.)
-    6. case_studies - Case Studies & Results (success stories, real results, etc.)
-    7. advanced_tactics - Advanced Tactics (BTS content, advanced strategies, etc.)
-    
-    Document Title: {title}
-    Content Preview: {content[:500]}...
-    
-    Return ONLY the category key (e.g., "content_creation"). Be specific and accurate.
-    """
-    
-    try:
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=50,
-            temperature=0.1
-        )
-        
-        category = response.choices[0].message.content.strip().lower()
-        
-        # Validate category
-        if category in TOPIC_CATEGORIES:
-            return category
-        else:
-            # Fallback to keyword matching
-            return categorize_by_keywords(title, content)
-    
-    except Exception as e:
-        print(f"Error in AI categorization: {e}")
-        return categorize_by_keywords(title, content)
+# Categorization results cached by content hash (reset when the categories change)
+category_cache = CategoryCache(taxonomy_signature(TOPIC_CATEGORIES))
 
-def categorize_by_keywords(title: str, content: str) -> str:
-    """Fallback categorization using keyword matching"""
-    text = (title + " " + content).lower()
-    
-    category_scores = {}
-    for category, info in TOPIC_CATEGORIES.items():
-        score = sum(1 for keyword in info["keywords"] if keyword in text)
-        category_scores[category] = score
-    
-    # Return the category with the highest score
-    if category_scores:
-        return max(category_scores, key=category_scores.get)
-    return "advanced_tactics"  # Default fallback
+def categorize_document(title: str, content: str) -> str:
+    """Categorize a single document based on its title and content"""
+    items = [{"id": "doc", "title": title, "preview": content[:500]}]
+    return categorize_all(
+        openai_client, items, TOPIC_CATEGORIES, categorize_by_keywords, cache=category_cache
+    )["doc"]
 
 def create_searchable_topics():
     """Create topic-based search vectors for better organization"""
@@ -126,37 +56,75 @@ def create_searchable_topics():
         results = index.query(
             vector=[0.0] * 1536,  # Dummy vector
             top_k=1000,  # Get many results
-            include_metadata=True
+            include_metadata=True,
+            include_values=True
         )
         
         print(f"📊 Found {len(results.matches)} documents to categorize")
         
-        categorized_count = 0
-        category_counts = {}
+        # Zero-shot pass: stored vectors against the category centroids (one matrix product, no LLM)
+        categories, labels = {}, {}
+        classifier = CategoryClassifier.from_file(threshold=0.3)
+        if classifier:
+            all_labels = classifier.classify_many([match.values for match in results.matches])
+            for match, match_labels in zip(results.matches, all_labels):
+                if match_labels:
+                    categories[match.id] = match_labels[0][0]
+                    labels[match.id] = [key for key, _ in match_labels]
+            print(f"🧮 Classified {len(categories)} documents by embedding similarity")
         
-        for match in results.matches:
-            title = match.metadata.get('title', '')
-            url = match.metadata.get('url', '')
-            
-            print(f"📄 Categorizing: {title}")
-            
-            # Get the content (we'll need to extract it again or store it)
-            # For now, let's use the title and any existing metadata
-            category = categorize_document(title, "")
-            
-            # Update metadata with category
-            updated_metadata = match.metadata.copy()
-            updated_metadata['category'] = category
-            updated_metadata['category_name'] = TOPIC_CATEGORIES[category]['name']
-            updated_metadata['category_description'] = TOPIC_CATEGORIES[category]['description']
-            
-            # Update the vector with new metadata
-            index.upsert([(match.id, match.values, updated_metadata)])
+        # Remaining documents: batched LLM categorization (many per request, cached by content hash)
+        items = [
+            {
+                "id": match.id,
+                "title": match.metadata.get('title', ''),
+                "preview": (match.metadata.get('text') or match.metadata.get('content') or '')[:500]
+            }
+            for match in results.matches
+            if match.id not in categories
+        ]
+        categories.update(categorize_all(
+            openai_client,
+            items,
+            TOPIC_CATEGORIES,
+            categorize_by_keywords,
+            batch_size=25,
+            max_workers=4,
+            requests_per_minute=60,
+            cache=category_cache
+        ))
+        
+        # Dry run: the batches above were only counted, nothing is written back
+        if usage.dry_run:
+            print(f"🧮 Dry run: {len(items)} documents would go to the LLM categorizer")
+            return
+        
+        def update_category(match):
+            category = categories[match.id]
             
-            categorized_count += 1
+            # Metadata-only update (the vector itself is unchanged)
+            index.update(
+                id=match.id,
+                set_metadata={
+                    'category': category,
+                    'category_name': TOPIC_CATEGORIES[category]['name'],
+                    'category_description': TOPIC_CATEGORIES[category]['description'],
+                    'categories': labels.get(match.id, [category])
+                }
+            )
+            print(f"  ✅ {match.metadata.get('title', match.id)} → {TOPIC_CATEGORIES[category]['name']}")
+            return category
+        
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            updated = list(pool.map(update_category, results.matches))
+        
+        categorized_count = len(updated)
+        category_counts = {}
+        for category in updated:
             category_counts[category] = category_counts.get(category, 0) + 1
-            
-            print(f"  ✅ Categorized as: {TOPIC_CATEGORIES[category]['name']}")
+        
+        # Cached results filtered by category are out of date
+        bump_index_version("gpc-knowledge-base")
         
         print(f"\n🎉 Categorization complete!")
         print(f"✅ Categorized {categorized_count} documents")
@@ -164,47 +132,42 @@ def create_searchable_topics():
         for category, count in category_counts.items():
             print(f"  - {TOPIC_CATEGORIES[category]['name']}: {count} documents")
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error categorizing documents: {e}")
 
-def create_topic_search_vectors():
-    """Create search vectors for each topic category"""
+def create_topic_centroids():
+    """Seed the local category centroids from the topic descriptions"""
     
-    print("\n🔍 Creating topic search vectors...")
+    print("\n🔍 Creating topic centroids...")
     
-    index = pc.Index("gpc-knowledge-base")
+    # Centroids learned from real documents (learn-category-centroids.py) take precedence
+    existing = load_centroids()
+    if existing and existing.get('source') == "corpus":
+        print("  ✅ Corpus-learned centroids already present, keeping them")
+        return
     
-    for category_key, category_info in TOPIC_CATEGORIES.items():
-        # Create a search query for this topic
-        search_query = f"{category_info['name']}: {category_info['description']}. Keywords: {', '.join(category_info['keywords'])}"
-        
-        # Create embedding for this topic
-        try:
-            response = openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=search_query
-            )
-            
-            embedding = response.data[0].embedding
-            
-            # Store as a topic vector
-            topic_metadata = {
-                "title": f"Topic: {category_info['name']}",
-                "category": category_key,
-                "category_name": category_info['name'],
-                "description": category_info['description'],
-                "keywords": ', '.join(category_info['keywords']),
-                "type": "topic_search",
-                "tab": "Topic Categories"
-            }
-            
-            topic_id = f"topic_{category_key}"
-            index.upsert([(topic_id, embedding, topic_metadata)])
-            
-            print(f"  ✅ Created topic vector: {category_info['name']}")
-        
-        except Exception as e:
-            print(f"  ❌ Error creating topic vector for {category_key}: {e}")
+    category_keys = list(TOPIC_CATEGORIES.keys())
+    search_queries = [
+        f"{info['name']}: {info['description']}. Keywords: {', '.join(info['keywords'])}"
+        for info in TOPIC_CATEGORIES.values()
+    ]
+    
+    # One embeddings request for every topic description
+    embeddings = embed_texts(openai_client, search_queries, cache=query_cache)
+    centroids = {
+        category_key: {"centroid": embedding}
+        for category_key, embedding in zip(category_keys, embeddings)
+        if embedding
+    }
+    
+    # Kept locally only: synthetic vectors in the index would compete with real content
+    if centroids:
+        save_centroids(centroids, source="topic_descriptions")
+        print(f"  💾 Saved {len(centroids)} category centroids for the query router")
+    else:
+        print("  ❌ Error creating topic centroids")
 
 def test_topic_search():
     """Test the organized topic search"""
@@ -224,45 +187,40 @@ def test_topic_search():
         "Behind the scenes content creation"
     ]
     
-    for query in test_queries:
+    # Embed every query in one request (cached across runs) and search concurrently
+    embeddings = embed_texts(openai_client, test_queries, cache=query_cache)
+    all_results = query_vectors(index, embeddings, top_k=3)
+    
+    for query, matches in zip(test_queries, all_results):
         print(f"\n🔍 Query: '{query}'")
         
-        try:
-            # Create embedding for query
-            response = openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=query
-            )
-            
-            embedding = response.data[0].embedding
-            
-            # Search
-            results = index.query(
-                vector=embedding,
-                top_k=3,
-                include_metadata=True
-            )
-            
-            print(f"  📊 Top results:")
-            for match in results.matches:
-                category_name = match.metadata.get('category_name', 'Unknown')
-                title = match.metadata.get('title', 'Unknown')
-                print(f"    - {title} ({category_name}) - Score: {match.score:.3f}")
+        if not matches:
+            print(f"  ❌ No results for query")
+            continue
         
-        except Exception as e:
-            print(f"  ❌ Error testing query: {e}")
+        print(f"  📊 Top results:")
+        for match in matches:
+            category_name = match.metadata.get('category_name', 'Unknown')
+            title = match.metadata.get('title', 'Unknown')
+            print(f"    - {title} ({category_name}) - Score: {match.score:.3f}")
 
 if __name__ == "__main__":
     print("🚀 Starting knowledge base organization...")
     
-    # Step 1: Categorize existing documents
-    create_searchable_topics()
-    
-    # Step 2: Create topic search vectors
-    create_topic_search_vectors()
-    
-    # Step 3: Test the organized search
-    test_topic_search()
+    try:
+        # Step 1: Create topic centroids (used for routing and zero-shot categorization)
+        create_topic_centroids()
+        
+        # Step 2: Categorize existing documents
+        create_searchable_topics()
+        
+        # Step 3: Test the organized search
+        if not usage.dry_run:
+            test_topic_search()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
     
     print("\n🎉 Knowledge base organization complete!")
     print("Your AI can now search by specific topics instead of generic queries!")
+    print("Run learn-category-centroids.py to replace the description centroids with corpus-learned ones.")
+    usage.finish()
@@ -5,9 +5,13 @@ Extracts data from Google Sheets → Google Docs → Pinecone Vector Database
 """
 
 import os
+import sys
 import json
+import threading
 import time
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
 import pandas as pd
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
@@ -16,30 +20,57 @@ import pinecone
 from pinecone import Pinecone
 import openai
 from openai import OpenAI
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from batch_search import FilterSpec, embed_texts, query_vectors
+from semantic_cache import SemanticCache
+from index_version import bump_index_version
+from lexical_index import BM25Index, default_lexical_index_path, reciprocal_rank_fusion
+from title_index import TitleIndex
+from rerank import ChunkVectorCache, Reranker
+from diversify import collapse_by_document, mmr
+from hierarchy import DOCUMENT_NAMESPACE, coarse_to_fine_query, document_id, document_record
+from query_router import QueryRouter
+from category_classifier import CategoryClassifier
+from context_packer import format_context, pack_context
+from chunking import chunk_document
+from deadline import Deadline, DeadlineExceeded, run_hedged
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
+from stage_timer import stage
+from warm_cache import QueryLog, WarmAnswerCache, warm_queries
 
 class PineconeKnowledgeBase:
     def __init__(self, 
                  pinecone_api_key: str,
                  openai_api_key: str,
-                 google_credentials_path: str,
-                 google_sheet_id: str):
+                 google_credentials_path: Optional[str],
+                 google_sheet_id: str,
+                 query_cache_path: Optional[str] = DEFAULT_CACHE_PATH):
         """
         Initialize the knowledge base system
         
         Args:
             pinecone_api_key: Your Pinecone API key
             openai_api_key: Your OpenAI API key for embeddings
-            google_credentials_path: Path to Google service account JSON
+            google_credentials_path: Path to Google service account JSON (None = query-only, no ingestion)
             google_sheet_id: ID of your Google Sheet
+            query_cache_path: SQLite file for cached query embeddings (None = memory only)
         """
         # Initialize Pinecone
         self.pc = Pinecone(api_key=pinecone_api_key)
         
+        # Ingestion spans and counters (written to .cache/metrics when setup finishes)
+        self.metrics = PipelineMetrics("pinecone-setup")
+        
+        # Token and cost accounting (budget and dry run are applied by setup_knowledge_base)
+        self.usage = UsageMeter("pinecone-setup")
+        
         # Initialize OpenAI
-        self.openai_client = OpenAI(api_key=openai_api_key)
+        self.openai_client = self.usage.instrument(OpenAI(api_key=openai_api_key, http_client=self.metrics.count_retries()))
         
-        # Initialize Google Sheets API
-        self.setup_google_sheets(google_credentials_path)
+        # Initialize Google Sheets API (only needed for ingestion)
+        if google_credentials_path:
+            self.setup_google_sheets(google_credentials_path)
         self.sheet_id = google_sheet_id
         
         # Configuration
@@ -47,6 +78,55 @@ class PineconeKnowledgeBase:
         self.embedding_model = "text-embedding-3-small"  # Cost-effective model
         self.chunk_size = 1000  # Characters per chunk
         self.chunk_overlap = 200  # Overlap between chunks
+        self.chunk_strategy = "chars"  # See chunking.CHUNKING_STRATEGIES / sweep-chunking.py
+        
+        # Query embedding cache (repeated questions skip the OpenAI round trip)
+        self.query_cache = EmbeddingCache(
+            self.embedding_model,
+            max_entries=1000,
+            ttl_seconds=7 * 24 * 3600,
+            cache_path=query_cache_path
+        )
+        
+        # Semantic result cache (paraphrased questions reuse earlier results)
+        self.semantic_cache = SemanticCache(
+            self.index_name,
+            max_distance=0.08,
+            ttl_seconds=24 * 3600
+        )
+        
+        # Local BM25 index over chunk text (built incrementally at ingest; rebuild-lexical-index.py
+        # backfills indexes ingested before it existed)
+        self.lexical_index_path = default_lexical_index_path(self.index_name)
+        self.lexical_index = BM25Index.load(self.lexical_index_path)
+        
+        # Known document titles (queries naming a video/lesson skip the vector search)
+        self.title_index = TitleIndex.build(self.lexical_index.metadata)
+        
+        # Local rerank stage over over-fetched candidates
+        self.chunk_vectors = ChunkVectorCache()
+        self.reranker = Reranker(self.lexical_index, self.chunk_vectors, budget_ms=5.0)
+        
+        # Category router over locally cached centroids (None until organize-knowledge-base.py has run)
+        self.router = QueryRouter.from_file()
+        
+        # Zero-shot topic labels for new chunks, from the same centroids (no LLM calls)
+        self.classifier = CategoryClassifier.from_file(threshold=0.3)
+        
+        # Precomputed answers for the most common questions (see warm-query-cache.py)
+        self.warm_answers = WarmAnswerCache.load(self.index_name)
+        self._warm_refresh = None
+        
+        # Served queries feed the warmup and load-test mix (opt-in: QUERY_LOG=1)
+        self.query_log = QueryLog.from_env()
+        
+        # Shared worker pool for concurrent retrieval stages
+        self.executor = ThreadPoolExecutor(max_workers=8)
+        
+        # Deadline-bound calls run on their own pool (abandoned attempts cannot starve the
+        # shared one), with at most 4 duplicate (hedge) requests in flight
+        self.deadline_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='deadline')
+        self.hedge_slots = threading.BoundedSemaphore(4)
         
     def setup_google_sheets(self, credentials_path: str):
         """Setup Google Sheets API access"""
@@ -105,6 +185,20 @@ class PineconeKnowledgeBase:
             print(f"❌ Error creating Pinecone index: {e}")
             raise
     
+    def connect_pinecone_index(self):
+        """
+        Connect to the existing knowledge base index (query-only callers never create it)
+        
+        Raises:
+            RuntimeError: The index does not exist
+        """
+        existing_indexes = [index.name for index in self.pc.list_indexes()]
+        if self.index_name not in existing_indexes:
+            raise RuntimeError(f"Pinecone index {self.index_name} does not exist; run pinecone-setup.py to create it")
+        
+        self.index = self.pc.Index(self.index_name)
+        print(f"✅ Connected to Pinecone index: {self.index_name}")
+    
     def get_sheet_data(self, tab_name: str) -> pd.DataFrame:
         """Extract data from a specific Google Sheet tab"""
         try:
@@ -138,16 +232,19 @@ class PineconeKnowledgeBase:
             doc_id = doc_url.split('/d/')[1].split('/')[0]
             
             # Get document
-            doc = self.docs_service.documents().get(documentId=doc_id).execute()
+            with self.metrics.span('fetch'):
+                doc = self.docs_service.documents().get(documentId=doc_id).execute()
             
             # Extract text content
-            content = ""
-            for element in doc.get('body', {}).get('content', []):
-                if 'paragraph' in element:
-                    paragraph = element['paragraph']
-                    for text_run in paragraph.get('elements', []):
-                        if 'textRun' in text_run:
-                            content += text_run['textRun']['content']
+            with self.metrics.span('clean') as span:
+                content = ""
+                for element in doc.get('body', {}).get('content', []):
+                    if 'paragraph' in element:
+                        paragraph = element['paragraph']
+                        for text_run in paragraph.get('elements', []):
+                            if 'textRun' in text_run:
+                                content += text_run['textRun']['content']
+                span.count('bytes', len(content.encode('utf-8')))
             
             return content.strip()
             
@@ -162,49 +259,102 @@ class PineconeKnowledgeBase:
                 model=self.embedding_model,
                 input=text
             )
+            self.metrics.count('tokens', response.usage.total_tokens)
             return response.data[0].embedding
             
+        except BudgetExceeded:
+            raise
         except Exception as e:
             print(f"❌ Error creating embeddings: {e}")
             return []
     
+    def embed_query(self, query: str) -> List[float]:
+        """Create a query embedding, reusing the cached vector for repeated questions"""
+        return self.query_cache.get_or_create(query, self.create_embeddings)
+    
     def chunk_text(self, text: str, title: str) -> List[Dict[str, Any]]:
         """Split text into chunks for better retrieval"""
-        chunks = []
-        
-        # Simple chunking by character count
-        start = 0
-        chunk_id = 0
-        
-        while start < len(text):
-            end = min(start + self.chunk_size, len(text))
-            chunk_text = text[start:end]
-            
-            # Try to break at sentence boundary
-            if end < len(text):
-                last_period = chunk_text.rfind('.')
-                last_newline = chunk_text.rfind('\n')
-                break_point = max(last_period, last_newline)
-                
-                if break_point > start + self.chunk_size // 2:
-                    end = start + break_point + 1
-                    chunk_text = text[start:end]
-            
-            chunks.append({
+        return [
+            {
                 'id': f"{title}_{chunk_id}",
                 'text': chunk_text,
                 'chunk_index': chunk_id,
                 'title': title
-            })
-            
-            start = end - self.chunk_overlap
-            chunk_id += 1
+            }
+            for chunk_id, chunk_text in enumerate(
+                chunk_document(text, self.chunk_strategy, self.chunk_size, self.chunk_overlap)
+            )
+        ]
+    
+    def build_document_vectors(self,
+                               content: str,
+                               title: str,
+                               doc_url: str,
+                               tab_name: str,
+                               row: Optional[Dict[str, Any]] = None):
+        """
+        Chunk, embed and annotate one document
+        
+        Returns the chunk records to upsert and the document-level record
+        (None when no chunk could be embedded). Chunks are also added to the
+        local lexical index.
+        """
+        row = row if row is not None else {}
+        
+        # Create chunks
+        chunks = self.chunk_text(content, title)
+        doc_id = document_id(title, doc_url)
+        chunk_embeddings = []
+        chunk_records = []
+        
+        # Process each chunk
+        for chunk in chunks:
+            # Create embedding
+            with self.metrics.span('embed', chunk=chunk['chunk_index']):
+                embedding = self.create_embeddings(chunk['text'])
             
-        return chunks
+            if embedding:
+                # Prepare metadata
+                metadata = {
+                    'text': chunk['text'],
+                    'title': chunk['title'],
+                    'chunk_index': chunk['chunk_index'],
+                    'tab_name': tab_name,
+                    'source_type': row.get('source_type', 'doc'),
+                    'language': row.get('language', 'english'),
+                    'status': row.get('status', 'active'),
+                    'doc_url': doc_url,
+                    'doc_id': doc_id,
+                    'total_chunks': len(chunks),
+                    'level': 'chunk'
+                }
+                if self.classifier:
+                    metadata.update(self.classifier.category_metadata(embedding))
+                chunk_embeddings.append(embedding)
+                
+                # Keep the lexical index in step with the vector index
+                self.lexical_index.add_document(chunk['id'], chunk['text'], metadata)
+                
+                chunk_records.append({
+                    'id': chunk['id'],
+                    'values': embedding,
+                    'metadata': metadata
+                })
+        
+        # One document-level vector per source doc (coarse retrieval stage)
+        if not chunk_embeddings:
+            return chunk_records, None
+        
+        return chunk_records, document_record(doc_id, chunk_embeddings, {
+            'title': title,
+            'tab_name': tab_name,
+            'doc_url': doc_url
+        })
     
     def process_sheet_tab(self, tab_name: str):
         """Process all documents in a sheet tab"""
         print(f"\n🔄 Processing tab: {tab_name}")
+        self.usage.source = tab_name
         
         # Get sheet data
         df = self.get_sheet_data(tab_name)
@@ -225,6 +375,7 @@ class PineconeKnowledgeBase:
         
         # Process each row
         vectors_to_upsert = []
+        doc_vectors_to_upsert = []
         
         for index, row in df.iterrows():
             try:
@@ -235,6 +386,7 @@ class PineconeKnowledgeBase:
                 
                 # Extract content
                 print(f"📄 Processing document {index + 1}/{len(df)}: {doc_url}")
+                self.metrics.begin_document(doc_url, tab=tab_name)
                 content = self.extract_doc_content(doc_url)
                 
                 if not content:
@@ -243,58 +395,57 @@ class PineconeKnowledgeBase:
                 # Get title (try different columns)
                 title = row.get('Title', row.get('title', f"Doc_{index}"))
                 
-                # Create chunks
-                chunks = self.chunk_text(content, title)
+                # Dry run: predict the embedding tokens, write nothing
+                if self.usage.dry_run:
+                    self.usage.predict_embeddings([chunk['text'] for chunk in self.chunk_text(content, title)], self.embedding_model)
+                    continue
                 
-                # Process each chunk
-                for chunk in chunks:
-                    # Create embedding
-                    embedding = self.create_embeddings(chunk['text'])
-                    
-                    if embedding:
-                        # Prepare metadata
-                        metadata = {
-                            'text': chunk['text'],
-                            'title': chunk['title'],
-                            'chunk_index': chunk['chunk_index'],
-                            'tab_name': tab_name,
-                            'source_type': row.get('source_type', 'doc'),
-                            'language': row.get('language', 'english'),
-                            'status': row.get('status', 'active'),
-                            'doc_url': doc_url
-                        }
-                        
-                        # Add to upsert list
-                        vectors_to_upsert.append({
-                            'id': chunk['id'],
-                            'values': embedding,
-                            'metadata': metadata
-                        })
+                chunk_records, doc_record = self.build_document_vectors(content, title, doc_url, tab_name, row)
+                vectors_to_upsert.extend(chunk_records)
+                if doc_record:
+                    doc_vectors_to_upsert.append(doc_record)
                 
                 # Upsert in batches
                 if len(vectors_to_upsert) >= 100:  # Pinecone batch limit
-                    self.index.upsert(vectors=vectors_to_upsert)
+                    with self.metrics.span('upsert', vectors=len(vectors_to_upsert)):
+                        self.index.upsert(vectors=vectors_to_upsert)
                     print(f"✅ Upserted {len(vectors_to_upsert)} vectors")
                     vectors_to_upsert = []
                 
+                if len(doc_vectors_to_upsert) >= 100:
+                    with self.metrics.span('upsert', vectors=len(doc_vectors_to_upsert), level='document'):
+                        self.index.upsert(vectors=doc_vectors_to_upsert, namespace=DOCUMENT_NAMESPACE)
+                    doc_vectors_to_upsert = []
+                
                 # Rate limiting
                 time.sleep(0.1)
                 
+            except BudgetExceeded:
+                raise
             except Exception as e:
                 print(f"❌ Error processing row {index}: {e}")
                 continue
         
         # Upsert remaining vectors
+        self.metrics.end_document()
         if vectors_to_upsert:
-            self.index.upsert(vectors=vectors_to_upsert)
+            with self.metrics.span('upsert', vectors=len(vectors_to_upsert)):
+                self.index.upsert(vectors=vectors_to_upsert)
             print(f"✅ Upserted final batch of {len(vectors_to_upsert)} vectors")
+        
+        if doc_vectors_to_upsert:
+            with self.metrics.span('upsert', vectors=len(doc_vectors_to_upsert), level='document'):
+                self.index.upsert(vectors=doc_vectors_to_upsert, namespace=DOCUMENT_NAMESPACE)
+            print(f"✅ Upserted {len(doc_vectors_to_upsert)} document-level vectors")
     
     def setup_knowledge_base(self, tab_names: List[str] = None):
         """Complete setup process"""
         print("🚀 Starting Pinecone Knowledge Base Setup")
+        self.usage.configure_from_env()
         
-        # Create Pinecone index
-        self.create_pinecone_index()
+        # Create Pinecone index (a dry run only reads the sheet and documents)
+        if not self.usage.dry_run:
+            self.create_pinecone_index()
         
         # If no tab names provided, try to get all tabs
         if not tab_names:
@@ -307,34 +458,432 @@ class PineconeKnowledgeBase:
         for tab_name in tab_names:
             try:
                 self.process_sheet_tab(tab_name)
+            except BudgetExceeded:
+                raise
             except Exception as e:
                 print(f"❌ Error processing tab {tab_name}: {e}")
                 continue
         
+        # Requests after ingestion (warm answers) belong to no tab
+        self.usage.source = None
+        
+        if self.usage.dry_run:
+            self.metrics.finish()
+            self.usage.finish()
+            return
+        
+        # Persist the lexical index built during ingestion
+        self.lexical_index.save(self.lexical_index_path)
+        self.title_index = TitleIndex.build(self.lexical_index.metadata)
+        
+        # Cached results refer to the old index contents
+        bump_index_version(self.index_name)
+        self.semantic_cache.invalidate()
+        self.refresh_warm_answers()
+        self.metrics.finish()
+        
         print("\n🎉 Knowledge base setup complete!")
         print(f"📊 Total vectors in index: {self.index.describe_index_stats()['total_vector_count']}")
+        self.usage.finish()
     
-    def query_knowledge_base(self, query: str, top_k: int = 5):
-        """Query the knowledge base"""
+    def query_knowledge_base(self,
+                             query: str,
+                             top_k: int = 5,
+                             filters: Optional[Dict[str, Any]] = None,
+                             use_cache: bool = True,
+                             mode: str = "dense",
+                             title_lookup: bool = True,
+                             rerank: bool = False,
+                             candidates: int = 50,
+                             diversify: bool = False,
+                             collapse_docs: bool = False,
+                             mmr_lambda: float = 0.7,
+                             route: bool = False,
+                             log: bool = True,
+                             raise_errors: bool = False):
+        """
+        Query the knowledge base
+        
+        Args:
+            query: Question text
+            top_k: Number of results
+            filters: Pinecone metadata filter
+            use_cache: Serve/store results through the semantic and warm caches and reuse cached query embeddings
+            mode: "dense" (vector search), "lexical" (local BM25 only),
+                  "hybrid" (both run concurrently, fused with reciprocal-rank fusion) or
+                  "hierarchical" (best documents first, then only their chunks)
+            title_lookup: Resolve queries that name a known document straight from the title index
+                          (plain dense queries only: skipped with filters, rerank, route, diversify,
+                          collapse_docs or a non-dense mode)
+            rerank: Over-fetch `candidates` results and re-score them locally (cosine, BM25, title)
+            candidates: Number of results fetched for the rerank/diversify stages
+            diversify: Pick the final results by maximal marginal relevance
+            collapse_docs: Keep only the best chunk of each source document
+            mmr_lambda: Relevance vs. novelty trade-off for diversify (1.0 = relevance only)
+            route: Restrict the vector query to the categories the query is closest to
+                   (ignored when explicit filters are given)
+            log: Record the query in the local query log when it is enabled (QUERY_LOG=1)
+            raise_errors: Raise embedding/Pinecone failures instead of returning [] (load tests count them)
+        """
+        if log and self.query_log:
+            self.query_log.log(query)
+        
+        if mode == "lexical":
+            with stage('lexical'):
+                return self.lexical_index.search_matches(query, top_k, filters)
+        
+        # The title and warm-cache shortcuts only stand in for a plain dense search
+        default_pipeline = mode == "dense" and not (filters or rerank or diversify or collapse_docs or route)
+        
+        # Queries naming a specific video or lesson resolve without an embedding call
+        if title_lookup and default_pipeline:
+            with stage('title_lookup'):
+                title_matches = self.title_index.resolve(query, top_k)
+            if title_matches:
+                return title_matches
+        
+        # Common questions are answered from the precomputed warm cache
+        if use_cache and default_pipeline:
+            with stage('warm_cache'):
+                warm_matches = self.warm_lookup(query, top_k)
+            if warm_matches:
+                return warm_matches
+        
+        if mode == "hybrid":
+            with stage('hybrid'):
+                return self.hybrid_query(query, top_k, filters, use_cache, raise_errors=raise_errors)
+        if mode == "hierarchical":
+            with stage('hierarchical'):
+                return self.hierarchical_query(query, top_k, filters, raise_errors=raise_errors)
+        
         try:
-            # Create query embedding
-            query_embedding = self.create_embeddings(query)
+            # Create query embedding (cached)
+            with stage('embed'):
+                query_embedding = self.embed_query(query) if use_cache else self.create_embeddings(query)
             
             if not query_embedding:
+                if raise_errors:
+                    raise RuntimeError("Query embedding failed")
                 return []
             
-            # Query Pinecone
-            results = self.index.query(
-                vector=query_embedding,
+            # Pre-filter by the closest categories instead of post-filtering a large result set
+            routed = False
+            if route and self.router and not filters:
+                route_filter = self.router.route_filter(query_embedding)
+                if route_filter:
+                    filters, routed = route_filter, True
+            
+            # Serve paraphrases of earlier questions from the semantic cache
+            stages = {'rerank': rerank, f"mmr{mmr_lambda}": diversify, 'collapse': collapse_docs}
+            variant = "|".join(name for name, enabled in stages.items() if enabled)
+            post_process = rerank or diversify or collapse_docs
+            if use_cache:
+                with stage('semantic_cache'):
+                    cached_matches = self.semantic_cache.lookup(query_embedding, top_k, filters, variant)
+                if cached_matches is not None:
+                    return cached_matches
+            
+            # Query Pinecone (over-fetch with vectors when post-processing)
+            kwargs = {'filter': filters} if filters else {}
+            with stage('vector_query'):
+                results = self.index.query(
+                    vector=query_embedding,
+                    top_k=max(candidates, top_k) if post_process else top_k,
+                    include_metadata=True,
+                    include_values=rerank or diversify,
+                    **kwargs
+                )
+                matches = results.matches
+                
+                # Too few results inside the routed categories: retry across the whole index
+                if routed and len(matches) < top_k:
+                    results = self.index.query(
+                        vector=query_embedding,
+                        top_k=max(candidates, top_k) if post_process else top_k,
+                        include_metadata=True,
+                        include_values=rerank or diversify
+                    )
+                    matches = results.matches
+            
+            if rerank:
+                keep = len(matches) if (diversify or collapse_docs) else top_k
+                with stage('rerank'):
+                    matches = self.reranker.rerank(query, query_embedding, matches, keep)
+            
+            with stage('diversify'):
+                if collapse_docs:
+                    matches = collapse_by_document(matches)
+                
+                if diversify:
+                    matches = mmr(query_embedding, matches, top_k, mmr_lambda, self.chunk_vectors)
+            
+            matches = matches[:top_k]
+            
+            if use_cache:
+                with stage('semantic_cache'):
+                    self.semantic_cache.store(query, query_embedding, matches, top_k, filters, variant)
+            
+            return matches
+            
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"❌ Error querying knowledge base: {e}")
+            return []
+    
+    def warm_lookup(self, query: str, top_k: int) -> Optional[List[Any]]:
+        """
+        Serve a precomputed answer for a common question
+        
+        After an index rebuild the warm answers are stale: they are refreshed in
+        the background and not served until the refresh finishes.
+        """
+        if not len(self.warm_answers):
+            return None
+        
+        if self.warm_answers.is_stale():
+            if self._warm_refresh is None or self._warm_refresh.done():
+                self._warm_refresh = self.executor.submit(self.refresh_warm_answers)
+            return None
+        
+        return self.warm_answers.get(query, top_k)
+    
+    def refresh_warm_answers(self, top_k: int = 10):
+        """Recompute the warm answers against the current index contents"""
+        try:
+            queries = warm_queries()
+            if not queries:
+                return
+            
+            warm_answers = WarmAnswerCache(self.index_name, self.warm_answers.path)
+            stored = warm_answers.rebuild(
+                self.openai_client,
+                self.index,
+                queries,
                 top_k=top_k,
-                include_metadata=True
+                model=self.embedding_model,
+                embedding_cache=self.query_cache
+            )
+            self.warm_answers = warm_answers
+            print(f"🔥 Refreshed warm answers for {stored} common questions")
+            
+        except BudgetExceeded:
+            raise
+        except Exception as e:
+            print(f"❌ Error refreshing warm answers: {e}")
+    
+    def hybrid_query(self,
+                     query: str,
+                     top_k: int = 5,
+                     filters: Optional[Dict[str, Any]] = None,
+                     use_cache: bool = True,
+                     candidates: int = 20,
+                     rrf_k: int = 60,
+                     raise_errors: bool = False) -> List[Any]:
+        """
+        Run dense and lexical retrieval concurrently and fuse them with reciprocal-rank fusion
+        
+        Returned matches carry the fused score in `score` plus the original
+        `dense_score` / `lexical_score` (None when a source did not return the chunk).
+        """
+        candidates = max(candidates, top_k)
+        
+        dense_future = self.executor.submit(
+            self.query_knowledge_base, query, candidates, filters, use_cache, "dense", log=False,
+            raise_errors=raise_errors
+        )
+        lexical_matches = self.lexical_index.search_matches(query, candidates, filters)
+        dense_matches = dense_future.result()
+        
+        dense_by_id = {match.id: match for match in dense_matches}
+        lexical_by_id = {match.id: match for match in lexical_matches}
+        
+        fused = reciprocal_rank_fusion(
+            [[match.id for match in dense_matches], [match.id for match in lexical_matches]],
+            k=rrf_k
+        )
+        
+        results = []
+        for doc_id, score in fused[:top_k]:
+            source = dense_by_id.get(doc_id) or lexical_by_id[doc_id]
+            results.append(SimpleNamespace(
+                id=doc_id,
+                score=score,
+                metadata=source.metadata,
+                dense_score=dense_by_id[doc_id].score if doc_id in dense_by_id else None,
+                lexical_score=lexical_by_id[doc_id].score if doc_id in lexical_by_id else None
+            ))
+        
+        return results
+    
+    def query_with_deadline(self,
+                            query: str,
+                            top_k: int = 5,
+                            filters: Optional[Dict[str, Any]] = None,
+                            deadline_ms: float = 1500,
+                            hedge_after_ms: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Query under a latency budget, degrading to local results when it is missed
+        
+        The embedding and vector search each run on the worker pool; a call still
+        running after hedge_after_ms (default: a third of the budget) is hedged
+        with a duplicate request. If no live result arrives before the deadline,
+        or the embedding or vector search fails, the best local answer is returned
+        instead: the semantic cache when the query embedding is known, otherwise
+        the BM25 index.
+        
+        Returns:
+            {"matches": [...], "degraded": bool, "source": "live" | "semantic_cache" |
+             "title" | "lexical", "reason": str or None, "elapsed_ms": float}
+        """
+        deadline = Deadline(deadline_ms)
+        hedge_after_ms = hedge_after_ms if hedge_after_ms is not None else deadline_ms / 3
+        
+        def response(matches, source, reason=None):
+            return {
+                'matches': matches,
+                'degraded': reason is not None,
+                'source': source,
+                'reason': reason,
+                'elapsed_ms': deadline.elapsed_ms()
+            }
+        
+        if not filters:
+            title_matches = self.title_index.resolve(query, top_k)
+            if title_matches:
+                return response(title_matches, "title")
+        
+        query_embedding = None
+        try:
+            query_embedding = run_hedged(
+                self.deadline_executor, self.embed_query, query,
+                deadline=deadline, hedge_after_ms=hedge_after_ms, hedge_slots=self.hedge_slots
             )
             
-            return results.matches
+            cached_matches = self.semantic_cache.lookup(query_embedding, top_k, filters)
+            if cached_matches is not None:
+                return response(cached_matches, "semantic_cache")
             
+            kwargs = {'filter': filters} if filters else {}
+            results = run_hedged(
+                self.deadline_executor,
+                lambda: self.index.query(vector=query_embedding, top_k=top_k, include_metadata=True, **kwargs),
+                deadline=deadline, hedge_after_ms=hedge_after_ms,
+                accept=lambda result: result is not None, hedge_slots=self.hedge_slots
+            )
+            matches = results.matches
+            self.semantic_cache.store(query, query_embedding, matches, top_k, filters)
+            return response(matches, "live")
+            
+        except DeadlineExceeded as e:
+            reason = f"{'vector search' if query_embedding else 'embedding'} missed deadline: {e}"
         except Exception as e:
-            print(f"❌ Error querying knowledge base: {e}")
+            reason = f"{'vector search' if query_embedding else 'embedding'} failed: {e}"
+        
+        # Best local answer: a looser semantic-cache match, then BM25
+        if query_embedding:
+            cached_matches = self.semantic_cache.lookup(
+                query_embedding, top_k, filters, max_distance=self.semantic_cache.max_distance * 2
+            )
+            if cached_matches is not None:
+                return response(cached_matches, "semantic_cache", reason)
+        
+        print(f"⚠️ Serving degraded results for '{query}': {reason}")
+        return response(self.lexical_index.search_matches(query, top_k, filters), "lexical", reason)
+    
+    def hierarchical_query(self,
+                           query: str,
+                           top_k: int = 5,
+                           filters: Optional[Dict[str, Any]] = None,
+                           top_docs: int = 3,
+                           raise_errors: bool = False) -> List[Any]:
+        """
+        Coarse-to-fine query: pick the top documents by their document-level
+        vectors, then search only those documents' chunks
+        """
+        try:
+            query_embedding = self.embed_query(query)
+            
+            if not query_embedding:
+                if raise_errors:
+                    raise RuntimeError("Query embedding failed")
+                return []
+            
+            return coarse_to_fine_query(self.index, query_embedding, top_k, top_docs, filters)
+            
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"❌ Error in hierarchical query: {e}")
             return []
+    
+    def query_many(self,
+                   queries: List[str],
+                   top_k: int = 5,
+                   filters: FilterSpec = None,
+                   return_errors: bool = False):
+        """
+        Query the knowledge base with several questions at once
+        
+        All uncached queries are embedded in one OpenAI request and the
+        Pinecone queries run concurrently, so N questions cost about one
+        round trip of latency.
+        
+        Args:
+            queries: Query texts
+            top_k: Results per query
+            filters: One metadata filter for every query, or a list aligned with queries
+            return_errors: Also return one error message per query (None where it succeeded)
+            
+        Returns:
+            A list of matches per query, in input order
+            (and the aligned error messages when return_errors is set)
+        """
+        if not queries:
+            return ([], []) if return_errors else []
+        
+        embeddings = embed_texts(
+            self.openai_client,
+            queries,
+            model=self.embedding_model,
+            cache=self.query_cache
+        )
+        
+        return query_vectors(self.index, embeddings, top_k=top_k, filters=filters, return_errors=return_errors)
+    
+    def build_context(self,
+                      query: str,
+                      token_budget: int = 1500,
+                      top_k: int = 5,
+                      semantic_snippets: bool = False,
+                      **query_kwargs) -> Dict[str, Any]:
+        """
+        Retrieve and pack the most relevant sentences into an LLM-ready context
+        
+        Args:
+            query: Question text
+            token_budget: Maximum tokens of packed context (counted with tiktoken)
+            top_k: Number of matches to extract snippets from
+            semantic_snippets: Score sentences by embedding similarity (one extra
+                               embeddings request) instead of lexical overlap
+            **query_kwargs: Passed through to query_knowledge_base
+            
+        Returns:
+            {"context": str, "snippets": [...], "tokens": int}
+        """
+        matches = self.query_knowledge_base(query, top_k, **query_kwargs)
+        
+        query_embedding, embed_fn = None, None
+        if semantic_snippets:
+            query_embedding = self.embed_query(query)
+            embed_fn = lambda texts: embed_texts(self.openai_client, texts, model=self.embedding_model)
+        
+        snippets = pack_context(query, matches, token_budget, query_embedding, embed_fn)
+        return {
+            'context': format_context(snippets),
+            'snippets': snippets,
+            'tokens': sum(snippet['tokens'] for snippet in snippets)
+        }
 
 # Usage example
 if __name__ == "__main__":
@@ -353,7 +902,10 @@ if __name__ == "__main__":
     )
     
     # Setup the knowledge base
-    kb.setup_knowledge_base()
+    try:
+        kb.setup_knowledge_base()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
     
     # Example query
     results = kb.query_knowledge_base("How to make money online?")
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+Structured spans and counters for the ingestion pipeline (fetch, clean, embed, upsert), per
+document and per chunk, exported as a Prometheus text file and a JSON run summary
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from latency_histogram import LatencyHistogram
+
+DEFAULT_METRICS_DIR = os.path.join('.cache', 'metrics')
+
+# Statuses the OpenAI client retries (after backing off)
+RETRYABLE_STATUSES = {408, 409, 429}
+
+PROMETHEUS_QUANTILES = (0.5, 0.95, 0.99)
+
+# Counters reported as per-stage throughput (bytes/s while fetching, tokens/s while embedding)
+THROUGHPUT_COUNTERS = ('bytes', 'tokens')
+
+
+class Span:
+    """One timed stage; counters added here are attributed to the span's stage and document"""
+
+    def __init__(self, metrics: "PipelineMetrics", stage: str, attrs: Dict[str, Any], parent: Optional["Span"] = None):
+        self.metrics = metrics
+        self.stage = stage
+        self.parent = parent
+        self.attrs = attrs
+        self.counters: Dict[str, float] = {}
+
+    def context(self) -> Dict[str, Any]:
+        """Attributes of this span and the spans enclosing it (a chunk index reaches its embed and upsert spans)"""
+        context = self.parent.context() if self.parent else {}
+        context.update(self.attrs)
+        return context
+
+    def count(self, name: str, value: float = 1):
+        self.metrics.count(name, value, span=self)
+
+
+class PipelineMetrics:
+    def __init__(self, run_name: str, output_dir: Optional[str] = None):
+        """
+        Initialize metrics for one ingestion run
+
+        Args:
+            run_name: Name of the script or pipeline (prefix of every output file, "run" label)
+            output_dir: Directory for span logs, run summaries and Prometheus text files
+                        (default: INGESTION_METRICS_DIR or .cache/metrics)
+        """
+        self.run_name = run_name
+        self.output_dir = output_dir or os.getenv('INGESTION_METRICS_DIR', DEFAULT_METRICS_DIR)
+        self.started_at = time.time()
+        self.run_id = f"{run_name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}"
+
+        self.stages: Dict[str, LatencyHistogram] = {}
+        self.errors: Dict[str, int] = {}
+        self.counters: Dict[tuple, float] = {}
+        self.documents: List[Dict[str, Any]] = []
+        self._document: Optional[Dict[str, Any]] = None
+
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans_file = None
+        self._finished = False
+
+    @property
+    def spans_path(self) -> str:
+        return os.path.join(self.output_dir, f"{self.run_id}.spans.jsonl")
+
+    def _write_span(self, record: Dict[str, Any]):
+        """Append one record to the span log (opened on first use, flushed per line so it can be tailed)"""
+        with self._lock:
+            if self._finished:
+                return
+            if self._spans_file is None:
+                os.makedirs(self.output_dir, exist_ok=True)
+                self._spans_file = open(self.spans_path, 'a', encoding='utf-8')
+            self._spans_file.write(json.dumps(record, default=str) + '\n')
+            self._spans_file.flush()
+
+    def begin_document(self, doc: str, **attrs):
+        """Attribute following spans to a document (closes the previous one)"""
+        self.end_document()
+        with self._lock:
+            self._document = {'doc': doc, 'attrs': attrs, 'busy_ms': 0.0, 'stages': {}, 'counters': {}, 'errors': 0}
+
+    def end_document(self):
+        """Close the current document (spans after this are not attributed to any document)"""
+        with self._lock:
+            document, self._document = self._document, None
+            if document is None:
+                return
+            self.documents.append(document)
+            histogram = self.stages.setdefault('document', LatencyHistogram())
+        # Busy time only: rate-limit sleeps between documents are not part of a document
+        histogram.record(document['busy_ms'])
+        self._write_span(dict(
+            {'ts': round(time.time(), 3), 'run': self.run_name, 'stage': 'document', 'doc': document['doc'],
+             'ms': round(document['busy_ms'], 3), 'status': 'error' if document['errors'] else 'ok',
+             'stages': {name: round(ms, 3) for name, ms in document['stages'].items()},
+             'counters': document['counters']},
+            **document['attrs']
+        ))
+
+    @contextmanager
+    def span(self, stage: str, **attrs) -> Iterator[Span]:
+        """
+        Time a stage of the current document (chunk=... for per-chunk stages)
+
+        Exceptions are recorded as stage errors and re-raised.
+        """
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        current = Span(self, stage, attrs, stack[-1] if stack else None)
+        stack.append(current)
+
+        error = None
+        started = time.perf_counter()
+        try:
+            yield current
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stack.pop()
+            with self._lock:
+                histogram = self.stages.setdefault(stage, LatencyHistogram())
+                if error is not None:
+                    self.errors[stage] = self.errors.get(stage, 0) + 1
+                document = self._document
+                if document is not None and not stack:
+                    document['busy_ms'] += elapsed_ms
+                if document is not None:
+                    document['stages'][stage] = document['stages'].get(stage, 0.0) + elapsed_ms
+                    document['errors'] += error is not None
+            histogram.record(elapsed_ms)
+
+            record = {'ts': round(time.time(), 3), 'run': self.run_name, 'stage': stage,
+                      'doc': document['doc'] if document else None, 'ms': round(elapsed_ms, 3),
+                      'status': 'error' if error is not None else 'ok'}
+            if current.parent:
+                record['parent'] = current.parent.stage
+            if error is not None:
+                record['error'] = f"{type(error).__name__}: {error}"
+            record.update(current.context())
+            record.update(current.counters)
+            self._write_span(record)
+
+    def count(self, name: str, value: float = 1, span: Optional[Span] = None):
+        """Add to a counter (bytes, tokens, retries, ...), attributed to the active span by default"""
+        if span is None:
+            stack = getattr(self._local, 'stack', None)
+            span = stack[-1] if stack else None
+        with self._lock:
+            if span is not None:
+                span.counters[name] = span.counters.get(name, 0) + value
+            key = (name, span.stage if span else '')
+            self.counters[key] = self.counters.get(key, 0) + value
+            if self._document is not None:
+                self._document['counters'][name] = self._document['counters'].get(name, 0) + value
+
+    def count_retries(self, http_client: Optional[httpx.Client] = None) -> httpx.Client:
+        """
+        httpx client for OpenAI(http_client=...) that counts retried responses
+
+        The OpenAI client retries rate limits, timeouts and server errors
+        internally; each such response is counted as a retry of the active stage.
+        """
+        if http_client is None:
+            http_client = httpx.Client(timeout=httpx.Timeout(600.0, connect=5.0))
+
+        def on_response(response: httpx.Response):
+            if response.status_code in RETRYABLE_STATUSES or response.status_code >= 500:
+                self.count('retries')
+
+        http_client.event_hooks['response'].append(on_response)
+        return http_client
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-stage latency percentiles and throughput, counters and the slowest documents"""
+        wall_s = time.time() - self.started_at
+        with self._lock:
+            histograms = dict(self.stages)
+            errors = dict(self.errors)
+            counters = dict(self.counters)
+            documents = list(self.documents)
+
+        stages = {}
+        for name, histogram in sorted(histograms.items()):
+            latency = histogram.summary()
+            busy_s = histogram.sum_ms / 1000
+            stage_summary = {
+                'count': latency['count'],
+                'errors': errors.get(name, 0),
+                'busy_s': round(busy_s, 3),
+                'p50_ms': latency.get('p50_ms', 0.0),
+                'p95_ms': latency.get('p95_ms', 0.0),
+                'p99_ms': latency.get('p99_ms', 0.0),
+                'max_ms': latency.get('max_ms', 0.0),
+                'per_s': round(latency['count'] / busy_s, 3) if busy_s else 0.0
+            }
+            for (counter, stage), value in sorted(counters.items()):
+                if stage == name and busy_s and counter in THROUGHPUT_COUNTERS:
+                    stage_summary[f"{counter}_per_s"] = round(value / busy_s, 1)
+            stages[name] = stage_summary
+
+        totals: Dict[str, Dict[str, float]] = {}
+        for (counter, stage), value in sorted(counters.items()):
+            totals.setdefault(counter, {})[stage or 'run'] = value
+
+        return {
+            'run': self.run_name,
+            'run_id': self.run_id,
+            'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started_at)),
+            'wall_s': round(wall_s, 3),
+            'documents': len(documents),
+            'documents_with_errors': sum(1 for document in documents if document['errors']),
+            'documents_per_s': round(len(documents) / wall_s, 3) if wall_s else 0.0,
+            'stages': stages,
+            'counters': totals,
+            'slowest_documents': [
+                {'doc': document['doc'], 'ms': round(document['busy_ms'], 1),
+                 'stages': {name: round(ms, 1) for name, ms in document['stages'].items()}}
+                for document in sorted(documents, key=lambda d: d['busy_ms'], reverse=True)[:5]
+            ]
+        }
+
+    def prometheus_text(self) -> str:
+        """Prometheus text exposition format (for the node_exporter textfile collector or a pushgateway)"""
+        run = _label_value(self.run_name)
+        with self._lock:
+            histograms = dict(self.stages)
+            errors = dict(self.errors)
+            counters = dict(self.counters)
+            documents = len(self.documents)
+
+        lines = [
+            "# HELP ingestion_stage_seconds Time spent in each ingestion stage",
+            "# TYPE ingestion_stage_seconds summary"
+        ]
+        for name, histogram in sorted(histograms.items()):
+            labels = f'run="{run}",stage="{_label_value(name)}"'
+            for quantile in PROMETHEUS_QUANTILES:
+                lines.append(f'ingestion_stage_seconds{{{labels},quantile="{quantile:g}"}} '
+                             f'{histogram.percentile(quantile * 100) / 1000:.6f}')
+            lines.append(f"ingestion_stage_seconds_sum{{{labels}}} {histogram.sum_ms / 1000:.6f}")
+            lines.append(f"ingestion_stage_seconds_count{{{labels}}} {int(histogram.total)}")
+
+        lines += [
+            "# HELP ingestion_stage_errors_total Stage executions that raised",
+            "# TYPE ingestion_stage_errors_total counter"
+        ]
+        for name in sorted(histograms):
+            lines.append(f'ingestion_stage_errors_total{{run="{run}",stage="{_label_value(name)}"}} {errors.get(name, 0)}')
+
+        for counter in sorted({counter for counter, _ in counters}):
+            metric = f"ingestion_{counter}_total"
+            lines += [f"# HELP {metric} Total {counter} by stage", f"# TYPE {metric} counter"]
+            for (name, stage), value in sorted(counters.items()):
+                if name == counter:
+                    lines.append(f'{metric}{{run="{run}",stage="{_label_value(stage)}"}} {value:g}')
+
+        lines += [
+            "# HELP ingestion_documents_total Documents processed",
+            "# TYPE ingestion_documents_total counter",
+            f'ingestion_documents_total{{run="{run}"}} {documents}',
+            "# HELP ingestion_run_duration_seconds Wall time of the run",
+            "# TYPE ingestion_run_duration_seconds gauge",
+            f'ingestion_run_duration_seconds{{run="{run}"}} {time.time() - self.started_at:.3f}',
+            "# HELP ingestion_last_run_timestamp_seconds When the run finished",
+            "# TYPE ingestion_last_run_timestamp_seconds gauge",
+            f'ingestion_last_run_timestamp_seconds{{run="{run}"}} {time.time():.0f}'
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def finish(self) -> Dict[str, Any]:
+        """
+        Close the run: write the JSON summary and the Prometheus text file, print the stage table
+
+        The Prometheus file (<run>.prom) is replaced atomically on every run;
+        summaries and span logs are kept per run (<run>-<timestamp>.*).
+        """
+        self.end_document()
+        summary = self.summary()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary_path = os.path.join(self.output_dir, f"{self.run_id}.json")
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        prom_path = os.path.join(self.output_dir, f"{self.run_name}.prom")
+        with open(prom_path + '.tmp', 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(prom_path + '.tmp', prom_path)
+
+        with self._lock:
+            self._finished = True
+            if self._spans_file is not None:
+                self._spans_file.close()
+                self._spans_file = None
+
+        print(f"\n⏱️  Stage timings ({summary['documents']} documents in {summary['wall_s']:.1f}s):")
+        for name, stage_summary in summary['stages'].items():
+            rates = ', '.join(f"{value:,.0f} {key[:-6]}/s" for key, value in stage_summary.items()
+                              if key.endswith('_per_s') and key != 'per_s')
+            print(f"   {name:<10} n={stage_summary['count']:<6} p50 {stage_summary['p50_ms']:9.1f}  "
+                  f"p95 {stage_summary['p95_ms']:9.1f} ms  {stage_summary['per_s']:8.2f}/s"
+                  f"{'  ' + rates if rates else ''}{'  ❌ ' + str(stage_summary['errors']) if stage_summary['errors'] else ''}")
+        for counter, by_stage in summary['counters'].items():
+            print(f"   {counter}: {sum(by_stage.values()):,.0f}")
+        print(f"📈 Metrics saved to {summary_path} and {prom_path}")
+        return summary
+
+
+def _label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -4,23 +4,44 @@ Process Coaching Calls tab documents from Google Sheet and store in Pinecone
 """
 
 import os
-import requests
+import sys
 from bs4 import BeautifulSoup
 from pinecone import Pinecone
 from openai import OpenAI
 import time
 import re
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_version import bump_index_version
+from http_cassette import cassette_http_client, cassette_index, cassette_session
+from lexical_index import BM25Index, default_lexical_index_path
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-stage spans and counters, exported at the end of the run (.cache/metrics)
+metrics = PipelineMetrics("process-coaching-calls")
+
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("process-coaching-calls", source="Coaching Calls")
+
 # Initialize clients
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=metrics.count_retries(cassette_http_client("process-coaching-calls"))))
+
+# Google Docs exports (recorded/replayed when HTTP_CASSETTE_MODE is set)
+docs_session = cassette_session("process-coaching-calls")
+
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+# Local BM25 index, updated alongside every upsert
+lexical_index = BM25Index.load(default_lexical_index_path('gpc-knowledge-base-v2'))
 
 # Connect to Pinecone index (NEW FRESH INDEX)
-index = pc.Index('gpc-knowledge-base-v2')
+index = cassette_index(pc, 'gpc-knowledge-base-v2', "process-coaching-calls")
 
 def extract_document_content(url):
     """Extract content from Google Docs URL"""
@@ -31,19 +52,22 @@ def extract_document_content(url):
         else:
             export_url = url + '&export=download&format=txt'
         
-        response = requests.get(export_url, timeout=30)
-        response.raise_for_status()
-        
-        # Clean up the content
-        content = response.text.strip()
+        with metrics.span('fetch') as span:
+            response = docs_session.get(export_url, timeout=30)
+            response.raise_for_status()
+            span.count('bytes', len(response.content))
         
-        # Remove any HTML tags if present
-        soup = BeautifulSoup(content, 'html.parser')
-        content = soup.get_text()
-        
-        # Clean up extra whitespace
-        content = re.sub(r'\n\s*\n', '\n\n', content)
-        content = re.sub(r'[ \t]+', ' ', content)
+        with metrics.span('clean'):
+            # Clean up the content
+            content = response.text.strip()
+            
+            # Remove any HTML tags if present
+            soup = BeautifulSoup(content, 'html.parser')
+            content = soup.get_text()
+            
+            # Clean up extra whitespace
+            content = re.sub(r'\n\s*\n', '\n\n', content)
+            content = re.sub(r'[ \t]+', ' ', content)
         
         return content.strip()
     
@@ -54,11 +78,15 @@ def extract_document_content(url):
 def create_embedding(text):
     """Create embedding using OpenAI"""
     try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
+        with metrics.span('embed') as span:
+            response = openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=text
+            )
+            span.count('tokens', response.usage.total_tokens)
         return response.data[0].embedding
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Failed to create embedding: {str(e)}")
         return None
@@ -89,14 +117,18 @@ def store_in_pinecone(title, content, video_url, category="Coaching Calls"):
         }
         
         # Store in Pinecone
-        index.upsert(vectors=[{
-            'id': vector_id,
-            'values': embedding,
-            'metadata': metadata
-        }])
+        with metrics.span('upsert'):
+            index.upsert(vectors=[{
+                'id': vector_id,
+                'values': embedding,
+                'metadata': metadata
+            }])
+            lexical_index.add_document(vector_id, content, metadata)
         
         return True
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Failed to store in Pinecone: {str(e)}")
         return False
@@ -298,6 +330,7 @@ def process_coaching_calls():
         title = f"Coaching Call {i}"
         
         print(f"\n📞 Processing {i}/{len(coaching_data)}: {title}")
+        metrics.begin_document(title)
         
         # Check if transcript_url is a Google Doc or Loom link
         if 'docs.google.com' in call['transcript_url']:
@@ -319,6 +352,12 @@ def process_coaching_calls():
             failed += 1
             continue
         
+        # Dry run: predict the embedding tokens, write nothing
+        if usage.dry_run:
+            usage.predict_embeddings([content])
+            successful += 1
+            continue
+        
         # Store in Pinecone
         if store_in_pinecone(title, content, call['video_url'], "Coaching Calls"):
             print(f"✅ Successfully stored: {title}")
@@ -330,6 +369,12 @@ def process_coaching_calls():
         # Small delay to avoid rate limits
         time.sleep(1)
     
+    # Persist the lexical index; cached query results no longer reflect the index contents
+    if not usage.dry_run:
+        lexical_index.save(default_lexical_index_path('gpc-knowledge-base-v2'))
+        bump_index_version('gpc-knowledge-base-v2')
+    metrics.finish()
+    
     print(f"\n🎉 Processing complete!")
     print(f"✅ Successfully processed: {successful} documents")
     print(f"❌ Failed: {failed} documents")
@@ -338,7 +383,7 @@ def process_coaching_calls():
     if successful > 0:
         print(f"\n🔍 Testing knowledge base...")
         test_query = "coaching call advice and tips"
-        test_embedding = create_embedding(test_query)
+        test_embedding = query_cache.get_or_create(test_query, create_embedding)
         
         if test_embedding:
             results = index.query(
@@ -352,4 +397,8 @@ def process_coaching_calls():
                 print(f"  - {match.metadata['title']} (Score: {match.score:.3f})")
 
 if __name__ == "__main__":
-    process_coaching_calls()
+    try:
+        process_coaching_calls()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
@@ -4,21 +4,42 @@ Process Course Content tab and extract Google Docs content for Pinecone
 """
 
 import os
-import requests
+import sys
 import re
 from openai import OpenAI
 from pinecone import Pinecone
 from typing import List, Dict
 import time
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_version import bump_index_version
+from http_cassette import cassette_http_client, cassette_index, cassette_session
+from lexical_index import BM25Index, default_lexical_index_path
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-stage spans and counters, exported at the end of the run (.cache/metrics)
+metrics = PipelineMetrics("process-course-content")
+
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("process-course-content", source="Course Content")
+
 # Initialize clients
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=metrics.count_retries(cassette_http_client("process-course-content"))))
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
 
+# Google Docs exports (recorded/replayed when HTTP_CASSETTE_MODE is set)
+docs_session = cassette_session("process-course-content")
+
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+# Local BM25 index, updated alongside every upsert
+lexical_index = BM25Index.load(default_lexical_index_path('gpc-knowledge-base'))
+
 # Course Content data
 course_content_data = [
     {"title": "Watch this first neu", "url": "https://docs.google.com/document/d/1NCVyRrpqbjejU3o3Ry6fnkFWxdRX1bKDhVig6o90xvQ/edit?usp=sharing", "source_type": "doc", "language": "english", "status": "active"},
@@ -103,11 +124,15 @@ def extract_doc_content(url: str) -> str:
         doc_id = doc_id.group(1)
         export_url = f"https://docs.google.com/document/d/{doc_id}/export?format=txt"
         
-        response = requests.get(export_url, timeout=30)
+        with metrics.span('fetch') as span:
+            response = docs_session.get(export_url, timeout=30)
+            span.attrs['status'] = response.status_code
+            span.count('bytes', len(response.content))
         if response.status_code == 200:
-            content = response.text
-            # Clean up the content
-            content = content.replace('\r\n', '\n').strip()
+            with metrics.span('clean'):
+                content = response.text
+                # Clean up the content
+                content = content.replace('\r\n', '\n').strip()
             return content
         else:
             return f"Failed to fetch document content. Status: {response.status_code}"
@@ -118,11 +143,15 @@ def extract_doc_content(url: str) -> str:
 def create_embedding(text: str) -> List[float]:
     """Create OpenAI embedding for text"""
     try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
+        with metrics.span('embed') as span:
+            response = openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=text
+            )
+            span.count('tokens', response.usage.total_tokens)
         return response.data[0].embedding
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"Error creating embedding: {e}")
         return []
@@ -132,13 +161,14 @@ def process_documents():
     print("🚀 Starting to process Course Content documents...")
     
     # Connect to Pinecone
-    index = pc.Index("gpc-knowledge-base")
+    index = cassette_index(pc, "gpc-knowledge-base", "process-course-content")
     
     processed_count = 0
     failed_count = 0
     
     for i, doc in enumerate(course_content_data, 1):
         print(f"\n📄 Processing {i}/{len(course_content_data)}: {doc['title']}")
+        metrics.begin_document(doc['title'])
         
         # Extract content
         content = extract_doc_content(doc['url'])
@@ -148,6 +178,12 @@ def process_documents():
             failed_count += 1
             continue
         
+        # Dry run: predict the embedding tokens, write nothing
+        if usage.dry_run:
+            usage.predict_embeddings([content])
+            processed_count += 1
+            continue
+        
         # Create embedding
         embedding = create_embedding(content)
         if not embedding:
@@ -169,7 +205,9 @@ def process_documents():
         # Store in Pinecone
         try:
             vector_id = f"course_content_{i}_{doc['title'].replace(' ', '_').lower()}"
-            index.upsert([(vector_id, embedding, metadata)])
+            with metrics.span('upsert'):
+                index.upsert([(vector_id, embedding, metadata)])
+                lexical_index.add_document(vector_id, content, metadata)
             print(f"✅ Successfully stored: {doc['title']}")
             processed_count += 1
         except Exception as e:
@@ -179,6 +217,12 @@ def process_documents():
         # Rate limiting
         time.sleep(1)
     
+    # Persist the lexical index; cached query results no longer reflect the index contents
+    if not usage.dry_run:
+        lexical_index.save(default_lexical_index_path('gpc-knowledge-base'))
+        bump_index_version('gpc-knowledge-base')
+    metrics.finish()
+    
     print(f"\n🎉 Processing complete!")
     print(f"✅ Successfully processed: {processed_count} documents")
     print(f"❌ Failed: {failed_count} documents")
@@ -188,7 +232,7 @@ def process_documents():
     try:
         # Create a test query embedding
         test_query = "How to make money online with social media"
-        test_embedding = create_embedding(test_query)
+        test_embedding = query_cache.get_or_create(test_query, create_embedding)
         
         if test_embedding:
             results = index.query(
@@ -201,8 +245,14 @@ def process_documents():
             for match in results.matches:
                 print(f"  - {match.metadata['title']} (Score: {match.score:.3f})")
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error testing knowledge base: {e}")
 
 if __name__ == "__main__":
-    process_documents()
+    try:
+        process_documents()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
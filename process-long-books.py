@@ -4,23 +4,45 @@ Process long books by chunking them into smaller pieces
 """
 
 import os
-import requests
+import sys
 from bs4 import BeautifulSoup
 from pinecone import Pinecone
 from openai import OpenAI
 import time
 import re
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_version import bump_index_version
+from http_cassette import cassette_http_client, cassette_index, cassette_session
+from lexical_index import BM25Index, default_lexical_index_path
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
+from hierarchy import DOCUMENT_NAMESPACE, document_id, document_record
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-stage spans and counters, exported at the end of the run (.cache/metrics)
+metrics = PipelineMetrics("process-long-books")
+
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("process-long-books", source="Books")
+
 # Initialize clients
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=metrics.count_retries(cassette_http_client("process-long-books"))))
+
+# Google Docs exports (recorded/replayed when HTTP_CASSETTE_MODE is set)
+docs_session = cassette_session("process-long-books")
+
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+# Local BM25 index, updated alongside every upsert
+lexical_index = BM25Index.load(default_lexical_index_path('gpc-knowledge-base'))
 
 # Connect to Pinecone index
-index = pc.Index('gpc-knowledge-base')
+index = cassette_index(pc, 'gpc-knowledge-base', "process-long-books")
 
 def extract_document_content(url):
     """Extract content from Google Docs URL"""
@@ -31,19 +53,22 @@ def extract_document_content(url):
         else:
             export_url = url + '&export=download&format=txt'
         
-        response = requests.get(export_url, timeout=30)
-        response.raise_for_status()
-        
-        # Clean up the content
-        content = response.text.strip()
+        with metrics.span('fetch') as span:
+            response = docs_session.get(export_url, timeout=30)
+            response.raise_for_status()
+            span.count('bytes', len(response.content))
         
-        # Remove any HTML tags if present
-        soup = BeautifulSoup(content, 'html.parser')
-        content = soup.get_text()
-        
-        # Clean up extra whitespace
-        content = re.sub(r'\n\s*\n', '\n\n', content)
-        content = re.sub(r'[ \t]+', ' ', content)
+        with metrics.span('clean'):
+            # Clean up the content
+            content = response.text.strip()
+            
+            # Remove any HTML tags if present
+            soup = BeautifulSoup(content, 'html.parser')
+            content = soup.get_text()
+            
+            # Clean up extra whitespace
+            content = re.sub(r'\n\s*\n', '\n\n', content)
+            content = re.sub(r'[ \t]+', ' ', content)
         
         return content.strip()
     
@@ -106,22 +131,26 @@ def chunk_text(text, max_chunk_size=40000):
 def create_embedding(text):
     """Create embedding using OpenAI"""
     try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
+        with metrics.span('embed') as span:
+            response = openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=text
+            )
+            span.count('tokens', response.usage.total_tokens)
         return response.data[0].embedding
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Failed to create embedding: {str(e)}")
         return None
 
 def store_chunk_in_pinecone(title, chunk_content, chunk_index, total_chunks, category="Books"):
-    """Store document chunk in Pinecone"""
+    """Store document chunk in Pinecone (returns the chunk embedding, or None on failure)"""
     try:
         # Create embedding
         embedding = create_embedding(chunk_content)
         if not embedding:
-            return False
+            return None
         
         # Create vector ID (sanitize title)
         base_id = f"books_{re.sub(r'[^a-zA-Z0-9_-]', '_', title.lower())}"
@@ -136,20 +165,41 @@ def store_chunk_in_pinecone(title, chunk_content, chunk_index, total_chunks, cat
             'status': 'active',
             'chunk_index': chunk_index + 1,
             'total_chunks': total_chunks,
-            'content_length': len(chunk_content)
+            'content_length': len(chunk_content),
+            'doc_id': document_id(title),
+            'level': 'chunk'
         }
         
         # Store in Pinecone
-        index.upsert(vectors=[{
-            'id': vector_id,
-            'values': embedding,
-            'metadata': metadata
-        }])
+        with metrics.span('upsert'):
+            index.upsert(vectors=[{
+                'id': vector_id,
+                'values': embedding,
+                'metadata': metadata
+            }])
+            lexical_index.add_document(vector_id, chunk_content, metadata)
         
-        return True
+        return embedding
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Failed to store chunk in Pinecone: {str(e)}")
+        return None
+
+def store_document_vector(title, chunk_embeddings, category="Books"):
+    """Store the document-level vector (mean of its chunk vectors) used by coarse-to-fine search"""
+    try:
+        record = document_record(document_id(title), chunk_embeddings, {
+            'title': title,
+            'category': category
+        })
+        with metrics.span('upsert', level='document'):
+            index.upsert(vectors=[record], namespace=DOCUMENT_NAMESPACE)
+        return True
+    
+    except Exception as e:
+        print(f"❌ Failed to store document vector: {str(e)}")
         return False
 
 def process_long_books():
@@ -178,6 +228,7 @@ def process_long_books():
     
     for i, book in enumerate(long_books, 1):
         print(f"\n📚 Processing {i}/{len(long_books)}: {book['title']}")
+        metrics.begin_document(book['title'])
         
         # Extract content
         content = extract_document_content(book['url'])
@@ -192,14 +243,23 @@ def process_long_books():
         chunks = chunk_text(content, max_chunk_size=40000)
         print(f"📦 Split into {len(chunks)} chunks")
         
+        # Dry run: predict the embedding tokens, write nothing
+        if usage.dry_run:
+            usage.predict_embeddings(chunks)
+            continue
+        
         # Store each chunk
         successful_chunks = 0
         failed_chunks = 0
+        chunk_embeddings = []
         
         for chunk_index, chunk in enumerate(chunks):
             print(f"  📄 Storing chunk {chunk_index + 1}/{len(chunks)}...")
             
-            if store_chunk_in_pinecone(book['title'], chunk, chunk_index, len(chunks), "Books"):
+            with metrics.span('chunk', chunk=chunk_index):
+                embedding = store_chunk_in_pinecone(book['title'], chunk, chunk_index, len(chunks), "Books")
+            if embedding:
+                chunk_embeddings.append(embedding)
                 successful_chunks += 1
                 print(f"  ✅ Chunk {chunk_index + 1} stored successfully")
             else:
@@ -209,6 +269,10 @@ def process_long_books():
             # Small delay to avoid rate limits
             time.sleep(1)
         
+        # Document-level vector for coarse-to-fine retrieval
+        if chunk_embeddings and store_document_vector(book['title'], chunk_embeddings, "Books"):
+            print(f"  ✅ Document vector stored")
+        
         print(f"📊 {book['title']} summary:")
         print(f"  ✅ Successful chunks: {successful_chunks}")
         print(f"  ❌ Failed chunks: {failed_chunks}")
@@ -216,6 +280,12 @@ def process_long_books():
         total_successful += successful_chunks
         total_failed += failed_chunks
     
+    # Persist the lexical index; cached query results no longer reflect the index contents
+    if not usage.dry_run:
+        lexical_index.save(default_lexical_index_path('gpc-knowledge-base'))
+        bump_index_version('gpc-knowledge-base')
+    metrics.finish()
+    
     print(f"\n🎉 Processing complete!")
     print(f"✅ Total successful chunks: {total_successful}")
     print(f"❌ Total failed chunks: {total_failed}")
@@ -224,7 +294,7 @@ def process_long_books():
     if total_successful > 0:
         print(f"\n🔍 Testing knowledge base...")
         test_query = "atomic habits and personal development"
-        test_embedding = create_embedding(test_query)
+        test_embedding = query_cache.get_or_create(test_query, create_embedding)
         
         if test_embedding:
             results = index.query(
@@ -238,4 +308,8 @@ def process_long_books():
                 print(f"  - {match.metadata['title']} (Score: {match.score:.3f})")
 
 if __name__ == "__main__":
-    process_long_books()
+    try:
+        process_long_books()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
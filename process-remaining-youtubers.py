@@ -4,23 +4,44 @@ Process remaining Youtubers tab documents from Google Sheet and store in Pinecon
 """
 
 import os
-import requests
+import sys
 from bs4 import BeautifulSoup
 from pinecone import Pinecone
 from openai import OpenAI
 import time
 import re
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_version import bump_index_version
+from http_cassette import cassette_http_client, cassette_index, cassette_session
+from lexical_index import BM25Index, default_lexical_index_path
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-stage spans and counters, exported at the end of the run (.cache/metrics)
+metrics = PipelineMetrics("process-remaining-youtubers")
+
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("process-remaining-youtubers", source="Youtubers")
+
 # Initialize clients
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=metrics.count_retries(cassette_http_client("process-remaining-youtubers"))))
+
+# Google Docs exports (recorded/replayed when HTTP_CASSETTE_MODE is set)
+docs_session = cassette_session("process-remaining-youtubers")
+
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+# Local BM25 index, updated alongside every upsert
+lexical_index = BM25Index.load(default_lexical_index_path('gpc-knowledge-base'))
 
 # Connect to Pinecone index
-index = pc.Index('gpc-knowledge-base')
+index = cassette_index(pc, 'gpc-knowledge-base', "process-remaining-youtubers")
 
 def extract_document_content(url):
     """Extract content from Google Docs URL"""
@@ -31,19 +52,22 @@ def extract_document_content(url):
         else:
             export_url = url + '&export=download&format=txt'
         
-        response = requests.get(export_url, timeout=30)
-        response.raise_for_status()
-        
-        # Clean up the content
-        content = response.text.strip()
+        with metrics.span('fetch') as span:
+            response = docs_session.get(export_url, timeout=30)
+            response.raise_for_status()
+            span.count('bytes', len(response.content))
         
-        # Remove any HTML tags if present
-        soup = BeautifulSoup(content, 'html.parser')
-        content = soup.get_text()
-        
-        # Clean up extra whitespace
-        content = re.sub(r'\n\s*\n', '\n\n', content)
-        content = re.sub(r'[ \t]+', ' ', content)
+        with metrics.span('clean'):
+            # Clean up the content
+            content = response.text.strip()
+            
+            # Remove any HTML tags if present
+            soup = BeautifulSoup(content, 'html.parser')
+            content = soup.get_text()
+            
+            # Clean up extra whitespace
+            content = re.sub(r'\n\s*\n', '\n\n', content)
+            content = re.sub(r'[ \t]+', ' ', content)
         
         return content.strip()
     
@@ -54,11 +78,15 @@ def extract_document_content(url):
 def create_embedding(text):
     """Create embedding using OpenAI"""
     try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
+        with metrics.span('embed') as span:
+            response = openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=text
+            )
+            span.count('tokens', response.usage.total_tokens)
         return response.data[0].embedding
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Failed to create embedding: {str(e)}")
         return None
@@ -88,14 +116,18 @@ def store_in_pinecone(title, content, video_url, creator, category="Youtubers"):
         }
         
         # Store in Pinecone
-        index.upsert(vectors=[{
-            'id': vector_id,
-            'values': embedding,
-            'metadata': metadata
-        }])
+        with metrics.span('upsert'):
+            index.upsert(vectors=[{
+                'id': vector_id,
+                'values': embedding,
+                'metadata': metadata
+            }])
+            lexical_index.add_document(vector_id, content, metadata)
         
         return True
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Failed to store in Pinecone: {str(e)}")
         return False
@@ -170,6 +202,7 @@ def process_remaining_youtubers():
     
     for i, video in enumerate(remaining_youtubers_data, 1):
         print(f"\n📺 Processing {i}/{len(remaining_youtubers_data)}: {video['title']}")
+        metrics.begin_document(video['title'])
         print(f"👤 Creator: {video['creator']}")
         
         # Extract content from Google Doc transcript
@@ -185,6 +218,12 @@ def process_remaining_youtubers():
             failed += 1
             continue
         
+        # Dry run: predict the embedding tokens, write nothing
+        if usage.dry_run:
+            usage.predict_embeddings([content])
+            successful += 1
+            continue
+        
         # Store in Pinecone
         if store_in_pinecone(video['title'], content, video['video_url'], video['creator'], "Youtubers"):
             print(f"✅ Successfully stored: {video['title']}")
@@ -196,6 +235,12 @@ def process_remaining_youtubers():
         # Small delay to avoid rate limits
         time.sleep(1)
     
+    # Persist the lexical index; cached query results no longer reflect the index contents
+    if not usage.dry_run:
+        lexical_index.save(default_lexical_index_path('gpc-knowledge-base'))
+        bump_index_version('gpc-knowledge-base')
+    metrics.finish()
+    
     print(f"\n🎉 Processing complete!")
     print(f"✅ Successfully processed: {successful} documents")
     print(f"❌ Failed: {failed} documents")
@@ -204,7 +249,7 @@ def process_remaining_youtubers():
     if successful > 0:
         print(f"\n🔍 Testing knowledge base...")
         test_query = "organic dropshipping case studies and revenue"
-        test_embedding = create_embedding(test_query)
+        test_embedding = query_cache.get_or_create(test_query, create_embedding)
         
         if test_embedding:
             results = index.query(
@@ -218,4 +263,8 @@ def process_remaining_youtubers():
                 print(f"  - {match.metadata['title']} by {match.metadata.get('creator', 'Unknown')} (Score: {match.score:.3f})")
 
 if __name__ == "__main__":
-    process_remaining_youtubers()
+    try:
+        process_remaining_youtubers()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
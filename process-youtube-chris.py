@@ -4,21 +4,43 @@ Process YouTube (Chris) tab and extract Google Docs content for Pinecone
 """
 
 import os
-import requests
+import sys
 import re
 from openai import OpenAI
 from pinecone import Pinecone
 from typing import List, Dict
 import time
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_version import bump_index_version
+from http_cassette import cassette_http_client, cassette_index, cassette_session
+from lexical_index import BM25Index, default_lexical_index_path
+from pipeline_metrics import PipelineMetrics
+from usage_meter import BudgetExceeded, UsageMeter
+from taxonomy import categorize_youtube_content
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
+# Per-stage spans and counters, exported at the end of the run (.cache/metrics)
+metrics = PipelineMetrics("process-youtube-chris")
+
+# Token and cost accounting (USAGE_BUDGET_USD, USAGE_ON_BUDGET, USAGE_DRY_RUN)
+usage = UsageMeter.from_env("process-youtube-chris", source="YouTube (Chris)")
+
 # Initialize clients
-openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY'), http_client=metrics.count_retries(cassette_http_client("process-youtube-chris"))))
 pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
 
+# Google Docs exports (recorded/replayed when HTTP_CASSETTE_MODE is set)
+docs_session = cassette_session("process-youtube-chris")
+
+# Cache test-query embeddings across runs
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+# Local BM25 index, updated alongside every upsert
+lexical_index = BM25Index.load(default_lexical_index_path('gpc-knowledge-base'))
+
 # YouTube (Chris) data
 youtube_chris_data = [
     {"title": "We tried Organic Dropshipping for 10 Days (Realistic Results)", "url": "https://docs.google.com/document/d/1oPHh0sTvJGJb6phVZJbaXYADgm_LPYWX7frdpt-akgo/edit?usp=sharing", "source_type": "doc", "language": "english", "status": "active"},
@@ -62,11 +84,15 @@ def extract_doc_content(url: str) -> str:
         doc_id = doc_id.group(1)
         export_url = f"https://docs.google.com/document/d/{doc_id}/export?format=txt"
         
-        response = requests.get(export_url, timeout=30)
+        with metrics.span('fetch') as span:
+            response = docs_session.get(export_url, timeout=30)
+            span.attrs['status'] = response.status_code
+            span.count('bytes', len(response.content))
         if response.status_code == 200:
-            content = response.text
-            # Clean up the content
-            content = content.replace('\r\n', '\n').strip()
+            with metrics.span('clean'):
+                content = response.text
+                # Clean up the content
+                content = content.replace('\r\n', '\n').strip()
             return content
         else:
             return f"Failed to fetch document content. Status: {response.status_code}"
@@ -77,52 +103,32 @@ def extract_doc_content(url: str) -> str:
 def create_embedding(text: str) -> List[float]:
     """Create OpenAI embedding for text"""
     try:
-        response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
-            input=text
-        )
+        with metrics.span('embed') as span:
+            response = openai_client.embeddings.create(
+                model="text-embedding-3-small",
+                input=text
+            )
+            span.count('tokens', response.usage.total_tokens)
         return response.data[0].embedding
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"Error creating embedding: {e}")
         return []
 
-def categorize_youtube_content(title: str) -> str:
-    """Categorize YouTube content based on title"""
-    title_lower = title.lower()
-    
-    # TikTok Shop content
-    if "tiktok shop" in title_lower or "tiktok" in title_lower:
-        return "tiktok_shop"
-    # Case studies with specific dollar amounts
-    elif any(word in title_lower for word in ["$", "k", "month", "days", "case study", "profit"]):
-        return "case_studies"
-    # Organic dropshipping strategies
-    elif "organic dropshipping" in title_lower or "dropshipping" in title_lower:
-        return "dropshipping_strategies"
-    # YouTube growth
-    elif "subscribers" in title_lower or "youtube" in title_lower:
-        return "youtube_growth"
-    # Platform-specific strategies
-    elif any(platform in title_lower for platform in ["facebook", "instagram", "meta"]):
-        return "social_media_strategy"
-    # AI and viral content
-    elif any(word in title_lower for word in ["ai", "viral", "go viral"]):
-        return "advanced_tactics"
-    else:
-        return "case_studies"  # Default to case studies for YouTube content
-
 def process_youtube_documents():
     """Process all YouTube documents and store in Pinecone"""
     print("🚀 Starting to process YouTube (Chris) documents...")
     
     # Connect to Pinecone
-    index = pc.Index("gpc-knowledge-base")
+    index = cassette_index(pc, "gpc-knowledge-base", "process-youtube-chris")
     
     processed_count = 0
     failed_count = 0
     
     for i, doc in enumerate(youtube_chris_data, 1):
         print(f"\n📄 Processing {i}/{len(youtube_chris_data)}: {doc['title']}")
+        metrics.begin_document(doc['title'])
         
         # Extract content
         content = extract_doc_content(doc['url'])
@@ -132,6 +138,12 @@ def process_youtube_documents():
             failed_count += 1
             continue
         
+        # Dry run: predict the embedding tokens, write nothing
+        if usage.dry_run:
+            usage.predict_embeddings([content])
+            processed_count += 1
+            continue
+        
         # Create embedding
         embedding = create_embedding(content)
         if not embedding:
@@ -159,7 +171,9 @@ def process_youtube_documents():
         # Store in Pinecone
         try:
             vector_id = f"youtube_chris_{i}_{doc['title'].replace(' ', '_').lower()[:50]}"
-            index.upsert([(vector_id, embedding, metadata)])
+            with metrics.span('upsert'):
+                index.upsert([(vector_id, embedding, metadata)])
+                lexical_index.add_document(vector_id, content, metadata)
             print(f"✅ Successfully stored: {doc['title']} (Category: {category})")
             processed_count += 1
         except Exception as e:
@@ -169,6 +183,12 @@ def process_youtube_documents():
         # Rate limiting
         time.sleep(1)
     
+    # Persist the lexical index; cached query results no longer reflect the index contents
+    if not usage.dry_run:
+        lexical_index.save(default_lexical_index_path('gpc-knowledge-base'))
+        bump_index_version('gpc-knowledge-base')
+    metrics.finish()
+    
     print(f"\n🎉 YouTube (Chris) processing complete!")
     print(f"✅ Successfully processed: {processed_count} documents")
     print(f"❌ Failed: {failed_count} documents")
@@ -178,7 +198,7 @@ def process_youtube_documents():
     try:
         # Create a test query embedding for TikTok Shop
         test_query = "How to make money with TikTok Shop as a beginner"
-        test_embedding = create_embedding(test_query)
+        test_embedding = query_cache.get_or_create(test_query, create_embedding)
         
         if test_embedding:
             results = index.query(
@@ -193,8 +213,14 @@ def process_youtube_documents():
                 tab = match.metadata.get('tab', 'Unknown')
                 print(f"  - {title} ({tab}) - Score: {match.score:.3f}")
     
+    except BudgetExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error testing knowledge base: {e}")
 
 if __name__ == "__main__":
-    process_youtube_documents()
+    try:
+        process_youtube_documents()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
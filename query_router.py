@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Query Router
+Classifies a query embedding against locally cached category centroids (no network call)
+and turns the best categories into a metadata pre-filter for the vector query
+"""
+
+from typing import Any, Dict, List, Optional
+
+from category_classifier import CategoryClassifier
+
+
+class QueryRouter(CategoryClassifier):
+    def __init__(self,
+                 centroids: Dict[str, List[float]],
+                 max_categories: int = 2,
+                 min_similarity: float = 0.2,
+                 margin: float = 0.05):
+        """
+        Initialize the router
+
+        Args:
+            centroids: category key → centroid vector
+            max_categories: Maximum number of categories a query is routed to
+            min_similarity: Best-category similarity required before routing at all
+            margin: Categories within this similarity of the best one are included
+        """
+        super().__init__(centroids, threshold=min_similarity, margin=margin, max_labels=max_categories)
+
+    def route(self, query_embedding: List[float]) -> List[str]:
+        """Categories the query should be restricted to ([] when routing is not confident)"""
+        return [key for key, _ in self.classify(query_embedding)]
+
+    def route_filter(self, query_embedding: List[float]) -> Optional[Dict[str, Any]]:
+        """Pinecone metadata filter for the routed categories, or None"""
+        categories = self.route(query_embedding)
+        if not categories:
+            return None
+        return {'category': {'$in': categories}}
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Rebuild the lexical index
+One-off backfill of the local BM25 index (and with it the title index) from the chunk vectors
+already stored in Pinecone, for indexes ingested before the lexical index was kept in step
+
+Usage: python rebuild-lexical-index.py [index-name ...]
+"""
+
+import os
+import sys
+from pinecone import Pinecone
+from index_snapshot import iter_vector_batches
+from index_version import bump_index_version
+from lexical_index import BM25Index, default_lexical_index_path
+from title_index import TitleIndex
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Initialize clients
+pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+
+# pinecone-setup.py writes gpc-knowledge-base, process-coaching-calls.py gpc-knowledge-base-v2
+INDEX_NAMES = ["gpc-knowledge-base", "gpc-knowledge-base-v2"]
+
+
+def rebuild_lexical_index(index_name):
+    """Replace the local BM25 index of one Pinecone index with every chunk it currently holds"""
+
+    print(f"📸 Snapshotting chunks from {index_name}...")
+    lexical_index = BM25Index()
+
+    # Chunk vectors only: document-level vectors live in their own namespace
+    for batch in iter_vector_batches(pc.Index(index_name)):
+        for vector_id, _, metadata in batch:
+            text = metadata.get('text') or metadata.get('content')
+            if text:
+                lexical_index.add_document(vector_id, text, metadata)
+        print(f"   {len(lexical_index)} chunks indexed")
+
+    if not len(lexical_index):
+        print(f"❌ No chunk text found in {index_name}, keeping the existing lexical index")
+        return False
+
+    path = default_lexical_index_path(index_name)
+    lexical_index.save(path)
+    titles = TitleIndex.build(lexical_index.metadata, source_paths=[])
+
+    # Cached hybrid/lexical results refer to the old lexical index
+    bump_index_version(index_name)
+
+    print(f"✅ Rebuilt lexical index for {index_name}: {len(lexical_index)} chunks, {len(titles)} titles")
+    print(f"💾 Saved to {path}")
+    return True
+
+if __name__ == "__main__":
+    index_names = sys.argv[1:] or INDEX_NAMES
+    rebuilt = [rebuild_lexical_index(index_name) for index_name in index_names]
+    sys.exit(0 if all(rebuilt) else 1)
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Local Reranking
+Re-scores over-fetched candidates with exact cosine, BM25 term overlap and title match
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import numpy as np
+
+from lexical_index import BM25Index
+from title_index import normalize_title, trigrams
+
+
+@lru_cache(maxsize=4096)
+def _title_grams(title: str) -> FrozenSet[str]:
+    normalized = normalize_title(title)
+    return frozenset(trigrams(normalized)) if normalized else frozenset()
+
+
+class ChunkVectorCache:
+    """Bounded LRU of unit-normalized chunk vectors, filled from query results that include values"""
+
+    def __init__(self, max_entries: int = 20000):
+        self.max_entries = max_entries
+        self._vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()  # Shared by the worker-pool threads serving queries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._vectors)
+
+    def put_matches(self, matches: List[Any]):
+        normalized = []
+        for match in matches:
+            values = getattr(match, 'values', None)
+            if not values:
+                continue
+            vector = np.asarray(values, dtype=np.float32)
+            normalized.append((match.id, vector / (np.linalg.norm(vector) or 1.0)))
+
+        with self._lock:
+            for doc_id, vector in normalized:
+                self._vectors[doc_id] = vector
+                self._vectors.move_to_end(doc_id)
+
+            while len(self._vectors) > self.max_entries:
+                self._vectors.popitem(last=False)
+
+    def get(self, doc_id: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self._vectors.get(doc_id)
+            if vector is not None:
+                self._vectors.move_to_end(doc_id)
+            return vector
+
+
+class Reranker:
+    def __init__(self,
+                 lexical_index: Optional[BM25Index] = None,
+                 vector_cache: Optional[ChunkVectorCache] = None,
+                 weights: Tuple[float, float, float] = (0.7, 0.2, 0.1),
+                 budget_ms: float = 5.0):
+        """
+        Initialize the reranker
+
+        Args:
+            lexical_index: BM25 index used for the term-overlap feature
+            vector_cache: Chunk vectors for candidates returned without values
+            weights: Weights of the (cosine, bm25, title) features
+            budget_ms: CPU budget; features not computed in time are left out
+        """
+        self.lexical_index = lexical_index
+        self.vector_cache = vector_cache or ChunkVectorCache()
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.budget_ms = budget_ms
+
+    def _cosine_feature(self, query_embedding: List[float], candidates: List[Any]) -> np.ndarray:
+        """Exact cosine against cached/returned vectors, falling back to the vector score"""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        rows, fallback = [], np.zeros(len(candidates), dtype=np.float32)
+        have_vector = np.zeros(len(candidates), dtype=bool)
+        for i, match in enumerate(candidates):
+            vector = self.vector_cache.get(match.id)
+            if vector is not None:
+                rows.append(vector)
+                have_vector[i] = True
+            else:
+                # Hybrid results carry the dense score separately; plain Pinecone matches are cosine scores
+                if hasattr(match, 'dense_score'):
+                    fallback[i] = match.dense_score or 0.0
+                else:
+                    fallback[i] = match.score
+
+        if rows:
+            fallback[have_vector] = np.stack(rows) @ query
+        return fallback
+
+    def _lexical_feature(self, query: str, candidates: List[Any]) -> np.ndarray:
+        scores = np.asarray(
+            self.lexical_index.score_documents(query, [match.id for match in candidates]),
+            dtype=np.float32
+        )
+        top = scores.max() if len(scores) else 0.0
+        return scores / top if top > 0 else scores
+
+    def _title_feature(self, query: str, candidates: List[Any]) -> np.ndarray:
+        """
+        Share of each candidate title's trigrams that also occur in the query
+
+        Chunks of one document share a title, so each distinct title is scored
+        once (its trigrams are cached across queries) and scattered back to the
+        candidates with one index lookup.
+        """
+        query_grams = trigrams(normalize_title(query))
+        positions: Dict[str, int] = {}
+        inverse = np.fromiter(
+            (positions.setdefault((match.metadata or {}).get('title', ''), len(positions)) for match in candidates),
+            dtype=np.intp, count=len(candidates)
+        )
+        title_scores = np.fromiter(
+            (len(query_grams & grams) / len(grams) if grams else 0.0 for grams in map(_title_grams, positions)),
+            dtype=np.float32, count=len(positions)
+        )
+        return title_scores[inverse]
+
+    def rerank(self,
+               query: str,
+               query_embedding: List[float],
+               candidates: List[Any],
+               top_k: int = 5) -> List[Any]:
+        """
+        Return the best top_k candidates under the combined local score
+
+        Returned matches keep the original score in `vector_score`.
+        """
+        if not candidates:
+            return []
+
+        started = time.perf_counter()
+        self.vector_cache.put_matches(candidates)
+
+        features = [self._cosine_feature(query_embedding, candidates)]
+        extractors = [self._title_feature]
+        if self.lexical_index is not None:
+            extractors.insert(0, self._lexical_feature)
+        else:
+            features.append(np.zeros(len(candidates), dtype=np.float32))
+
+        for extract in extractors:
+            if (time.perf_counter() - started) * 1000 > self.budget_ms:
+                break
+            features.append(extract(query, candidates))
+
+        weights = self.weights[:len(features)]
+        combined = (np.stack(features, axis=1) @ weights) / weights.sum()
+
+        order = np.argsort(-combined)[:top_k]
+        return [
+            SimpleNamespace(
+                id=candidates[i].id,
+                score=float(combined[i]),
+                metadata=candidates[i].metadata,
+                vector_score=candidates[i].score
+            )
+            for i in order
+        ]
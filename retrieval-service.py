@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Retrieval Service
+Long-lived asyncio HTTP service around PineconeKnowledgeBase: clients, caches and
+indexes are loaded once and reused across requests
+"""
+
+import asyncio
+import importlib.util
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from aiohttp import web
+from stage_timer import collect_stages
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# pinecone-setup.py is not an importable module name
+_spec = importlib.util.spec_from_file_location(
+    "pinecone_setup", os.path.join(os.path.dirname(os.path.abspath(__file__)), "pinecone-setup.py")
+)
+pinecone_setup = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(pinecone_setup)
+
+HOST = os.getenv('RETRIEVAL_SERVICE_HOST', '127.0.0.1')
+PORT = int(os.getenv('RETRIEVAL_SERVICE_PORT', '8765'))
+MAX_CONCURRENCY = int(os.getenv('RETRIEVAL_MAX_CONCURRENCY', '16'))
+MAX_QUEUED = int(os.getenv('RETRIEVAL_MAX_QUEUED', '64'))
+MAX_BATCH = 32
+MAX_TOP_K = 100
+MAX_CANDIDATES = 500
+
+# Retrieval options a client may pass through to query_knowledge_base
+QUERY_MODES = ('dense', 'lexical', 'hybrid', 'hierarchical')
+BOOLEAN_OPTIONS = ('use_cache', 'title_lookup', 'rerank', 'diversify', 'collapse_docs', 'route')
+MATCH_EXTRAS = ('vector_score', 'dense_score', 'lexical_score', 'collapsed_chunks')
+
+
+def _with_stages(fn, *args):
+    """Run fn on a pool thread, returning its result and the retrieval stage timings"""
+    with collect_stages() as stages:
+        result = fn(*args)
+    return result, stages
+
+
+async def read_body(request: web.Request) -> Dict[str, Any]:
+    """JSON object body of a request (400 when it is not one)"""
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
+
+
+def read_top_k(body: Dict[str, Any]) -> int:
+    """Validated top_k (400 unless an integer in 1..MAX_TOP_K)"""
+    top_k = body.get('top_k', 5)
+    if isinstance(top_k, bool) or not isinstance(top_k, int) or not 1 <= top_k <= MAX_TOP_K:
+        raise web.HTTPBadRequest(text=f"'top_k' must be an integer between 1 and {MAX_TOP_K}")
+    return top_k
+
+
+def read_query_options(body: Dict[str, Any]) -> Dict[str, Any]:
+    """Validated retrieval options for query_knowledge_base (400 on a bad type or value)"""
+    options = {}
+    for key in BOOLEAN_OPTIONS:
+        if key in body:
+            if not isinstance(body[key], bool):
+                raise web.HTTPBadRequest(text=f"'{key}' must be true or false")
+            options[key] = body[key]
+
+    if 'mode' in body:
+        if body['mode'] not in QUERY_MODES:
+            raise web.HTTPBadRequest(text=f"'mode' must be one of {', '.join(QUERY_MODES)}")
+        options['mode'] = body['mode']
+
+    if 'candidates' in body:
+        candidates = body['candidates']
+        if isinstance(candidates, bool) or not isinstance(candidates, int) or not 1 <= candidates <= MAX_CANDIDATES:
+            raise web.HTTPBadRequest(text=f"'candidates' must be an integer between 1 and {MAX_CANDIDATES}")
+        options['candidates'] = candidates
+
+    if 'mmr_lambda' in body:
+        mmr_lambda = body['mmr_lambda']
+        if isinstance(mmr_lambda, bool) or not isinstance(mmr_lambda, (int, float)) or not 0 <= mmr_lambda <= 1:
+            raise web.HTTPBadRequest(text="'mmr_lambda' must be a number between 0 and 1")
+        options['mmr_lambda'] = float(mmr_lambda)
+
+    return options
+
+
+def match_to_dict(match: Any) -> Dict[str, Any]:
+    """JSON-friendly view of a Pinecone or locally built match"""
+    result = {'id': match.id, 'score': match.score, 'metadata': dict(match.metadata or {})}
+    for field in MATCH_EXTRAS:
+        value = getattr(match, field, None)
+        if value is not None:
+            result[field] = value
+    return result
+
+
+class RetrievalService:
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queued: int = MAX_QUEUED):
+        """
+        Initialize the service (clients and local indexes are created once, here)
+
+        Args:
+            max_concurrency: Maximum number of retrievals running at once
+            max_queued: Requests allowed to wait for a slot before new ones are rejected with 503
+        """
+        self.kb = pinecone_setup.PineconeKnowledgeBase(
+            pinecone_api_key=os.getenv('PINECONE_API_KEY'),
+            openai_api_key=os.getenv('OPENAI_API_KEY'),
+            google_credentials_path=None,
+            google_sheet_id=os.getenv('GOOGLE_SHEET_ID', '')
+        )
+        # Serve the existing index; a missing one stops startup instead of creating an empty index
+        self.kb.connect_pinecone_index()
+
+        self.max_concurrency = max_concurrency
+        self.max_queued = max_queued
+        self.slots = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.pool = ThreadPoolExecutor(max_workers=max_concurrency)
+
+        self.requests = 0
+        self.rejected = 0
+
+    async def run(self, request: web.Request, fn, *args) -> Any:
+        """Run a blocking retrieval call in the pool, bounded by the concurrency slots"""
+        if self.waiting >= self.max_queued:
+            self.rejected += 1
+            raise web.HTTPServiceUnavailable(text="Retrieval queue is full, retry shortly")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            started = time.perf_counter()
+            request['queue_ms'] = (started - queued_at) * 1000
+            result, request['stages'] = await asyncio.get_running_loop().run_in_executor(
+                self.pool, _with_stages, fn, *args
+            )
+            request['search_ms'] = (time.perf_counter() - started) * 1000
+            return result
+        finally:
+            self.in_flight -= 1
+            self.slots.release()
+
+    async def search(self, request: web.Request) -> web.Response:
+        body = await read_body(request)
+        query = body.get('query')
+        if not isinstance(query, str) or not query.strip():
+            raise web.HTTPBadRequest(text="'query' is required")
+        query = query.strip()
+
+        top_k = read_top_k(body)
+        filters = body.get('filters')
+        if filters is not None and not isinstance(filters, dict):
+            raise web.HTTPBadRequest(text="'filters' must be an object")
+        options = read_query_options(body)
+        self.requests += 1
+
+        if body.get('deadline_ms'):
+            deadline_ms = body['deadline_ms']
+            if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, (int, float)) or deadline_ms <= 0:
+                raise web.HTTPBadRequest(text="'deadline_ms' must be a positive number")
+            response = await self.run(
+                request,
+                lambda: self.kb.query_with_deadline(query, top_k, filters, float(deadline_ms))
+            )
+            return web.json_response({
+                'results': [match_to_dict(match) for match in response['matches']],
+                'degraded': response['degraded'],
+                'source': response['source'],
+                'reason': response['reason']
+            })
+
+        try:
+            matches = await self.run(
+                request,
+                lambda: self.kb.query_knowledge_base(query, top_k, filters, raise_errors=True, **options)
+            )
+        except web.HTTPException:
+            raise
+        except Exception as e:
+            # Embedding/Pinecone failures are errors, not an empty result set
+            raise web.HTTPBadGateway(text=f"Retrieval failed: {e}")
+
+        hydrate_started = time.perf_counter()
+        results = [match_to_dict(match) for match in matches]
+        request['stages']['hydrate'] = (time.perf_counter() - hydrate_started) * 1000
+        return web.json_response({'results': results})
+
+    async def batch_search(self, request: web.Request) -> web.Response:
+        body = await read_body(request)
+        queries = body.get('queries')
+        if not isinstance(queries, list) or not queries:
+            raise web.HTTPBadRequest(text="'queries' must be a non-empty list")
+        if len(queries) > MAX_BATCH:
+            raise web.HTTPBadRequest(text=f"At most {MAX_BATCH} queries per batch")
+
+        top_k = read_top_k(body)
+        filters = body.get('filters')
+        if isinstance(filters, list) and len(filters) != len(queries):
+            raise web.HTTPBadRequest(text="'filters' must be one object, or a list aligned with 'queries'")
+        if filters is not None and not isinstance(filters, (dict, list)):
+            raise web.HTTPBadRequest(text="'filters' must be one object, or a list aligned with 'queries'")
+
+        # Blank queries are answered with an error in place; the rest keep their original positions
+        positions = [i for i, query in enumerate(queries) if isinstance(query, str) and query.strip()]
+        entries: List[Dict[str, Any]] = [
+            {'query': query, 'results': [], 'error': "empty query"} for query in queries
+        ]
+        self.requests += len(positions)
+
+        if positions:
+            batch_filters = [filters[i] for i in positions] if isinstance(filters, list) else filters
+            results, errors = await self.run(
+                request,
+                lambda: self.kb.query_many([queries[i] for i in positions], top_k, batch_filters, return_errors=True)
+            )
+            for i, matches, error in zip(positions, results, errors):
+                entries[i] = {'query': queries[i], 'results': [match_to_dict(match) for match in matches]}
+                if error:
+                    entries[i]['error'] = error
+
+        return web.json_response({'results': entries})
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            'status': 'ok',
+            'requests': self.requests,
+            'rejected': self.rejected,
+            'in_flight': self.in_flight,
+            'queued': self.waiting,
+            'query_cache': self.kb.query_cache.stats(),
+            'semantic_cache': self.kb.semantic_cache.stats(),
+            'warm_answers': len(self.kb.warm_answers)
+        })
+
+
+@web.middleware
+async def timing_middleware(request: web.Request, handler):
+    """Per-request timing headers: total, time queued for a slot, retrieval time and its stages"""
+    started = time.perf_counter()
+    response = await handler(request)
+    total_ms = (time.perf_counter() - started) * 1000
+
+    queue_ms = request.get('queue_ms', 0.0)
+    search_ms = request.get('search_ms', 0.0)
+    response.headers['X-Total-Time-Ms'] = f"{total_ms:.1f}"
+    response.headers['X-Queue-Time-Ms'] = f"{queue_ms:.1f}"
+    response.headers['X-Search-Time-Ms'] = f"{search_ms:.1f}"
+    stages = "".join(f"{name};dur={ms:.1f}, " for name, ms in request.get('stages', {}).items())
+    response.headers['Server-Timing'] = (
+        f"queue;dur={queue_ms:.1f}, {stages}search;dur={search_ms:.1f}, total;dur={total_ms:.1f}"
+    )
+    return response
+
+
+def create_app() -> web.Application:
+    print("🚀 Starting retrieval service...")
+    service = RetrievalService()
+
+    app = web.Application(middlewares=[timing_middleware])
+    app['service'] = service
+    app.router.add_post('/search', service.search)
+    app.router.add_post('/batch-search', service.batch_search)
+    app.router.add_get('/health', service.health)
+
+    async def cleanup(app: web.Application):
+        app['service'].pool.shutdown(wait=False)
+
+    app.on_cleanup.append(cleanup)
+    print(f"✅ Retrieval service ready on http://{HOST}:{PORT}")
+    return app
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host=HOST, port=PORT, print=None)
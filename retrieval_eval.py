@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Retrieval Evaluation
+Versioned golden set, ranking metrics (recall@k, MRR, nDCG), latency percentiles,
+external call counts and regression checks against a saved baseline
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from diversify import parent_doc_id
+from hierarchy import document_id
+
+DEFAULT_GOLDEN_SET_PATH = 'retrieval-golden-set.json'
+DEFAULT_BASELINE_DIR = os.path.join('.cache', 'eval')
+
+QUALITY_METRICS = ('recall', 'mrr', 'ndcg')
+LATENCY_METRICS = ('p50_ms', 'p95_ms', 'p99_ms')
+
+
+def result_doc_id(match: Any) -> str:
+    """Document-level identity of a match, stable across re-chunking"""
+    metadata = match.metadata or {}
+    if metadata.get('doc_id'):
+        return metadata['doc_id']
+
+    # Vectors written before chunks carried doc_id get the same ID from their source URL
+    source = metadata.get('doc_url') or metadata.get('url')
+    if source:
+        return document_id(metadata.get('title', ''), source)
+    return parent_doc_id(match)
+
+
+def ranked_doc_ids(matches: List[Any]) -> List[str]:
+    """Distinct document IDs in rank order"""
+    seen, ranked = set(), []
+    for match in matches:
+        doc = result_doc_id(match)
+        if doc not in seen:
+            seen.add(doc)
+            ranked.append(doc)
+    return ranked
+
+
+# Golden set
+
+def load_golden_set(path: str = DEFAULT_GOLDEN_SET_PATH) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def golden_set_hash(golden_set: Dict[str, Any]) -> str:
+    """Content hash of the judged queries (baselines only compare within one hash)"""
+    judged = [(item['query'], sorted(item['expected_ids'])) for item in golden_set['queries']]
+    return hashlib.sha256(json.dumps(judged).encode('utf-8')).hexdigest()[:12]
+
+
+def save_golden_set(queries: List[Dict[str, Any]], path: str = DEFAULT_GOLDEN_SET_PATH) -> Dict[str, Any]:
+    """Write the golden set, bumping its version when the judgments changed"""
+    previous = load_golden_set(path)
+    golden_set = {'version': 1, 'queries': queries}
+    if previous:
+        golden_set['version'] = previous.get('version', 1)
+        if golden_set_hash(previous) != golden_set_hash(golden_set):
+            golden_set['version'] += 1
+    golden_set['hash'] = golden_set_hash(golden_set)
+    golden_set['updated_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    with open(path, 'w') as f:
+        json.dump(golden_set, f, indent=2)
+    return golden_set
+
+
+def unreviewed_queries(golden_set: Dict[str, Any]) -> List[str]:
+    """Golden queries whose judgments have not been checked by hand yet"""
+    return [item['query'] for item in golden_set['queries'] if not item.get('reviewed')]
+
+
+def seed_golden_set(queries_by_category: Dict[str, List[str]],
+                    search: Callable[[str, int], List[Any]],
+                    top_k: int = 3,
+                    path: str = DEFAULT_GOLDEN_SET_PATH) -> Dict[str, Any]:
+    """
+    Create golden-set entries for new queries from the current search results
+
+    Seeded judgments are marked "reviewed": false and must be checked by
+    hand before the set can be evaluated (they score the search that seeded
+    them perfectly); queries already in the golden set keep their judgments.
+    """
+    existing = load_golden_set(path) or {'queries': []}
+    known = {item['query'] for item in existing['queries']}
+    queries = list(existing['queries'])
+
+    for category, category_queries in queries_by_category.items():
+        for query in category_queries:
+            if query in known:
+                continue
+            queries.append({
+                'query': query,
+                'category': category,
+                'expected_ids': ranked_doc_ids(search(query, top_k * 3))[:top_k],
+                'reviewed': False
+            })
+            known.add(query)
+
+    return save_golden_set(queries, path)
+
+
+# Metrics
+
+def recall_at_k(ranked: List[str], expected: List[str], k: int) -> float:
+    if not expected:
+        return 0.0
+    return len(set(ranked[:k]) & set(expected)) / len(expected)
+
+
+def reciprocal_rank(ranked: List[str], expected: List[str]) -> float:
+    expected = set(expected)
+    for rank, doc in enumerate(ranked, 1):
+        if doc in expected:
+            return 1.0 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked: List[str], expected: List[str], k: int) -> float:
+    """Binary-relevance nDCG"""
+    expected = set(expected)
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, doc in enumerate(ranked[:k], 1) if doc in expected)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(expected), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+
+# Call counting
+
+class CallCounter:
+    """Thread-safe counts of external calls made during an evaluation"""
+
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+
+
+class _CountingProxy:
+    """Wraps an object so calls to the named methods are counted"""
+
+    def __init__(self, target: Any, methods: Dict[str, str], counter: CallCounter):
+        self._target = target
+        self._methods = methods
+        self._counter = counter
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._target, name)
+        if name not in self._methods:
+            return attribute
+
+        def counted(*args, **kwargs):
+            self._counter.increment(self._methods[name])
+            return attribute(*args, **kwargs)
+
+        return counted
+
+
+def instrument_knowledge_base(kb, counter: CallCounter):
+    """Count embedding requests and vector queries made through a PineconeKnowledgeBase"""
+    kb.openai_client.embeddings = _CountingProxy(kb.openai_client.embeddings, {'create': 'embedding_calls'}, counter)
+    kb.index = _CountingProxy(kb.index, {'query': 'query_calls'}, counter)
+
+
+# Evaluation
+
+def evaluate(search: Callable[[str, int], List[Any]],
+             golden_set: Dict[str, Any],
+             k: int = 5,
+             counter: Optional[CallCounter] = None) -> Dict[str, Any]:
+    """
+    Run every golden query through search(query, k) and aggregate the metrics
+
+    Returns mean recall@k / MRR / nDCG@k, latency percentiles and, when a
+    counter is given, external calls per query.
+
+    Raises:
+        ValueError: The golden set still has entries with "reviewed": false
+    """
+    unreviewed = unreviewed_queries(golden_set)
+    if unreviewed:
+        raise ValueError(f"{len(unreviewed)} golden queries are not reviewed yet (first: {unreviewed[0]!r})")
+
+    if counter:
+        counter.reset()
+
+    recalls, rrs, ndcgs, latencies = [], [], [], []
+    per_query = []
+
+    for item in golden_set['queries']:
+        if not item['expected_ids']:
+            continue
+
+        started = time.perf_counter()
+        matches = search(item['query'], k)
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        ranked = ranked_doc_ids(matches)
+        scores = {
+            'recall': recall_at_k(ranked, item['expected_ids'], k),
+            'mrr': reciprocal_rank(ranked, item['expected_ids']),
+            'ndcg': ndcg_at_k(ranked, item['expected_ids'], k)
+        }
+        recalls.append(scores['recall'])
+        rrs.append(scores['mrr'])
+        ndcgs.append(scores['ndcg'])
+        latencies.append(latency_ms)
+        per_query.append(dict(scores, query=item['query'], latency_ms=round(latency_ms, 2)))
+
+    if not latencies:
+        return {'queries': 0}
+
+    summary = {
+        'golden_set_version': golden_set.get('version'),
+        'golden_set_hash': golden_set.get('hash'),
+        'k': k,
+        'queries': len(latencies),
+        'recall': round(float(np.mean(recalls)), 4),
+        'mrr': round(float(np.mean(rrs)), 4),
+        'ndcg': round(float(np.mean(ndcgs)), 4),
+        'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+        'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+        'p99_ms': round(float(np.percentile(latencies, 99)), 2),
+        'per_query': per_query
+    }
+    if counter:
+        summary['calls_per_query'] = {
+            name: round(count / len(latencies), 3) for name, count in sorted(counter.counts.items())
+        }
+    return summary
+
+
+# Baselines and regressions
+
+def baseline_path(backend: str, directory: str = DEFAULT_BASELINE_DIR) -> str:
+    return os.path.join(directory, f"baseline_{backend}.json")
+
+
+def load_baseline(backend: str, directory: str = DEFAULT_BASELINE_DIR) -> Optional[Dict[str, Any]]:
+    try:
+        with open(baseline_path(backend, directory), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baseline(backend: str, summary: Dict[str, Any], directory: str = DEFAULT_BASELINE_DIR):
+    os.makedirs(directory, exist_ok=True)
+    with open(baseline_path(backend, directory), 'w') as f:
+        json.dump(summary, f, indent=2)
+
+
+def find_regressions(summary: Dict[str, Any],
+                     baseline: Optional[Dict[str, Any]],
+                     quality_tolerance: float = 0.02,
+                     latency_tolerance: float = 0.25,
+                     calls_tolerance: float = 0.1) -> List[str]:
+    """
+    Differences from the baseline that count as regressions
+
+    Quality may drop by at most quality_tolerance (absolute), latency
+    percentiles and calls per query may grow by at most the given fractions.
+    Baselines built from a different golden set are not compared.
+    """
+    if not baseline or baseline.get('golden_set_hash') != summary.get('golden_set_hash'):
+        return []
+
+    regressions = []
+    for metric in QUALITY_METRICS:
+        if summary[metric] < baseline[metric] - quality_tolerance:
+            regressions.append(f"{metric} {baseline[metric]:.3f} → {summary[metric]:.3f}")
+
+    for metric in LATENCY_METRICS:
+        if summary[metric] > baseline[metric] * (1 + latency_tolerance):
+            regressions.append(f"{metric} {baseline[metric]:.1f} → {summary[metric]:.1f}")
+
+    baseline_calls = baseline.get('calls_per_query', {})
+    for name, value in summary.get('calls_per_query', {}).items():
+        if value > baseline_calls.get(name, value) * (1 + calls_tolerance):
+            regressions.append(f"{name} per query {baseline_calls[name]:.2f} → {value:.2f}")
+
+    return regressions
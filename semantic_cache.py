@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Semantic Result Cache
+Answers a query from cache when a previous query's embedding is within a cosine distance
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from index_version import IndexVersionWatcher
+
+
+def _filter_key(filters: Optional[Dict[str, Any]], variant: str = "") -> str:
+    return variant + json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+class SemanticCache:
+    def __init__(self,
+                 index_name: str,
+                 max_distance: float = 0.08,
+                 max_entries: int = 500,
+                 ttl_seconds: float = 24 * 3600):
+        """
+        Initialize the semantic cache
+
+        Args:
+            index_name: Pinecone index whose results are cached (entries are dropped when it is rebuilt)
+            max_distance: Maximum cosine distance between a new query and a cached one for a hit
+            max_entries: Maximum number of cached queries (oldest are dropped first)
+            ttl_seconds: Age after which a cached result is no longer served
+        """
+        self.index_name = index_name
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._version = IndexVersionWatcher(index_name)
+        self._lock = threading.Lock()
+        self._reset_entries(self._version.current())
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expired = 0
+        self.served_ages = deque(maxlen=1000)
+
+    def _reset_entries(self, version: str):
+        self._entries: List[Dict[str, Any]] = []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._entries_version = version
+
+    def _check_version(self):
+        """Drop every entry if the index was rebuilt since the entries were stored"""
+        version = self._version.current()
+        if version != self._entries_version:
+            if self._entries:
+                self.invalidations += 1
+            self._reset_entries(version)
+
+    def _rebuild_matrix(self):
+        if self._entries:
+            self._matrix = np.stack([entry['vector'] for entry in self._entries])
+        else:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def lookup(self,
+               embedding: List[float],
+               top_k: int,
+               filters: Optional[Dict[str, Any]] = None,
+               variant: str = "",
+               max_distance: Optional[float] = None) -> Optional[List[Any]]:
+        """
+        Return cached matches for a semantically equivalent query, or None on a miss
+
+        `variant` separates results produced by different retrieval settings (e.g. reranked).
+        `max_distance` overrides the configured threshold (e.g. looser when degrading).
+        """
+        if not embedding:
+            return None
+
+        with self._lock:
+            self._check_version()
+
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            query = np.asarray(embedding, dtype=np.float32)
+            query /= np.linalg.norm(query) or 1.0
+            distances = 1.0 - self._matrix @ query
+
+            filter_key = _filter_key(filters, variant)
+            now = time.time()
+
+            limit = self.max_distance if max_distance is None else max_distance
+            for i in np.argsort(distances):
+                if distances[i] > limit:
+                    break
+
+                entry = self._entries[i]
+                if entry['filter_key'] != filter_key or entry['top_k'] < top_k:
+                    continue
+
+                age = now - entry['created_at']
+                if age > self.ttl_seconds:
+                    self.expired += 1
+                    continue
+
+                self.hits += 1
+                self.served_ages.append(age)
+                return entry['matches'][:top_k]
+
+            self.misses += 1
+            return None
+
+    def store(self,
+              query: str,
+              embedding: List[float],
+              matches: List[Any],
+              top_k: int,
+              filters: Optional[Dict[str, Any]] = None,
+              variant: str = ""):
+        """Cache the matches returned for a query"""
+        if not embedding or not matches:
+            return
+
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+
+        with self._lock:
+            self._check_version()
+
+            self._entries.append({
+                'query': query,
+                'vector': vector,
+                'ids': [match.id for match in matches],
+                'matches': list(matches),
+                'top_k': top_k,
+                'filter_key': _filter_key(filters, variant),
+                'created_at': time.time()
+            })
+
+            if len(self._entries) > self.max_entries:
+                self._entries = self._entries[-self.max_entries:]
+
+            self._rebuild_matrix()
+
+    def invalidate(self):
+        """Drop every cached result (call after the index is rebuilt)"""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._reset_entries(self._version.current())
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit-rate and staleness statistics for the cache"""
+        lookups = self.hits + self.misses
+        now = time.time()
+        entry_ages = [now - entry['created_at'] for entry in self._entries]
+
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'expired': self.expired,
+            'index_version': self._entries_version,
+            'oldest_entry_age_seconds': max(entry_ages) if entry_ages else 0.0,
+            'mean_served_age_seconds': float(np.mean(self.served_ages)) if self.served_ages else 0.0,
+            'max_served_age_seconds': max(self.served_ages) if self.served_ages else 0.0
+        }
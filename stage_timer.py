@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Stage Timer
+Per-request stage timings (embed, vector query, rerank, ...) collected on the calling thread;
+free when nobody is collecting
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+_local = threading.local()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into the current collection (no-op outside collect_stages)"""
+    timings = getattr(_local, 'timings', None)
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def collect_stages() -> Iterator[Dict[str, float]]:
+    """Collect stage timings (milliseconds) of everything run on this thread inside the block"""
+    previous = getattr(_local, 'timings', None)
+    _local.timings = {}
+    try:
+        yield _local.timings
+    finally:
+        _local.timings = previous
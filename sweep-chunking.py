@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Chunking parameter sweep
+Re-chunks a snapshot of the corpus under a grid of strategy/size/overlap settings, embeds the
+chunks through a persistent cache into a local in-memory index and scores the retrieval golden
+set, reporting recall, vector count, storage bytes and embedding-token cost per setting
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+from types import SimpleNamespace
+import numpy as np
+from openai import OpenAI
+from pinecone import Pinecone
+from batch_search import embed_texts
+from chunking import chunk_document
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from index_snapshot import snapshot_documents
+from retrieval_eval import DEFAULT_GOLDEN_SET_PATH, evaluate, load_golden_set, result_doc_id, unreviewed_queries
+from usage_meter import BudgetExceeded, UsageMeter, count_tokens, estimate_cost
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Initialize clients
+usage = UsageMeter.from_env("sweep-chunking")
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
+pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+
+INDEX_NAME = "gpc-knowledge-base"
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_DIMENSION = 1536
+
+# Grid (current production setting: chars / 1000 / 200)
+STRATEGIES = ["chars", "sentences", "paragraphs"]
+CHUNK_SIZES = [500, 1000, 2000, 4000]
+CHUNK_OVERLAPS = [0, 200]
+K = 5
+EMBED_BATCH_SIZE = 100
+
+SNAPSHOT_PATH = os.path.join('.cache', 'corpus_snapshot.jsonl.gz')
+CHUNK_CACHE_PATH = os.path.join('.cache', 'chunk_embeddings.sqlite3')
+REPORT_PATH = os.path.join('.cache', 'chunking_sweep.json')
+
+# Chunk embeddings persist across sweeps: settings that produce the same chunk never re-embed it
+chunk_cache = EmbeddingCache(EMBEDDING_MODEL, ttl_seconds=365 * 24 * 3600, cache_path=CHUNK_CACHE_PATH)
+query_cache = EmbeddingCache(EMBEDDING_MODEL, cache_path=DEFAULT_CACHE_PATH)
+
+
+def load_corpus_snapshot():
+    """Source documents rebuilt from the index (cached locally after the first run)"""
+    if os.path.exists(SNAPSHOT_PATH):
+        with gzip.open(SNAPSHOT_PATH, 'rt', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    print(f"📸 Snapshotting documents from {INDEX_NAME}...")
+    documents = snapshot_documents(
+        pc.Index(INDEX_NAME),
+        lambda vector_id, metadata: result_doc_id(SimpleNamespace(id=vector_id, metadata=metadata))
+    )
+
+    os.makedirs(os.path.dirname(SNAPSHOT_PATH), exist_ok=True)
+    with gzip.open(SNAPSHOT_PATH, 'wt', encoding='utf-8') as f:
+        for document in documents:
+            f.write(json.dumps(document) + '\n')
+    return documents
+
+
+def embed_chunks(texts):
+    """Embeddings for every chunk, sending only cache misses (in batches) to OpenAI"""
+    missing = [text for text in dict.fromkeys(texts) if not chunk_cache.get(text)]
+    for start in range(0, len(missing), EMBED_BATCH_SIZE):
+        embed_texts(openai_client, missing[start:start + EMBED_BATCH_SIZE], model=EMBEDDING_MODEL, cache=chunk_cache)
+    return [chunk_cache.get(text) or [] for text in texts], len(missing)
+
+
+def evaluate_setting(documents, golden_set, strategy, chunk_size, chunk_overlap):
+    """Chunk, embed, index locally and score one setting"""
+    chunks, doc_ids, metadata_bytes = [], [], 0
+    for document in documents:
+        for i, text in enumerate(chunk_document(document['text'], strategy, chunk_size, chunk_overlap)):
+            chunks.append(text)
+            doc_ids.append(document['doc_id'])
+            # Same metadata shape as ingestion stores (chunk text travels with the vector)
+            metadata_bytes += len(json.dumps({'text': text, 'title': document['title'], 'chunk_index': i,
+                                              'doc_id': document['doc_id']}).encode('utf-8'))
+
+    embeddings, embedded_now = embed_chunks(chunks)
+    kept = [i for i, embedding in enumerate(embeddings) if embedding]
+    matrix = np.asarray([embeddings[i] for i in kept], dtype=np.float32).reshape(len(kept), -1)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+    def search(query, top_k):
+        query_embedding = query_cache.get_or_create(
+            query, lambda text: embed_texts(openai_client, [text], model=EMBEDDING_MODEL)[0]
+        )
+        if not query_embedding:
+            return []
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        scores = matrix @ (vector / (np.linalg.norm(vector) or 1.0))
+        # Over-fetch chunks so top_k distinct documents survive the document-level collapse
+        order = np.argsort(-scores)[:top_k * 5]
+        return [
+            SimpleNamespace(id=f"{doc_ids[kept[i]]}#{kept[i]}", score=float(scores[i]),
+                            metadata={'doc_id': doc_ids[kept[i]]})
+            for i in order
+        ]
+
+    summary = evaluate(search, golden_set, k=K)
+    tokens = sum(count_tokens(text, EMBEDDING_MODEL) for text in chunks)
+
+    return {
+        "strategy": strategy,
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "recall": summary.get('recall', 0.0),
+        "mrr": summary.get('mrr', 0.0),
+        "ndcg": summary.get('ndcg', 0.0),
+        "vectors": len(kept),
+        "storage_bytes": len(kept) * EMBEDDING_DIMENSION * 4 + metadata_bytes,
+        "embedding_tokens": tokens,
+        "embedding_cost_usd": round(estimate_cost(EMBEDDING_MODEL, tokens), 4),
+        "newly_embedded_chunks": embedded_now
+    }
+
+
+def sweep_chunking():
+    """Evaluate every grid setting and save the comparison"""
+
+    print("🧪 Sweeping chunking parameters...")
+
+    golden_set = load_golden_set()
+    if not golden_set:
+        print("❌ No golden set found - run evaluate-retrieval.py --seed first")
+        return
+    unreviewed = unreviewed_queries(golden_set)
+    if unreviewed:
+        print(f"❌ {len(unreviewed)} golden queries are not reviewed yet - check them in {DEFAULT_GOLDEN_SET_PATH}")
+        return
+
+    documents = load_corpus_snapshot()
+    print(f"📚 {len(documents)} documents, {sum(len(d['text']) for d in documents):,} characters")
+    print(f"📋 Golden set v{golden_set['version']} ({len(golden_set['queries'])} queries), k={K}\n")
+
+    results = []
+    for strategy in STRATEGIES:
+        for chunk_size in CHUNK_SIZES:
+            for chunk_overlap in CHUNK_OVERLAPS:
+                if chunk_overlap >= chunk_size // 2:
+                    continue
+                usage.source = f"{strategy}/{chunk_size}/{chunk_overlap}"
+                
+                # Dry run: predict the embedding tokens for chunks not cached yet, score nothing
+                if usage.dry_run:
+                    chunks = [text for document in documents
+                              for text in chunk_document(document['text'], strategy, chunk_size, chunk_overlap)]
+                    usage.predict_embeddings([text for text in dict.fromkeys(chunks) if not chunk_cache.get(text)])
+                    continue
+                
+                started = time.time()
+                result = evaluate_setting(documents, golden_set, strategy, chunk_size, chunk_overlap)
+                results.append(result)
+                print(f"  {strategy:<10} size {chunk_size:>5} overlap {chunk_overlap:>4}: "
+                      f"recall@{K} {result['recall']:.3f}  nDCG {result['ndcg']:.3f}  "
+                      f"{result['vectors']:>6} vectors  {result['storage_bytes'] / 1e6:7.1f} MB  "
+                      f"{result['embedding_tokens']:>9,} tokens (${result['embedding_cost_usd']:.2f})  "
+                      f"[{time.time() - started:.0f}s, {result['newly_embedded_chunks']} new embeddings]")
+
+    usage.source = None
+    if usage.dry_run:
+        return
+
+    best = max(results, key=lambda r: (r['recall'], r['ndcg'], -r['storage_bytes']))
+    print(f"\n🏆 Best recall: {best['strategy']} / {best['chunk_size']} / {best['chunk_overlap']} "
+          f"(recall@{K} {best['recall']:.3f}, {best['vectors']} vectors)")
+
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, 'w') as f:
+        json.dump({"golden_set_version": golden_set['version'], "k": K, "results": results}, f, indent=2)
+    print(f"💾 Sweep results saved to {REPORT_PATH}")
+
+if __name__ == "__main__":
+    try:
+        sweep_chunking()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
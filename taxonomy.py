@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Topic Taxonomy
+Shared topic categories and a compiled keyword matcher (Aho-Corasick) used by the categorizers
+"""
+
+import string
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Define proper topic categories based on your content
+TOPIC_CATEGORIES = {
+    "content_creation": {
+        "name": "Content Creation & Filming",
+        "keywords": ["filming", "content", "video", "background", "lighting", "hand movements", "eye", "music", "sounds", "controversy", "pace", "viral", "hooks"],
+        "description": "Everything about creating compelling video content"
+    },
+    "social_media_strategy": {
+        "name": "Social Media Strategy",
+        "keywords": ["tiktok", "instagram", "youtube", "facebook", "account", "fyp", "viral", "platform", "optimization", "burners", "recycle", "targeting", "countries"],
+        "description": "Platform-specific strategies and optimization"
+    },
+    "product_research": {
+        "name": "Product Research & Sourcing",
+        "keywords": ["product", "research", "sourcing", "temu", "ali", "cj", "saturation", "good vs bad", "untapped", "existing", "custom"],
+        "description": "Finding and evaluating profitable products"
+    },
+    "business_development": {
+        "name": "Business & Brand Building",
+        "keywords": ["brand", "website", "building", "selling", "bundles", "aov", "cvr", "email marketing", "broadcast", "longevity", "consistency"],
+        "description": "Building and scaling your business"
+    },
+    "marketing_strategies": {
+        "name": "Marketing & Growth",
+        "keywords": ["marketing", "angles", "audience", "niche", "growth", "archive", "method", "prime", "trials", "sales", "offer"],
+        "description": "Marketing tactics and growth strategies"
+    },
+    "case_studies": {
+        "name": "Case Studies & Results",
+        "keywords": ["case study", "results", "subs", "months", "filming", "k", "million", "30m", "250k", "350k", "20k"],
+        "description": "Real success stories and results"
+    },
+    "advanced_tactics": {
+        "name": "Advanced Tactics",
+        "keywords": ["bts", "behind the scenes", "whole", "creating", "shareable", "replicating", "concepts", "dropshipping"],
+        "description": "Advanced strategies and behind-the-scenes insights"
+    }
+}
+
+DEFAULT_CATEGORY = "advanced_tactics"
+
+# Title rules, checked in priority order (first category with a match wins)
+TITLE_RULES = {
+    "content_creation": ["lighting", "background", "handmovements", "hand movements", "music", "sounds", "controversy", "pace", "eye for content"],
+    "social_media_strategy": ["tiktok", "instagram", "youtube", "facebook", "fyp", "account", "viral", "platform", "burners", "recycle"],
+    "product_research": ["product", "research", "temu", "ali", "cj", "saturation", "sourcing"],
+    "business_development": ["brand", "website", "building", "selling", "bundles", "aov", "cvr", "email marketing", "broadcast"],
+    "marketing_strategies": ["marketing", "angles", "audience", "niche", "growth", "archive", "method", "prime", "trials", "sales"],
+    "case_studies": ["case study", "subs", "months", "filming", "k", "million", "30m", "250k", "350k", "20k"],
+    "advanced_tactics": ["bts", "behind", "whole", "creating", "shareable", "replicating", "dropshipping"]
+}
+
+# YouTube (Chris) title rules, checked in priority order
+YOUTUBE_TITLE_RULES = {
+    "tiktok_shop": ["tiktok shop", "tiktok"],
+    "case_studies": ["$", "k", "month", "days", "case study", "profit"],
+    "dropshipping_strategies": ["organic dropshipping", "dropshipping"],
+    "youtube_growth": ["subscribers", "youtube"],
+    "social_media_strategy": ["facebook", "instagram", "meta"],
+    "advanced_tactics": ["ai", "viral", "go viral"]
+}
+
+
+# ASCII punctuation becomes a token separator; "$" is kept as a token of its own
+_SEPARATORS = string.punctuation.replace('$', '').encode()
+_SEPARATOR_TABLE = bytes.maketrans(_SEPARATORS, b' ' * len(_SEPARATORS))
+
+
+def keyword_tokens(text: str) -> List[bytes]:
+    """Lowercase word tokens (as UTF-8 bytes) used on both keywords and scanned text"""
+    return text.lower().encode('utf-8').translate(_SEPARATOR_TABLE).replace(b'$', b' $ ').split()
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern keyword matcher compiled into one Aho-Corasick automaton
+
+    The automaton runs over word tokens rather than characters, so every
+    category is scored in a single linear pass and matches always fall on
+    word boundaries ("ai" does not match "email", "k" matches "20 k" but not
+    "look"). Multi-word keywords ("behind the scenes") are token sequences.
+    A plural "s" is accepted so "month" still matches "months".
+
+    Tokenization (translate + split) runs in C; the Python loop does one dict
+    lookup per token and only walks the automaton on vocabulary tokens.
+    """
+
+    def __init__(self, keywords_by_label: Dict[str, Iterable[str]]):
+        self.labels = list(keywords_by_label.keys())
+
+        # Trie over tokens: goto transitions, failure links and (keyword id) outputs per state
+        self._goto: List[Dict[bytes, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[int]] = [[]]
+        self.keywords: List[str] = []
+        self._keyword_labels: List[Set[int]] = []
+        # Token (or its plural) → vocabulary token; everything else resets the automaton
+        self._vocabulary: Dict[bytes, bytes] = {}
+
+        keyword_ids: Dict[Tuple[bytes, ...], int] = {}
+        for label_id, label in enumerate(self.labels):
+            for keyword in keywords_by_label[label]:
+                tokens = tuple(keyword_tokens(keyword))
+                if not tokens:
+                    continue
+                if tokens not in keyword_ids:
+                    keyword_ids[tokens] = len(self.keywords)
+                    self.keywords.append(b" ".join(tokens).decode('utf-8'))
+                    self._keyword_labels.append(set())
+                    self._add(tokens, keyword_ids[tokens])
+                    for token in tokens:
+                        self._vocabulary.setdefault(token + b's', token)
+                        self._vocabulary[token] = token
+                self._keyword_labels[keyword_ids[tokens]].add(label_id)
+
+        self._build_failure_links()
+
+    def _add(self, tokens: Tuple[bytes, ...], keyword_id: int):
+        state = 0
+        for token in tokens:
+            next_state = self._goto[state].get(token)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][token] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = next_state
+        self._outputs[state].append(keyword_id)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and token not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(token, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._outputs[next_state] = self._outputs[next_state] + self._outputs[self._fail[next_state]]
+
+    def matched_keywords(self, text: str) -> Set[int]:
+        """IDs of the distinct keywords found in text (one linear pass over its tokens)"""
+        vocabulary = self._vocabulary
+        goto, fail, outputs = self._goto, self._fail, self._outputs
+        found: Set[int] = set()
+        state = 0
+
+        for token in keyword_tokens(text):
+            token = vocabulary.get(token)
+            if token is None:
+                # No keyword contains this token: restart from the root
+                state = 0
+                continue
+
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+
+            if outputs[state]:
+                found.update(outputs[state])
+
+        return found
+
+    def scores(self, text: str) -> Dict[str, int]:
+        """Number of distinct keywords of each label found in text"""
+        counts = [0] * len(self.labels)
+        for keyword_id in self.matched_keywords(text):
+            for label_id in self._keyword_labels[keyword_id]:
+                counts[label_id] += 1
+        return dict(zip(self.labels, counts))
+
+    def first_label(self, text: str) -> Optional[str]:
+        """First label (in definition order) with any keyword in text"""
+        scores = self.scores(text)
+        for label in self.labels:
+            if scores[label]:
+                return label
+        return None
+
+    def best_label(self, text: str) -> Tuple[Optional[str], int]:
+        """Label with the most distinct keywords in text (ties go to the earlier label)"""
+        scores = self.scores(text)
+        best = max(self.labels, key=lambda label: scores[label], default=None)
+        return (best, scores[best]) if best else (None, 0)
+
+
+TOPIC_MATCHER = KeywordMatcher({key: info["keywords"] for key, info in TOPIC_CATEGORIES.items()})
+TITLE_MATCHER = KeywordMatcher(TITLE_RULES)
+YOUTUBE_TITLE_MATCHER = KeywordMatcher(YOUTUBE_TITLE_RULES)
+
+
+def categorize_by_keywords(title: str, content: str) -> str:
+    """Keyword categorization: the category with the most distinct keywords in title + content"""
+    category, score = TOPIC_MATCHER.best_label(f"{title} {content}")
+    return category if score > 0 else DEFAULT_CATEGORY
+
+
+def categorize_by_title(title: str) -> str:
+    """Categorize document by title only (faster approach)"""
+    return TITLE_MATCHER.first_label(title) or categorize_by_keywords(title, "")
+
+
+def categorize_youtube_content(title: str) -> str:
+    """Categorize YouTube content based on title"""
+    return YOUTUBE_TITLE_MATCHER.first_label(title) or "case_studies"  # Default to case studies for YouTube content
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Taxonomy Discovery
+Spherical mini-batch k-means over chunk embeddings, with TF-IDF cluster labels and
+proposed changes to the hand-written topic taxonomy
+"""
+
+import math
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from lexical_index import tokenize
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+class MiniBatchKMeans:
+    def __init__(self, n_clusters: int = 12, seed: int = 0):
+        """
+        Initialize the clusterer (cosine / spherical k-means)
+
+        Args:
+            n_clusters: Number of clusters
+            seed: Random seed for k-means++ initialization
+        """
+        self.n_clusters = n_clusters
+        self.rng = np.random.default_rng(seed)
+        self.centers: Optional[np.ndarray] = None
+        self.counts = np.zeros(n_clusters, dtype=np.int64)
+        self._pending: List[np.ndarray] = []
+
+    def _init_centers(self, matrix: np.ndarray):
+        """k-means++ seeding on the first batch that holds at least n_clusters vectors"""
+        centers = [matrix[self.rng.integers(len(matrix))]]
+        for _ in range(1, self.n_clusters):
+            distances = 1.0 - np.max(matrix @ np.stack(centers).T, axis=1)
+            distances = np.maximum(distances, 0.0)
+            total = distances.sum()
+            probabilities = distances / total if total > 0 else None
+            centers.append(matrix[self.rng.choice(len(matrix), p=probabilities)])
+        self.centers = np.stack(centers)
+
+    def partial_fit(self, batch: np.ndarray):
+        """Update the centers with one batch of embeddings (per-center learning rate 1/count)"""
+        matrix = _normalize(np.asarray(batch, dtype=np.float32))
+
+        if self.centers is None:
+            self._pending.append(matrix)
+            pending = np.concatenate(self._pending)
+            if len(pending) < self.n_clusters:
+                return
+            self._pending = []
+            self._init_centers(pending)
+            matrix = pending
+
+        labels = self.predict(matrix)
+        for cluster in np.unique(labels):
+            members = matrix[labels == cluster]
+            self.counts[cluster] += len(members)
+            rate = len(members) / self.counts[cluster]
+            self.centers[cluster] = (1 - rate) * self.centers[cluster] + rate * members.mean(axis=0)
+
+        self.centers = _normalize(self.centers)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """Nearest center (by cosine) for each embedding"""
+        matrix = _normalize(np.asarray(batch, dtype=np.float32))
+        return np.argmax(matrix @ self.centers.T, axis=1)
+
+
+class ClusterProfile:
+    """Bounded per-cluster statistics gathered while assigning the corpus"""
+
+    def __init__(self, n_clusters: int, max_titles: int = 2000):
+        self.sizes = np.zeros(n_clusters, dtype=np.int64)
+        self.similarity_sums = np.zeros(n_clusters, dtype=np.float64)
+        self.term_docs = [Counter() for _ in range(n_clusters)]
+        self.titles = [Counter() for _ in range(n_clusters)]
+        self.categories = [Counter() for _ in range(n_clusters)]
+        self.corpus_term_docs: Counter = Counter()
+        self.max_titles = max_titles
+
+    def add(self, cluster: int, similarity: float, text: str, metadata: Dict[str, Any]):
+        self.sizes[cluster] += 1
+        self.similarity_sums[cluster] += similarity
+
+        terms = set(tokenize(text))
+        self.term_docs[cluster].update(terms)
+        self.corpus_term_docs.update(terms)
+
+        title = metadata.get('title')
+        if title and (title in self.titles[cluster] or len(self.titles[cluster]) < self.max_titles):
+            self.titles[cluster][title] += 1
+        self.categories[cluster][metadata.get('category') or 'uncategorized'] += 1
+
+    def label_terms(self, cluster: int, top_n: int = 8) -> List[str]:
+        """Top TF-IDF terms: share of the cluster's documents containing the term × corpus IDF"""
+        total_docs = int(self.sizes.sum())
+        size = self.sizes[cluster] or 1
+        scored = [
+            (term, (count / size) * math.log(total_docs / self.corpus_term_docs[term]))
+            for term, count in self.term_docs[cluster].items()
+            if count >= 2 and len(term) > 2 and not term.isdigit()
+        ]
+        scored = [item for item in scored if item[1] > 0]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return [term for term, _ in scored[:top_n]]
+
+
+def propose_taxonomy(profile: ClusterProfile,
+                     known_categories: Dict[str, Dict[str, Any]],
+                     min_purity: float = 0.5,
+                     min_cluster_size: int = 5) -> Dict[str, Any]:
+    """
+    Describe every cluster and propose taxonomy changes
+
+    - new_category: a sizeable cluster no existing category dominates
+    - split: an existing category dominating several clusters
+    - review: an existing category that dominates no cluster (merge or retire)
+    """
+    clusters = []
+    dominated: Dict[str, List[int]] = {}
+
+    for cluster, size in enumerate(profile.sizes):
+        if not size:
+            continue
+
+        category, members = profile.categories[cluster].most_common(1)[0]
+        purity = members / size
+        clusters.append({
+            "cluster": cluster,
+            "size": int(size),
+            "cohesion": round(float(profile.similarity_sums[cluster] / size), 4),
+            "label_terms": profile.label_terms(cluster),
+            "top_titles": [title for title, _ in profile.titles[cluster].most_common(5)],
+            "categories": dict(profile.categories[cluster].most_common()),
+            "dominant_category": category,
+            "purity": round(purity, 3)
+        })
+        if purity >= min_purity and category in known_categories:
+            dominated.setdefault(category, []).append(cluster)
+
+    proposals = []
+    for info in clusters:
+        undominated = info["purity"] < min_purity or info["dominant_category"] not in known_categories
+        if undominated and info["size"] >= min_cluster_size:
+            proposals.append({
+                "action": "new_category",
+                "cluster": info["cluster"],
+                "suggested_name": " / ".join(info["label_terms"][:3]),
+                "keywords": info["label_terms"],
+                "members": info["size"],
+                "example_titles": info["top_titles"]
+            })
+
+    for category, members in dominated.items():
+        if len(members) > 1:
+            proposals.append({
+                "action": "split",
+                "category": category,
+                "clusters": members,
+                "members": int(sum(profile.sizes[cluster] for cluster in members)),
+                "suggested_names": [" / ".join(profile.label_terms(cluster)[:3]) for cluster in members]
+            })
+
+    for category in known_categories:
+        if category not in dominated:
+            members = sum(counter.get(category, 0) for counter in profile.categories)
+            proposals.append({
+                "action": "review",
+                "category": category,
+                "members": int(members),
+                "reason": "no cluster is dominated by this category (merge or retire)"
+            })
+
+    return {"clusters": clusters, "proposals": proposals}
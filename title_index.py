@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Title Index
+Trigram index over known document titles, so queries that name a specific video or
+lesson resolve to its vectors without an embedding call or a vector search
+"""
+
+import ast
+import os
+import re
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Scripts whose hard-coded source lists carry document titles
+SOURCE_SCRIPTS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    for name in [
+        "process-course-content.py",
+        "process-youtube-chris.py",
+        "process-books.py",
+        "process-long-books.py",
+        "process-remaining-youtubers.py",
+        "fix-failed-documents.py",
+    ]
+]
+
+# Revision markers appended to titles in the source sheet ("... NEU", "... new")
+NOISE_TOKENS = {"neu", "new"}
+
+
+def normalize_title(text: str) -> str:
+    """Lowercase, strip punctuation and trailing revision markers"""
+    tokens = re.findall(r"[a-z0-9$]+", text.lower())
+    while tokens and tokens[-1] in NOISE_TOKENS:
+        tokens.pop()
+    return " ".join(tokens)
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def titles_from_source_scripts(paths: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Read the title/url entries of the source lists in the processing scripts
+
+    The scripts create API clients at import time, so their list literals are
+    read with ast instead of importing them.
+    """
+    entries = []
+    for path in paths:
+        try:
+            with open(path, 'r') as f:
+                tree = ast.parse(f.read(), filename=path)
+        except (OSError, SyntaxError):
+            continue
+
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Dict):
+                continue
+            keys = [key.value for key in node.keys if isinstance(key, ast.Constant)]
+            if "title" not in keys:
+                continue
+            try:
+                entry = ast.literal_eval(node)
+            except ValueError:
+                continue
+            entries.append({
+                'title': entry['title'],
+                'url': entry.get('url') or entry.get('transcript_url'),
+                'source': path
+            })
+
+    return entries
+
+
+class TitleIndex:
+    def __init__(self, min_confidence: float = 0.85):
+        """
+        Initialize an empty title index
+
+        Args:
+            min_confidence: Similarity required before a query is treated as naming a title
+        """
+        self.min_confidence = min_confidence
+
+        self.titles: List[Dict[str, Any]] = []
+        self._by_normalized: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._grams: List[Set[str]] = []
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def add(self, title: str, doc_id: Optional[str] = None, metadata: Optional[Dict[str, Any]] = None,
+            url: Optional[str] = None):
+        """Register a title, optionally with a vector ID that belongs to it"""
+        normalized = normalize_title(title)
+        if not normalized:
+            return
+
+        position = self._by_normalized.get(normalized)
+        if position is None:
+            position = len(self.titles)
+            self._by_normalized[normalized] = position
+            self.titles.append({'title': title, 'normalized': normalized, 'url': url, 'docs': {}})
+            grams = trigrams(normalized)
+            self._grams.append(grams)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(position)
+
+        entry = self.titles[position]
+        if url and not entry['url']:
+            entry['url'] = url
+        if doc_id:
+            entry['docs'][doc_id] = metadata or {}
+
+    def lookup(self, query: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the best-matching title entry with a `confidence` field,
+        or None when no title matches with at least min_confidence
+
+        Similarity is the Dice coefficient over trigrams, so it is scored against
+        the query's grams as well as the title's: the query has to be mostly the
+        title (a long title with a word or two around it still matches), and a
+        question that merely contains a short title goes to vector search.
+        """
+        normalized = normalize_title(query)
+        if not normalized:
+            return None
+
+        position = self._by_normalized.get(normalized)
+        if position is not None:
+            return dict(self.titles[position], confidence=1.0)
+
+        query_grams = trigrams(normalized)
+        shared: Dict[int, int] = {}
+        for gram in query_grams:
+            for candidate in self._postings.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        best, best_score = None, 0.0
+        for candidate, count in shared.items():
+            score = 2.0 * count / (len(query_grams) + len(self._grams[candidate]))
+            if score > best_score:
+                best, best_score = candidate, score
+
+        if best is None or best_score < self.min_confidence:
+            return None
+
+        return dict(self.titles[best], confidence=best_score)
+
+    def resolve(self, query: str, top_k: int = 5) -> Optional[List[Any]]:
+        """
+        Resolve a query that names a known document to its vectors
+
+        Returns Pinecone-shaped matches (id, score, metadata) ordered by chunk,
+        or None when the query does not confidently name a document with known vectors.
+        """
+        entry = self.lookup(query)
+        if not entry or not entry['docs']:
+            return None
+
+        docs = sorted(entry['docs'].items(), key=lambda item: item[1].get('chunk_index', 0))
+        return [
+            SimpleNamespace(id=doc_id, score=entry['confidence'], metadata=metadata)
+            for doc_id, metadata in docs[:top_k]
+        ]
+
+    @classmethod
+    def build(cls,
+              metadata_by_id: Optional[Dict[str, Dict[str, Any]]] = None,
+              source_paths: Iterable[str] = SOURCE_SCRIPTS,
+              **kwargs) -> "TitleIndex":
+        """
+        Build the index from vector metadata (id → metadata, e.g. the lexical
+        index's stored metadata) and the titles in the processing scripts' source lists
+        """
+        index = cls(**kwargs)
+
+        for doc_id, metadata in (metadata_by_id or {}).items():
+            title = metadata.get('title') or metadata.get('original_title')
+            if title:
+                index.add(title, doc_id=doc_id, metadata=metadata, url=metadata.get('url'))
+
+        for entry in titles_from_source_scripts(source_paths):
+            index.add(entry['title'], url=entry['url'])
+
+        return index
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Usage Meter
+Token, request and cost accounting for OpenAI calls per run, source tab and model, with a hard
+budget (pause or abort before overspending) and a dry-run mode that only predicts token usage
+"""
+
+import json
+import math
+import os
+import sys
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_USAGE_DIR = os.path.join('.cache', 'usage')
+
+# USD per million tokens (input, output)
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    'text-embedding-3-small': (0.02, 0.0),
+    'text-embedding-3-large': (0.13, 0.0),
+    'text-embedding-ada-002': (0.10, 0.0),
+    'gpt-4o-mini': (0.15, 0.60),
+    'gpt-4o': (2.50, 10.00),
+    'gpt-3.5-turbo': (0.50, 1.50)
+}
+
+# Chat formatting overhead per message (role, separators)
+TOKENS_PER_MESSAGE = 4
+
+# Rough size of OpenAI tokens on English text, used when tiktoken is unavailable
+CHARS_PER_TOKEN = 4
+
+
+class BudgetExceeded(RuntimeError):
+    """
+    Raised before a request that would take the run over its budget
+
+    Request-level `except Exception` handlers re-raise it so a run stops instead
+    of carrying on; the CLI scripts catch it at the top and exit with status 2.
+    """
+
+
+class DryRunRequest(RuntimeError):
+    """Raised instead of sending a request in dry-run mode (its tokens are still predicted)"""
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken encoding for a model (None when tiktoken or its encoding files are unavailable)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding('cl100k_base')
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = "text-embedding-3-small") -> int:
+    """Tokens in a text with the model's tokenizer (chars/4 estimate without tiktoken)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, math.ceil(len(text) / CHARS_PER_TOKEN))
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, Any]], model: str = "gpt-4o-mini") -> int:
+    """Prompt tokens of a chat request"""
+    return sum(TOKENS_PER_MESSAGE + count_tokens(str(message.get('content') or ''), model) for message in messages) + 3
+
+
+def format_usd(amount: float) -> str:
+    return f"${amount:.4f}" if amount >= 0.01 or not amount else f"${amount:.6f}"
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+    """Cost in USD (0 for models missing from MODEL_PRICES)"""
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class _MeteredCreate:
+    """Wraps a client resource (embeddings, chat.completions) so every create() is budgeted and recorded"""
+
+    def __init__(self, target: Any, kind: str, meter: "UsageMeter"):
+        self._target = target
+        self._kind = kind
+        self._meter = meter
+
+    def __getattr__(self, name: str):
+        return getattr(self._target, name)
+
+    def create(self, *args, **kwargs):
+        model = kwargs.get('model', '')
+        if self._kind == 'chat':
+            prompt_tokens = count_message_tokens(kwargs.get('messages', []), model)
+            completion_tokens = kwargs.get('max_tokens') or 0
+        else:
+            texts = kwargs.get('input', '')
+            prompt_tokens = sum(count_tokens(text, model) for text in ([texts] if isinstance(texts, str) else texts))
+            completion_tokens = 0
+
+        if self._meter.dry_run:
+            self._meter.record(model, prompt_tokens, completion_tokens, predicted=True)
+            raise DryRunRequest(f"Dry run: {self._kind} request to {model} not sent ({prompt_tokens} tokens predicted)")
+
+        reserved = self._meter.reserve(model, prompt_tokens, completion_tokens)
+        try:
+            response = self._target.create(*args, **kwargs)
+        finally:
+            self._meter.release(reserved)
+
+        usage = getattr(response, 'usage', None)
+        if usage is not None:
+            self._meter.record(model, usage.prompt_tokens, getattr(usage, 'completion_tokens', 0) or 0)
+        else:
+            self._meter.record(model, prompt_tokens, completion_tokens, predicted=True)
+        return response
+
+
+class _MeteredChat:
+    def __init__(self, chat: Any, meter: "UsageMeter"):
+        self._chat = chat
+        self.completions = _MeteredCreate(chat.completions, 'chat', meter)
+
+    def __getattr__(self, name: str):
+        return getattr(self._chat, name)
+
+
+class UsageMeter:
+    def __init__(self,
+                 run_name: str,
+                 source: Optional[str] = None,
+                 budget_usd: Optional[float] = None,
+                 on_budget: str = "abort",
+                 dry_run: bool = False,
+                 output_dir: str = DEFAULT_USAGE_DIR):
+        """
+        Initialize the usage meter for one run
+
+        Args:
+            run_name: Name of the script (prefix of the saved report)
+            source: Source tab the following requests are attributed to (reassign per tab; None = "other")
+            budget_usd: Hard spending limit for the run (None = unlimited)
+            on_budget: "abort" raises BudgetExceeded; "pause" asks for a higher budget on an interactive terminal
+            dry_run: Predict token usage locally and never send a request
+            output_dir: Directory for run reports and the cross-run ledger
+        """
+        self.run_name = run_name
+        self.source = source
+        self.budget_usd = budget_usd
+        self.on_budget = on_budget
+        self.dry_run = dry_run
+        self.output_dir = output_dir
+        self.started_at = time.time()
+        self.run_id = f"{run_name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started_at))}"
+
+        self.usage: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.spent_usd = 0.0
+        self.reserved_usd = 0.0
+        self.finished = False
+        self._warned_models = set()
+        self._lock = threading.Lock()
+        self._budget_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, run_name: str, source: Optional[str] = None) -> "UsageMeter":
+        meter = cls(run_name, source)
+        meter.configure_from_env()
+        return meter
+
+    def configure_from_env(self):
+        """Budget and dry run from USAGE_BUDGET_USD, USAGE_ON_BUDGET (abort | pause) and USAGE_DRY_RUN"""
+        budget = os.getenv('USAGE_BUDGET_USD', '').strip()
+        self.budget_usd = float(budget) if budget else None
+        self.on_budget = os.getenv('USAGE_ON_BUDGET', 'abort').strip().lower() or 'abort'
+        self.dry_run = os.getenv('USAGE_DRY_RUN', '').strip().lower() in ('1', 'true', 'yes')
+        if self.dry_run:
+            print("🧮 Dry run: token usage is predicted locally, nothing is sent or written")
+        elif self.budget_usd is not None:
+            print(f"💰 Budget: {format_usd(self.budget_usd)} ({self.on_budget} when reached)")
+
+    def instrument(self, openai_client):
+        """Meter every embeddings and chat completion request made through an OpenAI client"""
+        openai_client.embeddings = _MeteredCreate(openai_client.embeddings, 'embedding', self)
+        chat = getattr(openai_client, 'chat', None)
+        if chat is not None:
+            openai_client.chat = _MeteredChat(chat, self)
+        return openai_client
+
+    def record(self, model: str, prompt_tokens: int, completion_tokens: int = 0, requests: int = 1, predicted: bool = False):
+        """Add one or more requests' usage to the current source tab and model"""
+        if model not in MODEL_PRICES and model not in self._warned_models:
+            self._warned_models.add(model)
+            print(f"⚠️ No price for model {model}, its cost is counted as $0")
+
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        with self._lock:
+            row = self.usage.setdefault((self.source or 'other', model), {
+                'requests': 0, 'prompt_tokens': 0, 'completion_tokens': 0, 'cost_usd': 0.0, 'predicted': False
+            })
+            row['requests'] += requests
+            row['prompt_tokens'] += prompt_tokens
+            row['completion_tokens'] += completion_tokens
+            row['cost_usd'] += cost
+            row['predicted'] = row['predicted'] or predicted
+            self.spent_usd += cost
+
+    def predict_embeddings(self, texts: List[str], model: str = "text-embedding-3-small") -> int:
+        """Record the tokens embedding these texts would use (dry run); returns the token count"""
+        if not texts:
+            return 0
+        tokens = sum(count_tokens(text, model) for text in texts)
+        self.record(model, tokens, requests=len(texts), predicted=True)
+        return tokens
+
+    def reserve(self, model: str, prompt_tokens: int, completion_tokens: int = 0) -> float:
+        """
+        Check a request against the budget before it is sent
+
+        Concurrent requests reserve their estimated cost, so several in-flight
+        requests cannot together overshoot the budget.
+        """
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        if self.budget_usd is None:
+            return 0.0
+
+        with self._budget_lock:
+            while True:
+                with self._lock:
+                    if self.spent_usd + self.reserved_usd + cost <= self.budget_usd:
+                        self.reserved_usd += cost
+                        return cost
+                self._budget_reached(cost)
+
+    def release(self, reserved: float):
+        with self._lock:
+            self.reserved_usd = max(0.0, self.reserved_usd - reserved)
+
+    def _budget_reached(self, cost: float):
+        """Pause for a higher budget (interactive terminals only) or abort the run"""
+        message = (f"Budget of {format_usd(self.budget_usd)} reached: {format_usd(self.spent_usd)} spent, "
+                   f"next request needs {format_usd(cost)}")
+        if self.on_budget == 'pause' and sys.stdin is not None and sys.stdin.isatty():
+            print(f"\n⏸️  {message}")
+            answer = input("   New budget in USD (empty to abort): ").strip()
+            try:
+                new_budget = float(answer) if answer else 0.0
+            except ValueError:
+                new_budget = 0.0
+            if new_budget > self.budget_usd:
+                self.budget_usd = new_budget
+                print(f"▶️  Continuing with a budget of ${new_budget:.2f}")
+                return
+
+        print(f"\n⛔ {message}, aborting")
+        self.finish()
+        raise BudgetExceeded(message)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals for the run, by model and by source tab"""
+        with self._lock:
+            rows = [dict(row, source=source, model=model) for (source, model), row in sorted(self.usage.items())]
+
+        def total(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+            return {
+                'requests': sum(row['requests'] for row in group),
+                'prompt_tokens': sum(row['prompt_tokens'] for row in group),
+                'completion_tokens': sum(row['completion_tokens'] for row in group),
+                'cost_usd': round(sum(row['cost_usd'] for row in group), 6)
+            }
+
+        def grouped(key: str) -> Dict[str, Dict[str, Any]]:
+            return {value: total([row for row in rows if row[key] == value]) for value in sorted({row[key] for row in rows})}
+
+        for row in rows:
+            row['cost_usd'] = round(row['cost_usd'], 6)
+
+        return {
+            'run': self.run_name,
+            'run_id': self.run_id,
+            'dry_run': self.dry_run,
+            'budget_usd': self.budget_usd,
+            'total': total(rows),
+            'by_model': grouped('model'),
+            'by_source': grouped('source'),
+            'rows': rows
+        }
+
+    def finish(self) -> Dict[str, Any]:
+        """Print the usage table and save the run report (once), appending it to the ledger"""
+        summary = self.summary()
+        with self._lock:
+            if self.finished:
+                return summary
+            self.finished = True
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        report_path = os.path.join(self.output_dir, f"{self.run_id}.json")
+        with open(report_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        with open(os.path.join(self.output_dir, 'ledger.jsonl'), 'a') as f:
+            f.write(json.dumps(dict(summary['total'], run=self.run_name, run_id=self.run_id, dry_run=self.dry_run)) + '\n')
+
+        label = "Predicted usage" if self.dry_run else "Usage"
+        print(f"\n🧾 {label} ({self.run_name}):")
+        for row in summary['rows']:
+            completion = f" + {row['completion_tokens']:,} out" if row['completion_tokens'] else ""
+            print(f"   {row['source']:<20} {row['model']:<24} {row['requests']:>6} req  "
+                  f"{row['prompt_tokens']:>10,} in{completion}  {format_usd(row['cost_usd'])}")
+        total = summary['total']
+        budget = f" of {format_usd(self.budget_usd)}" if self.budget_usd is not None else ""
+        print(f"   Total: {total['requests']} requests, {total['prompt_tokens'] + total['completion_tokens']:,} tokens, "
+              f"{format_usd(total['cost_usd'])}{budget}")
+        print(f"💾 Usage report saved to {report_path}")
+        return summary
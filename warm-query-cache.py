@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Warm the query caches
+Precomputes embeddings and top-k results for the most common questions
+(common-questions-analysis.md, knowledge-base-guide.json and frequent logged queries)
+"""
+
+import os
+import sys
+from openai import OpenAI
+from pinecone import Pinecone
+from embedding_cache import EmbeddingCache, DEFAULT_CACHE_PATH
+from usage_meter import BudgetExceeded, UsageMeter
+from warm_cache import WarmAnswerCache, warm_queries
+
+# Load environment variables
+from dotenv import load_dotenv
+load_dotenv()
+
+# Initialize clients
+usage = UsageMeter.from_env("warm-query-cache")
+openai_client = usage.instrument(OpenAI(api_key=os.getenv('OPENAI_API_KEY')))
+pc = Pinecone(api_key=os.getenv('PINECONE_API_KEY'))
+
+# Embeddings land in the shared query cache, so the service reuses them too
+query_cache = EmbeddingCache("text-embedding-3-small", cache_path=DEFAULT_CACHE_PATH)
+
+INDEX_NAME = "gpc-knowledge-base"
+TOP_K = 10
+
+
+def warm_query_cache():
+    """Precompute answers for the common questions and save them for the service"""
+
+    print("🔥 Warming query cache...")
+
+    queries = warm_queries()
+    if not queries:
+        print("❌ No questions found to warm")
+        return
+
+    print(f"📝 Found {len(queries)} questions to precompute")
+
+    # Dry run: predict the embedding tokens for uncached questions, keep the saved answers
+    if usage.dry_run:
+        usage.predict_embeddings([query for query in queries if not query_cache.get(query)])
+        return
+
+    index = pc.Index(INDEX_NAME)
+    warm_answers = WarmAnswerCache(INDEX_NAME)
+
+    stored = warm_answers.rebuild(openai_client, index, queries, top_k=TOP_K, embedding_cache=query_cache)
+
+    print(f"✅ Precomputed answers for {stored}/{len(queries)} questions (index version {warm_answers.version})")
+    print(f"💾 Saved to {warm_answers.path}")
+
+if __name__ == "__main__":
+    try:
+        warm_query_cache()
+    except BudgetExceeded:
+        sys.exit(2)  # Usage report already saved when the budget was hit
+    usage.finish()
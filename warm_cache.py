@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Warm Answer Cache
+Precomputed top-k results for the most common questions, served with zero external calls
+"""
+
+import atexit
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from batch_search import embed_texts, query_vectors
+from embedding_cache import EmbeddingCache, normalize_query
+from index_version import IndexVersionWatcher, get_index_version
+
+DEFAULT_WARM_PATH = os.path.join('.cache', 'warm_answers.json')
+DEFAULT_QUERY_LOG_PATH = os.path.join('.cache', 'query_log.jsonl')
+
+COMMON_QUESTIONS_PATH = 'common-questions-analysis.md'
+KNOWLEDGE_BASE_GUIDE_PATH = 'knowledge-base-guide.json'
+
+def common_questions(path: str = COMMON_QUESTIONS_PATH) -> List[str]:
+    """Questions listed as **Qn: "..."** in the common questions analysis"""
+    try:
+        with open(path, 'r') as f:
+            text = f.read()
+    except OSError:
+        return []
+    return re.findall(r'^\*\*Q\d+:\s*"(.+?)"\*\*', text, flags=re.MULTILINE)
+
+
+def guide_example_queries(path: str = KNOWLEDGE_BASE_GUIDE_PATH) -> List[str]:
+    """Every example query from knowledge-base-guide.json"""
+    try:
+        with open(path, 'r') as f:
+            guide = json.load(f)
+    except (OSError, ValueError):
+        return []
+
+    examples = guide.get('example_queries', {})
+    if isinstance(examples, dict):
+        return [query for queries in examples.values() for query in queries]
+    return list(examples)
+
+
+class QueryLog:
+    def __init__(self,
+                 path: str = DEFAULT_QUERY_LOG_PATH,
+                 sample_rate: float = 1.0,
+                 max_bytes: int = 5_000_000,
+                 flush_every: int = 100,
+                 flush_interval_s: float = 5.0):
+        """
+        Initialize a buffered, sampled and size-capped log of served queries
+
+        Queries are buffered in memory and appended by a background thread, so
+        logging never blocks a request on file I/O. When the file grows past
+        max_bytes it is rotated to `<path>.1` (one generation is kept).
+
+        Args:
+            path: JSON-lines log file
+            sample_rate: Fraction of queries recorded (0-1)
+            max_bytes: Size at which the log is rotated
+            flush_every: Buffered queries that trigger an early flush
+            flush_interval_s: Longest time a query stays buffered
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.flush_interval_s = flush_interval_s
+
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    @classmethod
+    def from_env(cls, path: str = DEFAULT_QUERY_LOG_PATH) -> Optional["QueryLog"]:
+        """Query log configured from QUERY_LOG* (None unless QUERY_LOG=1: logging is opt-in)"""
+        if os.getenv('QUERY_LOG', '0') != '1':
+            return None
+        return cls(
+            path,
+            sample_rate=float(os.getenv('QUERY_LOG_SAMPLE_RATE', '1.0')),
+            max_bytes=int(os.getenv('QUERY_LOG_MAX_BYTES', '5000000'))
+        )
+
+    def log(self, query: str):
+        """Buffer a served query (subject to sampling)"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        with self._lock:
+            self._buffer.append({'query': query, 'ts': time.time()})
+            should_flush = len(self._buffer) >= self.flush_every
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name='query-log', daemon=True)
+                self._writer.start()
+        if should_flush:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"❌ Error writing query log: {e}")
+
+    def flush(self):
+        """Append buffered queries to the log file, rotating it first when it is over max_bytes"""
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if not pending:
+            return
+
+        with self._write_lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            try:
+                if os.path.getsize(self.path) >= self.max_bytes:
+                    os.replace(self.path, self.path + '.1')
+            except OSError:
+                pass
+
+            with open(self.path, 'a') as f:
+                f.write("".join(json.dumps(entry) + "\n" for entry in pending))
+
+
+def logged_queries(path: str = DEFAULT_QUERY_LOG_PATH) -> List[str]:
+    """Every logged query, oldest first (the rotated generation, then the current log)"""
+    queries = []
+    for log_path in (path + '.1', path):
+        try:
+            with open(log_path, 'r') as f:
+                for line in f:
+                    try:
+                        queries.append(json.loads(line)['query'])
+                    except (ValueError, KeyError):
+                        continue
+        except OSError:
+            continue
+    return queries
+
+
+def frequent_logged_queries(path: str = DEFAULT_QUERY_LOG_PATH,
+                            min_count: int = 3,
+                            limit: int = 50) -> List[str]:
+    """Logged queries asked at least min_count times (most frequent first)"""
+    counts: Counter = Counter()
+    originals: Dict[str, str] = {}
+    for query in logged_queries(path):
+        key = normalize_query(query)
+        counts[key] += 1
+        originals.setdefault(key, query)
+
+    return [originals[key] for key, count in counts.most_common(limit) if count >= min_count]
+
+
+def warm_queries(log_path: str = DEFAULT_QUERY_LOG_PATH) -> List[str]:
+    """Deduplicated questions to precompute: common questions, guide examples, frequent logged queries"""
+    seen, queries = set(), []
+    for query in common_questions() + guide_example_queries() + frequent_logged_queries(log_path):
+        key = normalize_query(query)
+        if key not in seen:
+            seen.add(key)
+            queries.append(query)
+    return queries
+
+
+def _serialize_match(match: Any) -> Dict[str, Any]:
+    return {'id': match.id, 'score': match.score, 'metadata': dict(match.metadata or {})}
+
+
+class WarmAnswerCache:
+    def __init__(self, index_name: str, path: str = DEFAULT_WARM_PATH):
+        """
+        Initialize the warm answer cache
+
+        Args:
+            index_name: Pinecone index the answers were computed against
+            path: JSON file the precomputed answers are loaded from / saved to
+        """
+        self.index_name = index_name
+        self.path = path
+        self.version = None
+        self.top_k = 0
+        self.answers: Dict[str, List[Dict[str, Any]]] = {}
+        self._watcher = IndexVersionWatcher(index_name)
+
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    @classmethod
+    def load(cls, index_name: str, path: str = DEFAULT_WARM_PATH) -> "WarmAnswerCache":
+        """Load saved answers (an empty cache if the file does not exist)"""
+        cache = cls(index_name, path)
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cache
+
+        if data.get('index_name') == index_name:
+            cache.version = data.get('version')
+            cache.top_k = data.get('top_k', 0)
+            cache.answers = data.get('answers', {})
+        return cache
+
+    def is_stale(self) -> bool:
+        """True when the index was rebuilt after the answers were computed"""
+        return self.version != self._watcher.current()
+
+    def get(self, query: str, top_k: int) -> Optional[List[Any]]:
+        """Precomputed matches for an exact (normalized) query, or None"""
+        if top_k > self.top_k or self.is_stale():
+            return None
+
+        answer = self.answers.get(normalize_query(query))
+        if answer is None:
+            return None
+
+        self.hits += 1
+        return [SimpleNamespace(**match) for match in answer[:top_k]]
+
+    def rebuild(self,
+                openai_client,
+                index,
+                queries: List[str],
+                top_k: int = 10,
+                model: str = "text-embedding-3-small",
+                embedding_cache: Optional[EmbeddingCache] = None) -> int:
+        """
+        Recompute answers for queries (one embeddings request, concurrent
+        Pinecone queries) and save them; returns the number of answers stored
+        """
+        version = get_index_version(self.index_name)
+        embeddings = embed_texts(openai_client, queries, model=model, cache=embedding_cache)
+        results = query_vectors(index, embeddings, top_k=top_k)
+
+        self.answers = {
+            normalize_query(query): [_serialize_match(match) for match in matches]
+            for query, matches in zip(queries, results)
+            if matches
+        }
+        self.version = version
+        self.top_k = top_k
+        self.save()
+        return len(self.answers)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.path, 'w') as f:
+            json.dump({
+                'index_name': self.index_name,
+                'version': self.version,
+                'top_k': self.top_k,
+                'created_at': time.time(),
+                'answers': self.answers
+            }, f)